@@ -3,6 +3,8 @@
 # -------------------------------------------------------------------------------------
 #
 # Description:      This script converts ECG data stored in DICOM into tabular data.
+#                   For configurable (parallel) runs use the run_batches.py
+#                   command-line entry point instead.
 # Authors:          Stephan van der Zwaard
 # Date:             18-06-2024
 # Python.version:   3.9.13
@@ -143,10 +145,12 @@ for i in range(i_start,i_end) :
             median_waves    = pd.concat([median_waves,mw], axis=0)
             original_waves  = pd.concat([original_waves,w], axis=0)
     
-    except: # Retrieve relevant information when DICOM could not be read including the error
-        dicom['file_no']  = i+1 #account for python indexing
-        dicom['filename'] = ECG_files[i].replace(path_to_dicom,'')
-        error_dicom       = pd.concat([error_dicom,dicom], axis=0)
+    except Exception as error: # Retrieve relevant information when DICOM could not be read including the error
+        # NOTE `dicom` is unset or stale if the reader raised
+        failed = {'file_no'  : i+1, #account for python indexing
+                  'filename' : ECG_files[i].replace(path_to_dicom,''),
+                  'error'    : repr(error)}
+        error_dicom       = pd.concat([error_dicom,pd.DataFrame([failed])], axis=0)
 
     # Move processed ECG DICOMs to archive to distinguish processed from unread files.
     if not os.path.exists(path_to_archive):
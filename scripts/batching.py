@@ -0,0 +1,286 @@
+'''
+Sizes in-memory batches of ECGs against a memory budget, using the measured
+bytes per ECG, and bounds the number of ECGs read ahead of a slower writer.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import time
+import threading
+import collections
+import numpy as np
+from typing import (
+    Any, Callable, Iterator, Optional, Tuple,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# the initial estimate of the bytes per row of a long-format waveform table:
+# the UID, sample, lead, voltage and waveform type columns
+ROW_BYTES = 40
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def lead_nbytes(leads:Any) -> Tuple[int, int]:
+    '''
+    The bytes and number of samples of the lead arrays of an ECG.
+    
+    Parameters
+    ----------
+    leads : dict [`str`, `np.ndarray`] or `tuple`
+        The lead specific arrays, or a raw `(leads, scaling, frequency)`
+        tuple. Anything else is counted as empty.
+    
+    Returns
+    -------
+    tuple [`int`, `int`]
+        The bytes and the number of samples summed over the leads.
+    '''
+    if isinstance(leads, tuple):
+        leads = leads[0]
+    if not isinstance(leads, dict):
+        return 0, 0
+    arrays = [v for v in leads.values() if isinstance(v, np.ndarray)]
+    # return
+    return sum(a.nbytes for a in arrays), sum(a.size for a in arrays)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def ecg_nbytes(ecg_inst:Any) -> Tuple[int, int]:
+    '''
+    The bytes and number of samples of the rhythm and median lead arrays held
+    by a called `ECGDICOMReader`.
+    '''
+    sizes = [lead_nbytes(getattr(ecg_inst, n, None)) for n in
+             [PDNames.LEAD_VOLTAGES, PDNames.LEAD_VOLTAGES2]]
+    # return
+    return sum(s[0] for s in sizes), sum(s[1] for s in sizes)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class BatchController(object):
+    '''
+    Chooses the number of ECGs held in memory from a memory budget and the
+    measured bytes per ECG.
+    
+    Attributes
+    ----------
+    memory_budget : `int`
+        The bytes available for the ECGs held in memory.
+    min_size : `int`
+        The smallest batch size.
+    max_size : `int` or `NoneType`
+        The largest batch size, `NoneType` for no limit.
+    smoothing : `float`
+        The weight of a new measurement in the moving average of the bytes
+        per ECG.
+    bytes_per_ecg : `float` or `NoneType`
+        The moving average of the bytes per ECG, `NoneType` before the first
+        measurement.
+    row_bytes : `float`
+        The bytes per long-format table row, measured by `observe_frame`.
+    sizes : `list` [`int`]
+        The batch sizes recorded by `record`.
+    
+    Example
+    -------
+    >>> controller = BatchController(2 * 1024 ** 3)
+    >>> controller.observe(*lead_nbytes(leads))
+    >>> controller.size
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, memory_budget:int, min_size:int=1,
+                 max_size:Optional[int]=None, smoothing:float=0.2,
+                 ) -> None:
+        """
+        Initialises a new instance of `BatchController`.
+        
+        Parameters
+        ----------
+        memory_budget : `int`
+            The bytes available for the ECGs held in memory.
+        min_size : `int`, default 1
+            The smallest batch size.
+        max_size : `int`, default `NoneType`
+            The largest batch size.
+        smoothing : `float`, default 0.2
+            The weight of a new measurement in the moving average.
+        """
+        is_type(memory_budget, int, 'memory_budget')
+        is_type(min_size, int, 'min_size')
+        is_type(max_size, (type(None), int), 'max_size')
+        is_type(smoothing, float, 'smoothing')
+        if memory_budget < 1 or min_size < 1 or\
+                (max_size is not None and max_size < min_size):
+            raise ValueError('`memory_budget` and `min_size` should be larger '
+                             'than 0, and `max_size` at least `min_size`.')
+        if not 0 < smoothing <= 1:
+            raise ValueError('`smoothing` should be between 0 and 1.')
+        self.memory_budget = memory_budget
+        self.min_size = min_size
+        self.max_size = max_size
+        self.smoothing = smoothing
+        self.bytes_per_ecg = None
+        self.row_bytes = float(ROW_BYTES)
+        self.sizes = []
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(memory_budget={self.memory_budget}, "
+                f"bytes_per_ecg={self.bytes_per_ecg}, size={self.size})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def observe(self, nbytes:int, samples:int=0) -> None:
+        '''
+        Updates the bytes per ECG with the arrays of a single ECG.
+        
+        Parameters
+        ----------
+        nbytes : `int`
+            The bytes of the lead arrays.
+        samples : `int`, default 0
+            The number of samples which will be converted to long-format
+            table rows while the ECG is held, each costing `row_bytes`.
+        '''
+        estimate = nbytes + samples * self.row_bytes
+        if self.bytes_per_ecg is None:
+            self.bytes_per_ecg = float(estimate)
+        else:
+            self.bytes_per_ecg += self.smoothing *\
+                (estimate - self.bytes_per_ecg)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def observe_frame(self, frame_bytes:int, rows:int) -> None:
+        '''
+        Replaces the estimated bytes per table row by the bytes measured
+        on a converted table (e.g. `DataFrame.memory_usage`).
+        '''
+        if rows > 0:
+            self.row_bytes = frame_bytes / rows
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    @property
+    def size(self) -> int:
+        '''
+        The number of ECGs fitting the memory budget.
+        '''
+        if self.bytes_per_ecg is None or self.bytes_per_ecg <= 0:
+            return self.min_size
+        size = max(self.min_size,
+                   int(self.memory_budget // self.bytes_per_ecg))
+        # return
+        return size if self.max_size is None else min(size, self.max_size)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def record(self, size:int) -> None:
+        '''
+        Adds a chosen batch size to `sizes`.
+        '''
+        self.sizes.append(int(size))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class ReadAhead(object):
+    '''
+    Reads items in a background thread ahead of the consumer, holding at most
+    `controller.size` items. If the consumer (e.g. a writer) falls behind the
+    reading thread blocks until an item is taken, so the items held never
+    exceed the memory budget.
+    
+    Attributes
+    ----------
+    controller : BatchController
+        Sizes the read-ahead queue.
+    blocked : `float`
+        The seconds the reading thread waited for the consumer.
+    
+    Notes
+    -----
+    `produce` should return an iterator of `(item, nbytes, samples)` tuples
+    and is run in a single thread, so state it mutates (e.g. a list of
+    processed keys) should not be read by the consumer until the iteration
+    has finished. Exceptions raised by `produce` are raised again by the
+    consumer after the items read before the exception.
+    
+    The changes of the queue size are recorded in `controller.sizes`.
+    
+    Example
+    -------
+    >>> for item in ReadAhead(produce, BatchController(2 * 1024 ** 3)):
+    ...     write(item)
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, produce:Callable[[], Iterator[Tuple[Any, int, int]]],
+                 controller:BatchController,
+                 ) -> None:
+        """
+        Initialises a new instance of `ReadAhead`, the thread is started
+        when iterated.
+        """
+        is_type(controller, BatchController, 'controller')
+        self.produce = produce
+        self.controller = controller
+        self.blocked = 0.0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._done, self._closed, self._error = False, False, None
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    @property
+    def depth(self) -> int:
+        '''
+        The number of items read and waiting for the consumer.
+        '''
+        return len(self._items)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _read(self) -> None:
+        '''
+        The reading thread.
+        '''
+        try:
+            for item, nbytes, samples in self.produce():
+                with self._cond:
+                    self.controller.observe(nbytes, samples)
+                    size = self.controller.size
+                    if len(self.controller.sizes) == 0 or\
+                            self.controller.sizes[-1] != size:
+                        self.controller.record(size)
+                    # #### backpressure
+                    start = time.perf_counter()
+                    while len(self._items) >= self.controller.size and\
+                            self._closed == False:
+                        self._cond.wait()
+                    self.blocked += time.perf_counter() - start
+                    if self._closed == True:
+                        return
+                    self._items.append(item)
+                    self._cond.notify_all()
+        except BaseException as error:
+            self._error = error
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __iter__(self) -> Iterator[Any]:
+        thread = threading.Thread(target=self._read, daemon=True)
+        thread.start()
+        try:
+            while True:
+                with self._cond:
+                    while len(self._items) == 0 and self._done == False:
+                        self._cond.wait()
+                    if len(self._items) > 0:
+                        item = self._items.popleft()
+                        self._cond.notify_all()
+                    elif self._error is not None:
+                        raise self._error
+                    else:
+                        return
+                yield item
+                # NOTE release the reference before waiting for the next
+                del item
+        finally:
+            with self._cond:
+                self._closed = True
+                self._items.clear()
+                self._cond.notify_all()
+            thread.join()
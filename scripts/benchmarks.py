@@ -0,0 +1,156 @@
+'''
+Simple benchmarks comparing the run time and memory of the extraction
+settings.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+import pandas as pd
+from typing import (
+    List, Dict, Optional, Any,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.process_dicoms import (
+    ECGDICOMReader,
+    ECGDICOMTable,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def benchmark_get_table(path_list:List[str],
+                        dtypes:Optional[List[str]]=None,
+                        info_type:str='all',
+                        **kwargs:Optional[Any],
+                        ) -> pd.DataFrame:
+    '''
+    Times `ECGDICOMTable.get_table` for each dtype, recording the peak
+    traced memory and the size of the waveform tables.
+    
+    Parameters
+    ----------
+    path_list : list [`str`]
+        The dicom files, preferably a few thousand.
+    dtypes : list [`str`], default `NoneType`
+        The dtypes to compare, defaults to `float64` and `float32`.
+    info_type : {`all`, `rhythm`, `median`, `meta`}, default `all`
+        Which information should be extracted.
+    **kwargs : Optional[Any]
+        Keyword arguments passed to `ECGDICOMReader`.
+    
+    Returns
+    -------
+    pd.DataFrame
+        One row per dtype with the number of files, seconds, files per
+        second, peak traced MB and table MB.
+    
+    Notes
+    -----
+    tracemalloc adds overhead to the timings, but this is equal between the
+    dtypes.
+    '''
+    if dtypes is None:
+        dtypes = PDNames.DTYPES
+    results = []
+    for dtype in dtypes:
+        table = ECGDICOMTable(ECGDICOMReader(dtype=dtype, **kwargs),
+                              path_list=path_list, info_type=info_type)
+        tracemalloc.start()
+        start = time.perf_counter()
+        table(skip_missing=PDNames.SKIP_DATA, duplicates=PDNames.DUP_SKIP)
+        table.get_table()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        table_bytes = sum(
+            getattr(table, t).memory_usage(deep=True).sum()
+            for t in [PDNames.WAVE_T, PDNames.MEDIAN_T] if hasattr(table, t))
+        results.append({
+            'dtype': dtype,
+            'files': len(getattr(table, PDNames.KEY_L)),
+            'seconds': seconds,
+            'files_per_second': len(getattr(table, PDNames.KEY_L)) / seconds,
+            'peak_mb': peak / 1e6,
+            'table_mb': table_bytes / 1e6,
+        })
+    # return
+    return pd.DataFrame(results)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def benchmark_import(module:str='ecgprocess.process_dicoms', repeat:int=5,
+                     budget:Optional[float]=None,
+                     forbidden:Optional[List[str]]=None,
+                     ) -> Dict[str, Any]:
+    '''
+    Measures the cold-start import time of a module in fresh interpreters,
+    as paid by each spawned worker.
+    
+    Parameters
+    ----------
+    module : `str`, default `ecgprocess.process_dicoms`
+        The module to import.
+    repeat : `int`, default 5
+        The number of fresh interpreters.
+    budget : `float`, default `NoneType`
+        The maximum median import time in seconds.
+    forbidden : list [`str`], default `NoneType`
+        Modules which should not be imported, defaults to pandas, scipy and
+        matplotlib.
+    
+    Returns
+    -------
+    dict [`str`, `any`]
+        The median seconds and the forbidden modules which were imported.
+    
+    Raises
+    ------
+    RuntimeError
+        If the median import time exceeds `budget` or a forbidden module was
+        imported.
+    '''
+    if forbidden is None:
+        forbidden = ['pandas', 'scipy', 'matplotlib']
+    CODE = ('import sys, time; start = time.perf_counter(); '
+            f'import {module}; print(time.perf_counter() - start); '
+            f'print(",".join(m for m in {forbidden!r} if m in sys.modules))')
+    seconds, imported = [], set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', CODE], check=True,
+                             capture_output=True, text=True).stdout.split('\n')
+        seconds.append(float(out[0]))
+        imported.update(m for m in out[1].split(',') if m)
+    result = {'module': module, 'seconds': statistics.median(seconds),
+              'imported': sorted(imported)}
+    if len(imported) > 0:
+        raise RuntimeError(f'`{module}` imported {sorted(imported)}.')
+    if budget is not None and result['seconds'] > budget:
+        raise RuntimeError(f'`{module}` took {result["seconds"]:.3f}s to '
+                           f'import, exceeding the {budget}s budget.')
+    # return
+    return result
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the import time, and get_table using '
+        'float64 and float32.')
+    parser.add_argument('dicom_dir', help='A directory with .dcm files.')
+    parser.add_argument('-n', '--n-files', type=int, default=2000,
+                        help='The maximum number of files to read.')
+    parser.add_argument('--import-budget', type=float, default=None,
+                        help='The maximum import time in seconds.')
+    args = parser.parse_args()
+    print(benchmark_import(budget=args.import_budget), file=sys.stdout)
+    paths = sorted(glob.glob(os.path.join(args.dicom_dir, '**', '*.dcm'),
+                             recursive=True))[:args.n_files]
+    print(benchmark_get_table(paths).to_string(index=False), file=sys.stdout)
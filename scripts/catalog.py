@@ -0,0 +1,212 @@
+'''
+An embedded SQLite catalog of the extracted ECG metadata, allowing for
+indexed look-ups (e.g. by PatientID or StudyDate) without scanning the
+written tables.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import sqlite3
+import numbers
+import pathlib
+import numpy as np
+import pandas as pd
+from typing import (
+    List, Self, Dict, Optional, Any,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class ECGCatalog(object):
+    '''
+    A SQLite catalog with one row per extracted ECG containing the metadata
+    columns, the source dicom path and the output location.
+    
+    Attributes
+    ----------
+    path : `str`
+        The path to the SQLite database file.
+    columns : `list` [`str`]
+        The catalog columns.
+    commit_every : `int`
+        The number of inserted rows after which the transaction is committed.
+    
+    Methods
+    -------
+    insert(record, source_path, output_path)
+        Inserts or replaces a single ECG record.
+    query(sql, params)
+        Runs a SQL query and returns a pandas.DataFrame.
+    close()
+        Commits and closes the database connection.
+    
+    Notes
+    -----
+    The `RECORD_ID_ECG` column is the primary key, and the `PatientID`,
+    `StudyDate` and `Manufacturer` columns are indexed. Re-inserting an
+    ECG replaces the previous row.
+    
+    Example
+    -------
+    >>> catalog = ECGCatalog('catalog.sqlite')
+    >>> catalog.query('SELECT * FROM ecg WHERE PatientID = ?', ('1234',))
+    '''
+    TABLE = 'ecg'
+    INDEXED = ['PatientID', 'StudyDate', 'Manufacturer']
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, path:str, columns:Optional[List[str]]=None,
+                 commit_every:int=1000,
+                 ) -> None:
+        """
+        Initialises a new instance of `ECGCatalog`, creating the table and
+        indexes if these do not exist.
+        
+        Parameters
+        ----------
+        path : `str`
+            The path to the SQLite database file.
+        columns : `list` [`str`], default `NoneType`
+            The metadata columns to catalog. Set to `NoneType` to open an
+            existing catalog for querying.
+        commit_every : `int`, default 1000
+            The number of inserted rows after which the transaction is
+            committed.
+        """
+        is_type(path, (pathlib.PosixPath, str))
+        is_type(columns, (type(None), list))
+        is_type(commit_every, int)
+        self.path = str(path)
+        self.commit_every = commit_every
+        self._pending = 0
+        self.connection = sqlite3.connect(self.path)
+        if columns is not None:
+            # the UID first, followed by the remaining unique columns
+            self.columns = [PDNames.SOP_UID] + [
+                c for c in dict.fromkeys(columns) if c != PDNames.SOP_UID
+            ] + [PDNames.COL_SOURCE_PATH, PDNames.COL_OUTPUT_PATH]
+            self._create()
+        else:
+            self.columns = [r[1] for r in self.connection.execute(
+                f'PRAGMA table_info("{self.TABLE}")')]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __str__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME} instance with path={self.path}."
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(path={self.path})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __enter__(self) -> Self:
+        return self
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __exit__(self, *args) -> None:
+        self.close()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _create(self) -> None:
+        '''
+        Creates the catalog table and indexes, adding any columns which are
+        missing from an existing catalog.
+        '''
+        cols = ', '.join(
+            f'"{c}" TEXT PRIMARY KEY' if c == PDNames.SOP_UID else f'"{c}"'
+            for c in self.columns)
+        self.connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.TABLE}" ({cols})')
+        # add new columns to an existing catalog
+        existing = [r[1] for r in self.connection.execute(
+            f'PRAGMA table_info("{self.TABLE}")')]
+        for c in self.columns:
+            if c not in existing:
+                self.connection.execute(
+                    f'ALTER TABLE "{self.TABLE}" ADD COLUMN "{c}"')
+        for c in self.INDEXED:
+            if c in self.columns:
+                self.connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{c}" ON '
+                    f'"{self.TABLE}" ("{c}")')
+        self.connection.commit()
+        self._insert_sql = (
+            f'INSERT OR REPLACE INTO "{self.TABLE}" (' +
+            ', '.join(f'"{c}"' for c in self.columns) + ') VALUES (' +
+            ', '.join('?' for _ in self.columns) + ')')
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def insert(self, record:Dict[str, Any], source_path:str,
+               output_path:str) -> None:
+        '''
+        Inserts or replaces a single ECG record.
+        
+        Parameters
+        ----------
+        record : dict [`str`, `any`]
+            The extracted metadata, e.g. the `GeneralInfo` attribute of a
+            called `ECGDICOMReader` instance. Keys which are not a catalog
+            column are ignored.
+        source_path : `str`
+            The path of the dicom file.
+        output_path : `str`
+            The location the ECG was written to.
+        '''
+        record = {**record, PDNames.COL_SOURCE_PATH: str(source_path),
+                  PDNames.COL_OUTPUT_PATH: str(output_path)}
+        self.connection.execute(
+            self._insert_sql,
+            [_to_sql_value(record.get(c, None)) for c in self.columns])
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.connection.commit()
+            self._pending = 0
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def query(self, sql:str, params:tuple|dict=()) -> pd.DataFrame:
+        '''
+        Runs a SQL query against the catalog.
+        
+        Parameters
+        ----------
+        sql : `str`
+            The SQL query, the catalog table is called `ecg`.
+        params : `tuple` or `dict`, default ()
+            The query parameters.
+        
+        Returns
+        -------
+        pd.DataFrame
+            The query result.
+        '''
+        is_type(sql, str)
+        self.connection.commit()
+        return pd.read_sql_query(sql, self.connection, params=params)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def close(self) -> None:
+        '''
+        Commits any pending inserts and closes the connection.
+        '''
+        self.connection.commit()
+        self.connection.close()
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _to_sql_value(value:Any) -> Any:
+    '''
+    Maps pydicom and numpy values to the types supported by sqlite3: missing
+    values to `None`, numbers to int or float and anything else (such as
+    `PersonName` or multi-valued elements) to a string.
+    '''
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return None if np.isnan(value) else float(value)
+    return str(value)
+
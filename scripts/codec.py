@@ -0,0 +1,333 @@
+'''
+A lossless binary codec for ECG waveforms, storing the integer samples of
+the DICOM (or the voltages) of each ECG as an independently decodable block.
+
+Each block starts with the `ECGZ` magic, the length of a JSON header with
+the lead names, sampling frequency and per-lead scaling, followed by the
+compressed samples. Integer samples are delta encoded per lead (by default
+the second difference), zigzag mapped and split into byte planes before
+compression; floating point samples are only split into byte planes. The
+integer arithmetic wraps around, hence decoding is exact for any input.
+
+Example
+-------
+>>> block = encode_ecg(leads, scaling=scaling, frequency=500, uid=uid)
+>>> record = decode_ecg(block)
+>>> voltages = to_voltages(record)
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import json
+import zlib
+import lzma
+import struct
+import numpy as np
+from typing import (
+    Any, Dict, Iterator, Optional,
+)
+from ecgprocess.errors import (
+    is_type,
+    Error_MSG,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+# NOTE an optional dependency, only imported if `zstd` is requested
+zstandard = LazyModule('zstandard')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+MAGIC = b'ECGZ'
+VERSION = 1
+# the magic, format version and header length
+PREAMBLE = struct.Struct('<4sHI')
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _compress(data:bytes, compressor:str, level:Optional[int]=None) -> bytes:
+    '''
+    Compresses `data` with `zlib`, `lzma` or `zstd`.
+    '''
+    if compressor == 'zlib':
+        return zlib.compress(data, 6 if level is None else level)
+    elif compressor == 'lzma':
+        return lzma.compress(data, preset=6 if level is None else level)
+    elif compressor == 'zstd':
+        return zstandard.ZstdCompressor(
+            level=3 if level is None else level).compress(data)
+    raise ValueError(Error_MSG.CHOICE_PARM.format(
+        'compressor', ', '.join(PDNames.CODEC_COMPRESSORS)))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _decompress(data:bytes, compressor:str) -> bytes:
+    '''
+    The inverse of `_compress`.
+    '''
+    if compressor == 'zlib':
+        return zlib.decompress(data)
+    elif compressor == 'lzma':
+        return lzma.decompress(data)
+    elif compressor == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(Error_MSG.CHOICE_PARM.format(
+        'compressor', ', '.join(PDNames.CODEC_COMPRESSORS)))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def encode_matrix(matrix:np.ndarray, order:int=2) -> bytes:
+    '''
+    Encodes a (leads, samples) matrix to byte planes.
+    
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Integer or floating point samples.
+    order : `int`, default 2
+        The number of times integer samples are differenced along the
+        sample axis, 0 stores the samples themselves.
+    
+    Returns
+    -------
+    bytes
+        The byte planes, the least significant byte of all samples first.
+    '''
+    matrix = np.ascontiguousarray(matrix)
+    itemsize = matrix.dtype.itemsize
+    if matrix.dtype.kind in 'iu':
+        # NOTE wrapping differences of the signed view are invertible
+        signed = matrix.view('<i{}'.format(itemsize))
+        for _ in range(order):
+            signed = np.diff(signed, axis=-1, prepend=signed.dtype.type(0))
+        unsigned = signed.view('<u{}'.format(itemsize))
+        # zigzag, mapping small negative and positive values to small values
+        values = (unsigned << 1) ^ (signed >> (8 * itemsize - 1)).view(
+            unsigned.dtype)
+    else:
+        values = matrix.astype(matrix.dtype.newbyteorder('<'), copy=False)
+    # return
+    return np.ascontiguousarray(np.moveaxis(
+        values.view(np.uint8).reshape(values.shape + (itemsize,)), -1, 0,
+    )).tobytes()
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def decode_matrix(data:bytes, dtype:str, shape:tuple[int, int],
+                  order:int=2) -> np.ndarray:
+    '''
+    The inverse of `encode_matrix`.
+    
+    Parameters
+    ----------
+    data : bytes
+        The byte planes.
+    dtype : `str`
+        The dtype of the encoded matrix, e.g. `<i2`.
+    shape : `tuple` [`int`, `int`]
+        The number of leads and samples.
+    order : `int`, default 2
+        The order of the differences.
+    
+    Returns
+    -------
+    np.ndarray
+    '''
+    dtype = np.dtype(dtype)
+    itemsize = dtype.itemsize
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(
+        (itemsize,) + tuple(shape))
+    values = np.ascontiguousarray(np.moveaxis(planes, 0, -1)).view(
+        '<u{}'.format(itemsize) if dtype.kind in 'iu' else
+        dtype.newbyteorder('<')).reshape(shape)
+    if dtype.kind in 'iu':
+        signed_dtype = np.dtype('<i{}'.format(itemsize))
+        signed = (values >> 1).view(signed_dtype) ^\
+            -(values & 1).view(signed_dtype)
+        for _ in range(order):
+            signed = np.cumsum(signed, axis=-1, dtype=signed_dtype)
+        values = signed.view(dtype.newbyteorder('<'))
+    # return
+    return values.astype(dtype, copy=False)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def encode_ecg(leads:Dict[str, np.ndarray], frequency:float,
+               scaling:Optional[Dict[str, tuple[float, float, float]]]=None,
+               uid:Optional[str]=None, wave_type:str=PDNames.WAVETYPE_RHYTHM,
+               order:int=2, compressor:str='zlib', level:Optional[int]=None,
+               ) -> bytes:
+    '''
+    Encodes the waveforms of a single ECG to a block.
+    
+    Parameters
+    ----------
+    leads : dict [`str`, `np.ndarray`]
+        The lead specific samples, of equal length and dtype.
+    frequency : `float`
+        The sampling frequency of `leads` in Hertz.
+    scaling : dict [`str`, `tuple` [`float`, `float`, `float`]], default `NoneType`
+        The lead specific sensitivity, baseline and correction factor of
+        integer samples, e.g. `WaveformScaling`.
+    uid : `str`, default `NoneType`
+        The ECG identifier.
+    wave_type : `str`, default `rhythm`
+        Either `rhythm` or `median`.
+    order : `int`, default 2
+        The order of the per-lead differences of integer samples.
+    compressor : {`zlib`, `lzma`, `zstd`}, default `zlib`
+        The compression of the samples; `zstd` requires the `zstandard`
+        package and is considerably faster at a similar ratio.
+    level : `int`, default `NoneType`
+        The compression level, using the compressor default if `NoneType`.
+    
+    Returns
+    -------
+    bytes
+        The block.
+    '''
+    is_type(leads, dict, 'leads')
+    is_type(scaling, (type(None), dict), 'scaling')
+    is_type(order, int, 'order')
+    is_type(compressor, str, 'compressor')
+    if not compressor in PDNames.CODEC_COMPRESSORS:
+        raise ValueError(Error_MSG.CHOICE_PARM.format(
+            'compressor', ', '.join(PDNames.CODEC_COMPRESSORS)))
+    names = list(leads)
+    matrix = np.stack([leads[n] for n in names]) if len(names) > 0 else\
+        np.empty((0, 0), dtype=np.int16)
+    header = {
+        PDNames.SOP_UID: uid,
+        PDNames.COL_WAVETYPE: wave_type,
+        PDNames.CODEC_LEADS: names,
+        PDNames.SF: float(frequency),
+        PDNames.CODEC_SHAPE: list(matrix.shape),
+        PDNames.CODEC_DTYPE: matrix.dtype.newbyteorder('<').str,
+        PDNames.CODEC_ORDER: order,
+        PDNames.CODEC_COMPRESSOR: compressor,
+        PDNames.LEAD_SCALING: None if scaling is None else
+        {n: list(scaling[n]) for n in names},
+    }
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    payload = _compress(encode_matrix(matrix, order=order), compressor,
+                        level=level)
+    # return
+    return PREAMBLE.pack(MAGIC, VERSION, len(header)) + header + payload
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def decode_ecg(block:bytes) -> Dict[str, Any]:
+    '''
+    Decodes a block written by `encode_ecg`.
+    
+    Parameters
+    ----------
+    block : bytes
+        A single block, e.g. read using the `WaveformIndex.tsv` offset and
+        length.
+    
+    Returns
+    -------
+    dict [`str`, `any`]
+        The header entries, with the lead specific samples under
+        `Waveforms`.
+    '''
+    magic, version, length = PREAMBLE.unpack_from(block)
+    if magic != MAGIC:
+        raise ValueError('The block does not start with the `ECGZ` magic.')
+    if version > VERSION:
+        raise ValueError(f'Unsupported `ECGZ` version: {version}.')
+    start = PREAMBLE.size
+    record = json.loads(block[start:start + length].decode('utf-8'))
+    matrix = decode_matrix(
+        _decompress(block[start + length:],
+                    record[PDNames.CODEC_COMPRESSOR]),
+        dtype=record[PDNames.CODEC_DTYPE],
+        shape=tuple(record[PDNames.CODEC_SHAPE]),
+        order=record[PDNames.CODEC_ORDER])
+    record[PDNames.LEAD_VOLTAGES] = dict(zip(record[PDNames.CODEC_LEADS],
+                                             matrix))
+    # return
+    return record
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def write_ecg_block(path:str, block:bytes, header:bool) -> tuple[int, int]:
+    '''
+    Writes a block to `path`, prefixed by its length, overwriting the file
+    if `header` is `True` and appending otherwise.
+    
+    Returns
+    -------
+    `tuple` [`int`, `int`]
+        The byte offset and length of the block, excluding the length
+        prefix, as recorded in `WaveformIndex.tsv`.
+    '''
+    with open(path, 'wb' if header == True else 'ab') as f:
+        f.write(struct.pack('<Q', len(block)))
+        offset = f.tell()
+        f.write(block)
+    return offset, len(block)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def read_ecg_block(path:str, offset:int, length:int) -> Dict[str, Any]:
+    '''
+    Decodes the block at `offset`, see `write_ecg_block`.
+    '''
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return decode_ecg(f.read(length))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def iter_ecgs(path:str) -> Iterator[Dict[str, Any]]:
+    '''
+    Decodes the blocks of a file one at a time.
+    
+    Parameters
+    ----------
+    path : `str`
+        A file written by `write_ecg_block`, e.g. `WaveForms.ecgz`.
+    
+    Yields
+    ------
+    dict [`str`, `any`]
+        The decoded blocks, see `decode_ecg`.
+    '''
+    with open(path, 'rb') as f:
+        while True:
+            size = f.read(8)
+            if len(size) < 8:
+                return
+            yield decode_ecg(f.read(struct.unpack('<Q', size)[0]))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def to_voltages(record:Dict[str, Any], dtype:str='float64',
+                ) -> Dict[str, np.ndarray]:
+    '''
+    Applies the stored scaling to the decoded samples.
+    
+    Parameters
+    ----------
+    record : dict [`str`, `any`]
+        A decoded block.
+    dtype : {`float64`, `float32`}, default `float64`
+        The floating point precision of the voltages.
+    
+    Returns
+    -------
+    dict [`str`, `np.ndarray`]
+        The lead specific voltages at the stored sampling frequency.
+    
+    Notes
+    -----
+    The scaling follows `ECGDICOMReader.to_voltages`, hence the voltages
+    are identical to those of the reader. Use the latter to also augment
+    and resample the integer samples stored with `raw_waveforms=True`.
+    '''
+    leads = record[PDNames.LEAD_VOLTAGES]
+    scaling = record[PDNames.LEAD_SCALING]
+    if scaling is None:
+        return leads
+    voltages = {}
+    for lead, raw in leads.items():
+        sensitivity, baseline, correction = scaling[lead]
+        voltages[lead] = np.multiply(raw, sensitivity * correction,
+                                     dtype=dtype) + baseline
+    # return
+    return voltages
@@ -10,6 +10,7 @@ class ProcessDicomNames(object):
     Names used in the process_dicom module.
     '''
     MEDIAN_PRESENT        = 'MedianWaveformPresent'
+    MEDIAN_DERIVED        = 'MedianWaveformDerived'
     WAVE_ARRAY            = 'Raw_Waveforms'
     LEAD_UNITS            = 'WaveformUnits'
     LEAD_UNITS2           = 'MedianWaveformUnits'
@@ -23,6 +24,53 @@ class ProcessDicomNames(object):
     CHANNEL_SOURCE_SEQ    = 'ChannelSourceSequence'
     CHANNEL_CODE_MEANING  = 'CodeMeaning'
     CHANNEL_SENS          = 'ChannelSensitivity'
+    CHANNEL_BASELINE      = 'ChannelBaseline'
+    CHANNEL_CORRECTION    = 'ChannelSensitivityCorrectionFactor'
+    LEAD_SCALING          = 'WaveformScaling'
+    LEAD_SCALING2         = 'MedianWaveformScaling'
+    SF_MEDIAN             = 'MedianSamplingFrequency'
+    DTYPES                = ['float64', 'float32']
+    FILTER_SETTINGS       = 'FilterSettings'
+    VRATE                 = 'VRate'
+    RR_INTERVAL           = 'RR Interval'
+    COL_N_BEATS           = 'DetectedBeats'
+    COL_HR                = 'DetectedHeartRate'
+    COL_RR_MEAN           = 'DetectedRRMean'
+    COL_SDNN              = 'DetectedSDNN'
+    COL_RMSSD             = 'DetectedRMSSD'
+    COL_PNN50             = 'DetectedpNN50'
+    COL_HR_DIFF           = 'HeartRateDifference'
+    COL_RR_DIFF           = 'RRIntervalDifference'
+    LEAD_LIMITS           = 'WaveformLimits'
+    BITS_ALLOCATED        = 'WaveformBitsAllocated'
+    SAMPLE_INTERPRETATION = 'WaveformSampleInterpretation'
+    SIGNED                = ['SS', 'SB']
+    UNSIGNED              = ['US', 'UB']
+    QUALITY               = 'QualityControl'
+    QUALITY_T             = 'QualityTable'
+    QUALITY_FILE          = 'QualityTable.tsv.gz'
+    COL_QC_NAN            = 'NaNCount'
+    COL_QC_FLAT           = 'FlatlineFraction'
+    COL_QC_CLIP           = 'ClippingFraction'
+    COL_QC_NOISE          = 'HFNoiseRatio'
+    COL_QC_DRIFT          = 'BaselineDrift'
+    WAVE_FORMATS          = ['tsv', 'ecgz']
+    WAVE_FORMAT_TSV       = 'tsv'
+    WAVE_FORMAT_CODEC     = 'ecgz'
+    WAVE_CODEC_FILE       = 'WaveForms.ecgz'
+    MEDIAN_CODEC_FILE     = 'MedianWaves.ecgz'
+    PREVIEW_CODEC_FILE    = 'WavePreview.ecgz'
+    WAVETYPE_PREVIEW      = 'rhythm_x{}'
+    CODEC_COMPRESSORS     = ['zlib', 'lzma', 'zstd']
+    CODEC_LEADS           = 'Leads'
+    CODEC_SHAPE           = 'Shape'
+    CODEC_DTYPE           = 'Dtype'
+    CODEC_ORDER           = 'DeltaOrder'
+    CODEC_COMPRESSOR      = 'Compressor'
+    VR_DA                 = 'DA'
+    VR_TM                 = 'TM'
+    VR_DT                 = 'DT'
+    UTC_OFFSET            = ' UTCOffset'
     CHANNEL_SENS_UNIT     = 'ChannelSensitivityUnitsSequence'
     STUDY_DATE            = 'StudyDate'
     STUDY_TIME            = 'StudyTime'
@@ -99,12 +147,96 @@ class ProcessDicomNames(object):
     PLOT_FIG              = 'fig'
     PLOT_FIGSIZE          = 'figsize'
     PLOT_SAMPLING_NUMBER  = 'sampling number'
+    PLOT_PREVIEWS         = 'ecg_previews'
     ECG_READER            = 'ECG_READER'
     INFO_TYPE             = 'info_type'
     INFO_TYPE_ALL         = 'all'
     INFO_TYPE_RTM         = 'rhythm'
     INFO_TYPE_MED         = 'median'
     INFO_TYPE_MET         = 'meta'
+    IMAGE_SHARD_FILE      = 'ImageShard_{}.npy'
+    IMAGE_INDEX_FILE      = 'ImageShard_{}.index.tsv'
+    IMAGE_SHARD_L         = 'ImageShardList'
+    COL_SHARD_ROW         = 'ShardRow'
+    PDF_COMBINED_FILE     = 'ECGPages_{}.pdf'
+    PDF_INDEX_FILE        = 'PdfIndex.tsv'
+    COL_PDF_FILE          = 'PdfFile'
+    COL_PDF_PAGE          = 'PdfPage'
+    ANNOTATIONS           = 'Annotations'
+    ANNOTATION_T          = 'AnnotationTable'
+    ANNOTATION_FILE       = 'AnnotationTable.tsv.gz'
+    REFERENCED_CHANNELS   = 'ReferencedWaveformChannels'
+    COL_ANN_CONCEPT       = 'Annotation'
+    COL_ANN_GROUP         = 'WaveformGroup'
+    COL_ANN_CHANNEL       = 'Channel'
+    COL_ANN_POSITION      = 'SamplePosition'
+    DUP_RAISE             = 'raise'
+    DUP_SKIP              = 'skip'
+    DUP_LATEST            = 'keep_latest'
+    DUP_DUPLICATE         = 'duplicate'
+    DUP_SUPERSEDED        = 'superseded'
+    DUP_REPLACES          = 'replaces_previous_run'
+    DUPLICATE_L           = 'DuplicateList'
+    DUPLICATE_FILE        = 'DuplicateFiles.txt'
+    COL_SOURCE_PATH       = 'SourcePath'
+    COL_OUTPUT_PATH       = 'OutputPath'
+    WAVE_INDEX_FILE       = 'WaveformIndex.tsv'
+    COL_BLOCK_FILE        = 'File'
+    COL_BLOCK_OFFSET      = 'Offset'
+    COL_BLOCK_LENGTH      = 'Length'
+    SHARD_PREFIX          = 'Shard_{}_'
+    SHARD_MANIFEST_FILE   = 'ShardManifest.tsv'
+    SHARD_MANIFEST_T      = 'ShardManifest'
+    COL_SHARD             = 'Shard'
+    COL_SHARD_BATCH       = 'Batch'
+    COL_SHARD_ECGS        = 'NumberECGs'
+    COL_SHARD_BYTES       = 'Bytes'
+    COL_SHARD_FIRST       = 'FirstUID'
+    COL_SHARD_LAST        = 'LastUID'
+    PARTITION_PREFIX      = 'Partition_{}_of_{}_'
+    PARTITION_MANIFEST_FILE = 'PartitionManifest.tsv'
+    PARTITION_PATH        = 'path'
+    PARTITION_UID         = 'uid'
+    COL_PARTITION         = 'Partition'
+    COL_PARTITIONS        = 'NumberPartitions'
+    SOP_UID_DICOM         = 'SOPInstanceUID'
+    QUARANTINE_L          = 'QuarantineList'
+    QUARANTINE_FILE       = 'QuarantineFiles.txt'
+    QUARANTINE_TIMEOUT    = 'timeout'
+    QUARANTINE_MEMORY     = 'memory'
+    QUARANTINE_CRASH      = 'crash'
+    BATCH_SIZES           = 'BatchSizes'
+    BACKPRESSURE          = 'BackpressureSeconds'
+    TELEMETRY_PROM        = 'prometheus'
+    TELEMETRY_JSONL       = 'jsonl'
+    TELEMETRY_FORMATS     = [TELEMETRY_PROM, TELEMETRY_JSONL]
+    TELEMETRY_EXTENSIONS  = {TELEMETRY_PROM: '.prom', TELEMETRY_JSONL: '.jsonl'}
+    TELEMETRY_FILE        = 'Metrics'
+    TELEMETRY_FILES       = 'files'
+    TELEMETRY_BYTES       = 'bytes'
+    TELEMETRY_ECGS        = 'ecgs'
+    TELEMETRY_READER      = 'reader'
+    TELEMETRY_WRITER      = 'writer'
+    TELEMETRY_DEPTH       = 'readahead_depth'
+    TELEMETRY_CAPACITY    = 'readahead_size'
+    FAIL_UNREADABLE       = 'unreadable'
+    FAIL_NO_DATA          = 'no_data'
+    FAIL_DUPLICATE        = 'duplicate'
+    FAIL_QUARANTINE       = 'quarantine'
+    PROFILER              = 'Profiler'
+    PROFILE_READ          = 'read'
+    PROFILE_TABLES        = 'tables'
+    PROFILE_WRITE         = 'write'
+    PROFILE_FILE          = 'Profile_{}.pstats'
+    PROFILE_SUMMARY_FILE  = 'ProfileSummary.tsv'
+    PROFILE_COMPONENT_FILE= 'ProfileComponents.tsv'
+    COL_PROFILE_STAGE     = 'Stage'
+    COL_PROFILE_COMPONENT = 'Component'
+    COL_PROFILE_FUNCTION  = 'Function'
+    COL_PROFILE_CALLS     = 'Calls'
+    COL_PROFILE_TOTAL     = 'TotalSeconds'
+    COL_PROFILE_CUMULATIVE= 'CumulativeSeconds'
+    COL_PROFILE_FRACTION  = 'Fraction'
 
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 @dataclass
@@ -1,13 +1,16 @@
 '''
 Error handeling for ECGProcess.
 '''
+from __future__ import annotations
 import os
 import inspect
 import warnings
-import pandas as pd
 # import numpy as np
 from packaging import version
 from typing import Any, List, Type, Union, Tuple, Callable
+from ecgprocess.lazy_imports import LazyModule
+# NOTE pandas is imported on first use
+pd = LazyModule('pandas')
 
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 
@@ -245,6 +248,7 @@ class STDOUT_MSG(object):
     A collection of stdout messages.
     '''
     PROCESSING_PATH = 'Processing path: {}.'
+    BATCH_SIZES = 'Batch sizes: {}, readers blocked for {:.1f}s.'
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 class MissingDICOMTagError(Exception):
@@ -264,5 +268,18 @@ class NotCalledError(Exception):
         self.message = message
         super().__init__(self.message)
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class QuarantineError(Exception):
+    '''
+    Raised when a file exceeded the time or memory limit of an isolated
+    reader, or crashed its worker process.
+    '''
+    def __init__(self, path, reason, seconds):
+        self.path = path
+        self.reason = reason
+        self.seconds = seconds
+        super().__init__(f"`{path}` was quarantined after {seconds:.1f}s: "
+                         f"{reason}.")
+
 
 
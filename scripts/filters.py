@@ -0,0 +1,266 @@
+'''
+Zero-phase digital filtering of ECG waveforms, removing baseline wander,
+out-of-band noise and power line interference.
+
+The second-order sections (SOS) are designed once per sampling frequency
+and band and cached, hence filtering many files with the same settings only
+incurs the `sosfiltfilt` call.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import functools
+import numpy as np
+from typing import (
+    Dict, Optional, Tuple,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+# NOTE imported on first use
+signal = LazyModule('scipy.signal')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class ECGFilter(object):
+    '''
+    Applies zero-phase baseline removal, bandpass and notch filters along the
+    sample axis of a lead matrix, or of a batch of ECGs.
+    
+    Attributes
+    ----------
+    bandpass : `tuple` [`float` or `NoneType`, `float` or `NoneType`]
+        The lower and upper cut-off frequencies in Hertz, either may be
+        `NoneType` for a high- or lowpass filter.
+    notch : `float` or `NoneType`
+        The power line frequency in Hertz.
+    baseline : `float` or `NoneType`
+        The cut-off frequency in Hertz of the highpass filter removing
+        baseline wander.
+    order : `int`
+        The Butterworth filter order of the bandpass and baseline filters.
+    quality : `float`
+        The quality factor of the notch filter.
+    
+    Methods
+    -------
+    filter_array(array, frequency)
+        Filters an array of lead signals, or a batch of ECGs.
+    filter_leads(leads, frequency)
+        Filters a dictionary of lead signals as a single matrix.
+    settings()
+        A string describing the applied filters.
+    
+    Notes
+    -----
+    Each filter runs forwards and backwards (`scipy.signal.sosfiltfilt`),
+    so the filtered signals are not phase-shifted. Cut-off frequencies at or
+    above the Nyquist frequency are ignored. Only the rhythm waveforms are
+    filtered, the median beats are typically filtered by the vendor.
+    
+    Example
+    -------
+    >>> ecgfilter = ECGFilter(bandpass=(None, 150), notch=50, baseline=0.5)
+    >>> reader = ECGDICOMReader(ecgfilter=ecgfilter)
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self,
+                 bandpass:Optional[Tuple[float|None, float|None]]=(0.5, 150),
+                 notch:Optional[float]=None,
+                 baseline:Optional[float]=None,
+                 order:int=4, quality:float=30.0,
+                 ) -> None:
+        """
+        Initialises a new instance of `ECGFilter`.
+        
+        Parameters
+        ----------
+        bandpass : `tuple` [`float`, `float`], default (0.5, 150)
+            The lower and upper cut-off frequencies in Hertz, set either to
+            `NoneType` for a high- or lowpass filter, or set `bandpass` to
+            `NoneType` to skip this filter.
+        notch : `float`, default `NoneType`
+            The power line frequency (e.g. 50 or 60 Hertz) to remove.
+        baseline : `float`, default `NoneType`
+            The cut-off frequency of a separate highpass filter removing
+            baseline wander, e.g. 0.5 Hertz.
+        order : `int`, default 4
+            The Butterworth filter order.
+        quality : `float`, default 30.0
+            The quality factor of the notch filter.
+        """
+        is_type(bandpass, (type(None), tuple), 'bandpass')
+        is_type(notch, (type(None), int, float), 'notch')
+        is_type(baseline, (type(None), int, float), 'baseline')
+        is_type(order, int, 'order')
+        is_type(quality, (int, float), 'quality')
+        if bandpass is not None and len(bandpass) != 2:
+            raise ValueError('`bandpass` should contain a lower and upper '
+                             'cut-off frequency.')
+        if order < 1:
+            raise ValueError('`order` should be larger than 0.')
+        self.bandpass = bandpass
+        self.notch = notch
+        self.baseline = baseline
+        self.order = order
+        self.quality = quality
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __str__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME} instance with {self.settings()}."
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(bandpass={self.bandpass}, notch={self.notch}, "
+                f"baseline={self.baseline}, order={self.order}, "
+                f"quality={self.quality})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def settings(self) -> str:
+        '''
+        A string describing the filters, e.g.
+        `bandpass=0.5-150;notch=50;baseline=NA`, recorded in the metadata.
+        '''
+        band = 'NA' if self.bandpass is None else '-'.join(
+            'NA' if b is None else str(b) for b in self.bandpass)
+        return 'bandpass={};notch={};baseline={}'.format(
+            band, 'NA' if self.notch is None else self.notch,
+            'NA' if self.baseline is None else self.baseline)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _get_sos(self, frequency:float) -> list[np.ndarray]:
+        '''
+        The (cached) second-order sections of the filters at a sampling
+        frequency.
+        '''
+        sos = []
+        if self.baseline is not None:
+            sos.append(design_sos(frequency, (self.baseline, None),
+                                  order=self.order))
+        if self.bandpass is not None:
+            sos.append(design_sos(frequency, self.bandpass, order=self.order))
+        if self.notch is not None:
+            sos.append(design_notch(frequency, self.notch,
+                                    quality=self.quality))
+        return [s for s in sos if s is not None]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def filter_array(self, array:np.ndarray, frequency:float,
+                     ) -> np.ndarray:
+        '''
+        Filters the last (sample) axis of an array.
+        
+        Parameters
+        ----------
+        array : np.ndarray
+            A (leads, samples) lead matrix, or a (ECGs, leads, samples) batch
+            of ECGs sharing the same sampling frequency and length.
+        frequency : `float`
+            The sampling frequency in Hertz.
+        
+        Returns
+        -------
+        np.ndarray
+            The filtered array, with the dtype of `array`.
+        
+        Notes
+        -----
+        Leads with missing values are returned as NaN.
+        '''
+        is_type(array, np.ndarray, 'array')
+        is_type(frequency, (int, float, np.integer, np.floating), 'frequency')
+        filtered = array
+        for sos in self._get_sos(float(frequency)):
+            filtered = signal.sosfiltfilt(sos, filtered, axis=-1)
+        # return
+        return filtered.astype(array.dtype, copy=False)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def filter_leads(self, leads:Dict[str, np.ndarray], frequency:float,
+                     ) -> Dict[str, np.ndarray]:
+        '''
+        Filters a dictionary of lead signals, stacking these to a single
+        matrix so all leads are filtered by one call per filter.
+        
+        Parameters
+        ----------
+        leads : dict [`str`, `np.ndarray`]
+            The lead specific signals, which should have equal length.
+        frequency : `float`
+            The sampling frequency in Hertz.
+        
+        Returns
+        -------
+        dict [`str`, `np.ndarray`]
+            The filtered lead signals.
+        '''
+        is_type(leads, dict, 'leads')
+        if len(leads) == 0:
+            return leads
+        names = list(leads)
+        matrix = self.filter_array(np.stack([leads[n] for n in names]),
+                                   frequency=frequency)
+        # return
+        return dict(zip(names, matrix))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@functools.lru_cache(maxsize=None)
+def design_sos(frequency:float, band:Tuple[float|None, float|None],
+               order:int=4) -> np.ndarray|None:
+    '''
+    Designs a Butterworth band-, high- or lowpass filter, cached per
+    sampling frequency, band and order.
+    
+    Parameters
+    ----------
+    frequency : `float`
+        The sampling frequency in Hertz.
+    band : `tuple` [`float` or `NoneType`, `float` or `NoneType`]
+        The lower and upper cut-off frequency.
+    order : `int`, default 4
+        The filter order.
+    
+    Returns
+    -------
+    np.ndarray or `NoneType`
+        The second-order sections, or `NoneType` if neither cut-off is
+        below the Nyquist frequency. The cached array is shared between
+        calls and should not be modified.
+    '''
+    low, high = band
+    nyquist = frequency / 2
+    if high is not None and high >= nyquist:
+        high = None
+    if low is not None and (low <= 0 or low >= nyquist):
+        low = None
+    if low is None and high is None:
+        return None
+    if low is not None and high is not None:
+        btype, cutoff = 'bandpass', [low, high]
+    elif low is not None:
+        btype, cutoff = 'highpass', low
+    else:
+        btype, cutoff = 'lowpass', high
+    sos = signal.butter(order, cutoff, btype=btype, fs=frequency,
+                        output='sos')
+    # return
+    return sos
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@functools.lru_cache(maxsize=None)
+def design_notch(frequency:float, notch:float, quality:float=30.0,
+                 ) -> np.ndarray|None:
+    '''
+    Designs a notch filter as second-order sections, cached per sampling
+    frequency, notch frequency and quality factor. Returns `NoneType` if the
+    notch is not below the Nyquist frequency.
+    '''
+    if notch <= 0 or notch >= frequency / 2:
+        return None
+    b, a = signal.iirnotch(notch, quality, fs=frequency)
+    sos = signal.tf2sos(b, a)
+    # return
+    return sos
@@ -0,0 +1,217 @@
+'''
+Reads dicom files in an isolated worker process with a per-file time and
+memory limit, so a single pathological file (e.g. a huge or corrupt
+waveform hanging `dcmread`) cannot stall or crash a batch extraction.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import time
+import multiprocessing
+from typing import (
+    Any, Optional,
+)
+from ecgprocess.errors import (
+    is_type,
+    QuarantineError,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _worker(conn:Any, reader:Any, memory_limit:Optional[int]) -> None:
+    '''
+    The worker loop, reading the paths received through `conn` and sending
+    back the called reader or the raised exception.
+    '''
+    if memory_limit is not None:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS,
+                               (memory_limit, memory_limit))
+        except (ImportError, ValueError, OSError):
+            # NOTE not available on Windows, the time limit still applies
+            pass
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        path, kwargs = task
+        try:
+            conn.send((True, reader(path, **kwargs)))
+        except MemoryError:
+            conn.send((False, PDNames.QUARANTINE_MEMORY))
+        except Exception as error:
+            try:
+                conn.send((False, error))
+            except Exception:
+                # an exception which cannot be pickled
+                conn.send((False, RuntimeError(repr(error))))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class IsolatedReader(object):
+    '''
+    Calls an `ECGDICOMReader` in a persistent worker process, restarting the
+    worker if a file exceeds the time limit or crashes it.
+    
+    Attributes
+    ----------
+    reader : ECGDICOMReader
+        The reader called by the worker.
+    timeout : `float` or `NoneType`
+        The maximum number of seconds per file.
+    memory_limit : `int` or `NoneType`
+        The maximum address space of the worker in bytes.
+    
+    Methods
+    -------
+    close()
+        Stops the worker process.
+    
+    Notes
+    -----
+    Exceptions raised by the reader (e.g. the `AttributeError` of a file
+    without waveforms) are raised again in the calling process. Files which
+    exceed the limits, or terminate the worker, raise a `QuarantineError`
+    with the reason (`timeout`, `memory` or `crash`) and the seconds taken.
+    The memory limit uses `resource.RLIMIT_AS` and is ignored on platforms
+    without the `resource` module.
+    
+    Example
+    -------
+    >>> with IsolatedReader(ECGDICOMReader(), timeout=30) as reader:
+    ...     ecg_inst = reader(path)
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, reader:Any, timeout:Optional[float]=None,
+                 memory_limit:Optional[int]=None,
+                 ) -> None:
+        """
+        Initialises a new instance of `IsolatedReader`, the worker is started
+        on the first call.
+        
+        Parameters
+        ----------
+        reader : ECGDICOMReader
+            The reader called for each file.
+        timeout : `float`, default `NoneType`
+            The maximum number of seconds per file, `NoneType` for no limit.
+        memory_limit : `int`, default `NoneType`
+            The maximum address space of the worker in bytes, `NoneType` for
+            no limit.
+        """
+        is_type(timeout, (type(None), int, float), 'timeout')
+        is_type(memory_limit, (type(None), int), 'memory_limit')
+        if (timeout is not None and timeout <= 0) or\
+                (memory_limit is not None and memory_limit <= 0):
+            raise ValueError('`timeout` and `memory_limit` should be larger '
+                             'than 0.')
+        self.reader = reader
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._process = None
+        self._conn = None
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(timeout={self.timeout}, "
+                f"memory_limit={self.memory_limit})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __enter__(self) -> IsolatedReader:
+        return self
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __exit__(self, *args:Any) -> None:
+        self.close()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _start(self) -> None:
+        '''
+        Starts the worker process.
+        '''
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_worker, args=(child, self.reader, self.memory_limit),
+            daemon=True)
+        self._process.start()
+        child.close()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _kill(self) -> None:
+        '''
+        Terminates the worker process, which is restarted on the next call.
+        '''
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+        self._process, self._conn = None, None
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __call__(self, path:str, **kwargs:Any) -> Any:
+        '''
+        Reads a single dicom file in the worker process.
+        
+        Parameters
+        ----------
+        path : `str`
+            The dicom file.
+        **kwargs : any
+            Keyword arguments for the call method of the reader.
+        
+        Returns
+        -------
+        ECGDICOMReader
+            The called reader returned by the worker.
+        
+        Raises
+        ------
+        QuarantineError
+            If the file exceeded the limits or crashed the worker.
+        '''
+        if self._process is None or not self._process.is_alive():
+            self._kill()
+            self._start()
+        start = time.perf_counter()
+        try:
+            self._conn.send((path, kwargs))
+            ready = self._conn.poll(self.timeout)
+        except (BrokenPipeError, EOFError):
+            ready = True
+        if ready == False:
+            self._kill()
+            raise QuarantineError(path, PDNames.QUARANTINE_TIMEOUT,
+                                  time.perf_counter() - start)
+        try:
+            success, result = self._conn.recv()
+        except (EOFError, ConnectionResetError):
+            exitcode = self._process.exitcode if self._process is not None\
+                else None
+            self._kill()
+            raise QuarantineError(
+                path, PDNames.QUARANTINE_CRASH + f' (exit code {exitcode})',
+                time.perf_counter() - start)
+        if success == True:
+            return result
+        if result == PDNames.QUARANTINE_MEMORY:
+            # NOTE the worker may be left fragmented, start afresh
+            self._kill()
+            raise QuarantineError(path, PDNames.QUARANTINE_MEMORY,
+                                  time.perf_counter() - start)
+        raise result
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def close(self) -> None:
+        '''
+        Stops the worker process.
+        '''
+        if self._process is not None and self._process.is_alive():
+            try:
+                self._conn.send(None)
+                self._process.join(timeout=5)
+            except (BrokenPipeError, OSError):
+                pass
+        self._kill()
@@ -0,0 +1,62 @@
+'''
+Deferred imports of the heavier dependencies (pandas, matplotlib, scipy),
+so processes which only decode waveforms to arrays start quickly.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import sys
+import types
+import importlib
+from typing import Any
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class LazyModule(types.ModuleType):
+    '''
+    A module placeholder which imports the module on first attribute access.
+
+    Parameters
+    ----------
+    name : `str`
+        The full module name, e.g. `matplotlib.pylab`.
+
+    Example
+    -------
+    >>> pd = LazyModule('pandas')
+    >>> 'pandas' in sys.modules
+    False
+    >>> table = pd.DataFrame()
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, name:str) -> None:
+        super().__init__(name)
+        self.__dict__['_module'] = None
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(name={self.__name__}, "
+                f"loaded={self._module is not None})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _load(self) -> types.ModuleType:
+        '''
+        Imports the module, once.
+        '''
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self.__name__)
+        return self._module
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __getattr__(self, attr:str) -> Any:
+        return getattr(self._load(), attr)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __dir__(self) -> list[str]:
+        return dir(self._load())
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def is_imported(name:str) -> bool:
+    '''
+    Whether a module has been imported by the current process.
+    '''
+    return name in sys.modules
@@ -0,0 +1,293 @@
+'''
+Deterministic partitioning of dicom path lists, so that an archive can be
+split across several servers without a coordinator, and merging of the
+partition manifests written by `ECGDICOMTable.write_ecg`.
+
+Example
+-------
+Each server extracts its own partition, e.g. the second of four:
+
+>>> python -m ecgprocess.run_batches E:/ECG_input E:/ECG_output \\
+...     --partition 1/4 --partition-by uid
+
+after which the manifests are combined and checked:
+
+>>> python -m ecgprocess.partitions E:/ECG_output -o merged_manifest.tsv
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import os
+import re
+import sys
+import glob
+import hashlib
+import argparse
+from pydicom import dcmread
+from typing import (
+    List, Optional, Literal, Tuple,
+)
+from ecgprocess.errors import (
+    is_type,
+    Error_MSG,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+pd = LazyModule('pandas')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def parse_partition(partition:str|Tuple[int, int]) -> Tuple[int, int]:
+    '''
+    Parses a partition specification.
+    
+    Parameters
+    ----------
+    partition : `str` or `tuple` [`int`, `int`]
+        The partition as `i/N` or `(i, N)`, with `i` the zero-based
+        partition number and `N` the number of partitions.
+    
+    Returns
+    -------
+    `tuple` [`int`, `int`]
+        The partition number and the number of partitions.
+    '''
+    is_type(partition, (str, tuple), 'partition')
+    try:
+        if isinstance(partition, str):
+            i, n = (int(s) for s in partition.split('/'))
+        else:
+            i, n = (int(s) for s in partition)
+    except ValueError:
+        raise ValueError('`partition` should be formatted as `i/N`, not '
+                         f'`{partition}`.')
+    if n < 1 or i < 0 or i >= n:
+        raise ValueError('`partition` `i/N` requires 0 <= i < N, not '
+                         f'`{partition}`.')
+    # return
+    return i, n
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def partition_of(key:str, n:int) -> int:
+    '''
+    The partition of a key, based on a stable hash.
+    
+    Parameters
+    ----------
+    key : `str`
+        The relative file path or SOPinstanceUID.
+    n : `int`
+        The number of partitions.
+    
+    Returns
+    -------
+    int
+    
+    Notes
+    -----
+    Unlike the built-in `hash` the blake2b digest does not depend on the
+    process or platform, hence every server assigns a key to the same
+    partition.
+    '''
+    digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % n
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def partition_prefix(partition:str|Tuple[int, int]) -> str:
+    '''
+    The file name prefix of a partition, e.g. `Partition_00001_of_00004_`.
+    '''
+    i, n = parse_partition(partition)
+    return PDNames.PARTITION_PREFIX.format(str(i).zfill(5), str(n).zfill(5))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _path_key(path:str, root:Optional[str]=None) -> str:
+    '''
+    The path relative to `root` using forward slashes, so the key does not
+    depend on the mount point or platform.
+    '''
+    if root is not None:
+        path = os.path.relpath(path, root)
+    return str(path).replace('\\', '/')
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _peek_uid(path:str) -> str|None:
+    '''
+    Reads the SOPinstanceUID from the dicom header, without loading the
+    waveform data. Returns `NoneType` for unreadable files.
+    '''
+    try:
+        header = dcmread(path, specific_tags=[PDNames.SOP_UID_DICOM],
+                         stop_before_pixels=True, defer_size='1 KB')
+        return str(getattr(header, PDNames.SOP_UID_DICOM))
+    except Exception:
+        return None
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def select_partition(paths:List[str], partition:str|Tuple[int, int],
+                     by:Literal['path', 'uid']='path',
+                     root:Optional[str]=None,
+                     ) -> List[str]:
+    '''
+    Selects the paths belonging to a partition.
+    
+    Parameters
+    ----------
+    paths : list [`str`]
+        The dicom file paths.
+    partition : `str` or `tuple` [`int`, `int`]
+        The partition as `i/N` or `(i, N)`.
+    by : {`path`, `uid`}, default `path`
+        Whether to hash the file path or the SOPinstanceUID. The latter
+        requires a header read of every path, but assigns all copies of an
+        ECG to the same partition so duplicates are handled within a
+        partition.
+    root : `str`, default `NoneType`
+        The paths are hashed relative to `root`, which allows servers to
+        mount the archive at different locations.
+    
+    Returns
+    -------
+    list [`str`]
+        The paths of the partition, in the original order.
+    
+    Notes
+    -----
+    Files without a readable SOPinstanceUID are assigned by their path, so
+    these are reported as failed by exactly one partition.
+    '''
+    is_type(paths, list, 'paths')
+    is_type(root, (type(None), str), 'root')
+    BY = [PDNames.PARTITION_PATH, PDNames.PARTITION_UID]
+    if not by in BY:
+        raise ValueError(Error_MSG.CHOICE_PARM.format('by', ', '.join(BY)))
+    i, n = parse_partition(partition)
+    selected = []
+    for p in paths:
+        key = _peek_uid(p) if by == PDNames.PARTITION_UID else None
+        if key is None:
+            key = _path_key(p, root=root)
+        if partition_of(key, n) == i:
+            selected.append(p)
+    # return
+    return selected
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def merge_partitions(manifests:List[str], uids:Optional[List[str]]=None,
+                     target:Optional[str]=None,
+                     ) -> pd.DataFrame:
+    '''
+    Combines the partition manifests and checks that every partition is
+    present and that no SOPinstanceUID is missing or duplicated.
+    
+    Parameters
+    ----------
+    manifests : list [`str`]
+        The `PartitionManifest.tsv` files, or directories which are searched
+        for these.
+    uids : list [`str`], default `NoneType`
+        The expected SOPinstanceUIDs, e.g. from an earlier catalog. If
+        supplied, UIDs absent from all partitions are reported as missing.
+    target : `str`, default `NoneType`
+        An optional path the merged manifest is written to.
+    
+    Returns
+    -------
+    pd.DataFrame
+        The merged manifest, sorted by partition.
+    
+    Raises
+    ------
+    ValueError
+        If partitions are missing, the manifests disagree on the number of
+        partitions, or expected UIDs are missing.
+    IndexError
+        If a SOPinstanceUID was written by more than one partition, or
+        more than once by the same partition.
+    '''
+    is_type(manifests, list, 'manifests')
+    is_type(uids, (type(None), list), 'uids')
+    is_type(target, (type(None), str), 'target')
+    files = []
+    for m in manifests:
+        if os.path.isdir(m):
+            files.extend(sorted(glob.glob(os.path.join(
+                m, '**', '*' + PDNames.PARTITION_MANIFEST_FILE),
+                recursive=True)))
+        else:
+            files.append(m)
+    if len(files) == 0:
+        raise ValueError('No partition manifests were found.')
+    merged = pd.concat([pd.read_csv(f, sep='\t', dtype=str) for f in files],
+                       ignore_index=True)
+    merged[[PDNames.COL_PARTITION, PDNames.COL_PARTITIONS]] =\
+        merged[[PDNames.COL_PARTITION, PDNames.COL_PARTITIONS]].astype(int)
+    # #### the partitions, including those without any written ECGs
+    # NOTE the file names carry the partition, the rows may be absent
+    seen = set(zip(merged[PDNames.COL_PARTITION],
+                   merged[PDNames.COL_PARTITIONS]))
+    PATTERN = PDNames.PARTITION_PREFIX.format(r'(\d+)', r'(\d+)')
+    for f in files:
+        match = re.search(PATTERN, os.path.basename(f))
+        if match is not None:
+            seen.add((int(match.group(1)), int(match.group(2))))
+    n = sorted(set(s[1] for s in seen))
+    if len(n) != 1:
+        raise ValueError('The manifests combine different numbers of '
+                         f'partitions: {n}.')
+    n = n[0]
+    absent = sorted(set(range(n)) - set(s[0] for s in seen))
+    if len(absent) > 0:
+        raise ValueError(f'Partitions {absent} of {n} are missing.')
+    # #### duplicated and missing UIDs
+    duplicated = merged[merged[PDNames.SOP_UID].duplicated(keep=False)]
+    if duplicated.shape[0] > 0:
+        raise IndexError('The following SOPinstanceUIDs were written more '
+                         'than once: {}.'.format(
+                             duplicated[[PDNames.SOP_UID,
+                                         PDNames.COL_PARTITION]].
+                             to_dict(orient='records')))
+    if uids is not None:
+        missing = sorted(set(uids) - set(merged[PDNames.SOP_UID]))
+        if len(missing) > 0:
+            raise ValueError('The following SOPinstanceUIDs are missing '
+                             f'from all partitions: {missing}.')
+    merged = merged.sort_values(PDNames.COL_PARTITION, kind='stable',
+                                ignore_index=True)
+    if target is not None:
+        merged.to_csv(target, sep='\t', header=True, index=False)
+    # return
+    return merged
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main(argv:Optional[List[str]]=None) -> None:
+    '''
+    The command-line merge step, see `--help`.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Merge and check the partition manifests.')
+    parser.add_argument('manifests', nargs='+',
+                        help='Manifest files or output directories.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='The merged manifest file.')
+    parser.add_argument('--uids', default=None,
+                        help='A file with the expected SOPinstanceUIDs, one '
+                        'per line.')
+    args = parser.parse_args(argv)
+    uids = None
+    if args.uids is not None:
+        with open(args.uids) as f:
+            uids = [l.strip() for l in f if l.strip() != '']
+    merged = merge_partitions(args.manifests, uids=uids, target=args.output)
+    print('Merged {} ECGs from {} manifests.'.format(
+        merged.shape[0], len(args.manifests)), file=sys.stdout)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+    main()
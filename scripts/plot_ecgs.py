@@ -29,6 +29,14 @@ from ecgprocess.utils.general import (
     assign_empty_default,
     _update_kwargs,
 )
+from ecgprocess.pyramid import (
+    minmax_decimate,
+    select_level,
+    envelope_positions,
+)
+from ecgprocess.codec import (
+    to_voltages,
+)
 
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 
@@ -117,6 +125,9 @@ class ECGDrawing(object):
                  auto_margins:bool=True,
                  verbose:bool=True,
                  ax:plt.Axes | None=None,
+                 preview:bool=False,
+                 previews:list[dict[str, Any]] | None=None,
+                 dpi:float | None=None,
                  ) -> Self:
         '''
         Creates an ECG drawing using either the waveforms `rhythm` or the median
@@ -152,6 +163,20 @@ class ECGDrawing(object):
             canonical ECG image (using an A4 size y and x-axis aspect ratio).
         verbose : `bool`, default `False`
             Prints missing files if skip_missing is set to `True`.
+        preview : `bool`, default `False`
+            Whether to draw a low-resolution min/max envelope of each lead,
+            decimated to about one min/max pair per pixel column of the
+            figure (see `pyramid.minmax_decimate`). This is considerably
+            faster for thumbnails while retaining the QRS amplitudes.
+        previews : `list` [`dict` [`str`, `any`]], default `NoneType`
+            The decoded preview levels of the ECG written by `write_ecg` with
+            `preview_levels`, e.g. from `WaveformIndex.load_previews`. If
+            supplied, `preview` draws the stored level matching the pixel
+            width, or the full resolution signal if no level is coarse
+            enough, instead of decimating the signal.
+        dpi : `float`, default `NoneType`
+            The figure resolution, set before drawing so the preview level
+            matches the pixel width of the output image.
         
         Attributes
         ----------
@@ -214,6 +239,9 @@ class ECGDrawing(object):
         is_type(minor_axis, bool)
         is_type(ax, (type(None), plt.Axes))
         is_type(image_layout, (type(None), list))
+        is_type(preview, bool)
+        is_type(previews, (type(None), list))
+        is_type(dpi, (type(None), int, float))
         self.verbose = verbose
         # confirm wave_type
         setattr(self, PDNames.WAVE_TYPE, wave_type)
@@ -244,8 +272,7 @@ class ECGDrawing(object):
         setattr(self, PDNames.ECG_READER, ecgreader)
         if getattr(self, PDNames.WAVE_TYPE) == PDNames.WAVETYPE_RHYTHM:
             setattr(self, PDNames.ECG_SIGNAL,
-                    getattr(getattr(self, PDNames.ECG_READER),
-                            PDNames.LEAD_VOLTAGES)
+                    getattr(self, PDNames.ECG_READER).get_voltages()
                     )
             setattr(self, PDNames.PLOT_SAMPLING_NUMBER,
                     getattr(getattr(self, PDNames.ECG_READER),
@@ -253,7 +280,7 @@ class ECGDrawing(object):
                     )
         else:
             setattr(self, PDNames.ECG_SIGNAL,
-                    getattr(getattr(self, PDNames.ECG_READER), PDNames.LEAD_VOLTAGES2)
+                    getattr(self, PDNames.ECG_READER).get_voltages(median=True)
                     )
             # multiplying this by the maximum number of columns in any row
             # of plot_layout
@@ -263,6 +290,13 @@ class ECGDrawing(object):
                         PDNames.RESULTS_DICT)[PDNames.SAMPLING_NUMBER_M]*\
                     max(len(l) for l in getattr(self, PDNames.PLOT_LAYOUT))
                     )
+        # #### get the stored preview levels, by decimation factor
+        levels = {}
+        for record in [] if previews is None else previews:
+            factor = int(record[PDNames.COL_WAVETYPE][
+                len(PDNames.WAVETYPE_PREVIEW.format('')):])
+            levels[factor] = to_voltages(record)
+        setattr(self, PDNames.PLOT_PREVIEWS, levels)
         # #### convert microvolts (µV) to millivolts (mV)
         try:
             unit = getattr(getattr(self, PDNames.ECG_READER),
@@ -279,6 +313,10 @@ class ECGDrawing(object):
                     {k:v/1000 for k,v in\
                      getattr(self, PDNames.ECG_SIGNAL).items()}
                     )
+            setattr(self, PDNames.PLOT_PREVIEWS,
+                    {f: {k:v/1000 for k,v in l.items()} for f, l in\
+                     getattr(self, PDNames.PLOT_PREVIEWS).items()}
+                    )
             pass
         elif unit == PDNames.MILLIVOLT:
             # already correct units
@@ -296,13 +334,20 @@ class ECGDrawing(object):
                     {self.update_keys.get(k, k): v for k, v in\
                   getattr(self, PDNames.ECG_SIGNAL).items()}
                     )
+            setattr(self, PDNames.PLOT_PREVIEWS,
+                    {f: {self.update_keys.get(k, k): v for k, v in l.items()}
+                     for f, l in getattr(self, PDNames.PLOT_PREVIEWS).items()}
+                    )
         # #### create figure
         self._set_canvas(auto_margins=auto_margins, ax=ax)
+        # NOTE before drawing, the preview level depends on the pixel width
+        if dpi is not None:
+            getattr(self, PDNames.PLOT_FIG).set_dpi(dpi)
         if add_grid == True:
             self._draw_grid(minor_axis=minor_axis)
         # #### draw ecg signal
         self._draw_signal(layout=getattr(self, PDNames.PLOT_LAYOUT),
-                          start_pos=start_pos,
+                          start_pos=start_pos, preview=preview,
                           )
         # #### return self
         return self
@@ -441,6 +486,7 @@ class ECGDrawing(object):
                      figsize:tuple[float, float] | None=None,
                      wave_type:Literal['rhythm', 'media'] | None=None,
                      start_pos:Literal['first', 'continues']= 'first',
+                     preview:bool=False,
                      kwargs_signal:dict[Any, Any] | None=None,
                      kwargs_text:dict[Any, Any] | None=None,
                      ) -> None:
@@ -461,6 +507,9 @@ class ECGDrawing(object):
             the previous lead stopped.
         wave_type : {'rhythm', 'median'}, default `rhythm`
             The type of signal to plot, will update the `wave_type` attribute.
+        preview : `bool`, default `False`
+            Whether to draw the min/max envelope matched to the pixel width,
+            using the stored preview levels if available.
         kwargs_*_dict : `dict` [`any`, `any`], default `NoneType`
             Optional arguments supplied to the various plotting functions:
                 kwargs_signal        --> ax.plot
@@ -471,6 +520,7 @@ class ECGDrawing(object):
         is_type(wave_type, (type(None),str))
         is_type(layout, (type(None), list))
         is_type(figsize, (type(None), tuple))
+        is_type(preview, bool)
         setattr(self, PDNames.PLOT_LAYOUT, layout)
         # set wave type
         if not wave_type is None:
@@ -506,6 +556,10 @@ class ECGDrawing(object):
         # map None to dict
         kwargs_signal, kwargs_text = assign_empty_default(
             [kwargs_signal, kwargs_text], dict)
+        # the number of pixels per sample, after resizing to figsize
+        pixels_sample = getattr(self, PDNames.PLOT_AXES).get_position().width *\
+            figsize[0] * getattr(self, PDNames.PLOT_FIG).dpi /\
+            getattr(self, PDNames.PLOT_SAMPLING_NUMBER)
         # #### sort out the ploting areas (note not using gridspecs currently)
         rows = len(getattr(self, PDNames.PLOT_LAYOUT))
         for numrow, row in enumerate(getattr(self, PDNames.PLOT_LAYOUT)):
@@ -538,6 +592,33 @@ class ECGDrawing(object):
                 # scaled by mm/mV factor
                 signal = v_delta + getattr(self, PDNames.WAVE_SCALING) *\
                     signal_temp
+                positions = list(range(left, right))
+                # optionally decimate to the pixel width
+                levels = getattr(self, PDNames.PLOT_PREVIEWS, {})
+                if preview == True and len(levels) > 0:
+                    factor = select_level(len(signal),
+                                          pixels=len(signal) * pixels_sample,
+                                          levels=list(levels))
+                    if factor > 1:
+                        # the blocks of the stored envelope covering the chunk
+                        envelope = levels[factor][k]
+                        first = sign_start // factor
+                        last = min(-(-(sign_start + len(signal)) // factor),
+                                   len(envelope) // 2)
+                        blocks = np.arange(first, max(first, last))
+                        positions = np.repeat(np.clip(
+                            left - sign_start + (blocks + 0.5) * factor - 0.5,
+                            left, left + len(signal) - 1), 2)
+                        signal = v_delta +\
+                            getattr(self, PDNames.WAVE_SCALING) *\
+                            envelope[2 * first:2 * (first + len(blocks))]
+                elif preview == True:
+                    factor = select_level(len(signal),
+                                          pixels=len(signal) * pixels_sample)
+                    if factor > 1:
+                        positions = envelope_positions(left, len(signal),
+                                                       factor)
+                        signal = minmax_decimate(np.asarray(signal), factor)
                 # update kwargs
                 new_kwargs_signal = _update_kwargs(
                     update_dict=kwargs_signal,
@@ -548,7 +629,7 @@ class ECGDrawing(object):
                 )
                 # plot the signal
                 getattr(self, PDNames.PLOT_AXES).plot(
-                    list(range(left, right)),
+                    positions,
                     signal,
                     **new_kwargs_signal,
                     )
@@ -1,32 +1,40 @@
 '''
 A module to extract median beats and raw waveforms from DICOM ECGs wrapping
 pydicom.
+
+The `ECGDICOMReader` only requires numpy and pydicom; pandas, scipy and
+matplotlib are imported on first use by the table, resampling and plotting
+code.
 '''
 
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 # imports
+from __future__ import annotations
 import os
 import re
 import sys
 import copy
+import time
 import uuid
 import pathlib
 import warnings
+import functools
+import dataclasses
 import numpy as np
-import pandas as pd
-import matplotlib.pylab as plt
 from pydicom import dcmread
 from pydicom.dataset import FileDataset as DCM_Class
-from datetime import datetime
-from scipy import signal
+from pydicom.waveforms.numpy_handler import multiplex_array
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
-    List, Type, Union, Tuple, Self, Dict, Optional, Any, Literal,
+    List, Type, Union, Tuple, Self, Dict, Optional, Any, Literal, Iterator,
+    Callable, TYPE_CHECKING,
 )
 from ecgprocess.errors import (
     NotCalledError,
     is_type,
     MissingDICOMTagError,
+    QuarantineError,
     Error_MSG,
     STDOUT_MSG,
     _check_readable,
@@ -40,9 +48,57 @@ from ecgprocess.utils.general import (
     replace_with_tar,
     assign_empty_default,
 )
-from ecgprocess.plot_ecgs import (
-    ECGDrawing,
+from ecgprocess.functions import (
+    get_batch_prefix,
+)
+from ecgprocess.partitions import (
+    parse_partition,
+    partition_prefix,
+    select_partition,
+)
+from ecgprocess.filters import (
+    ECGFilter,
+)
+from ecgprocess.rhythm import (
+    rhythm_features,
+    compare_annotations,
+    derive_median_beat,
+)
+from ecgprocess.codec import (
+    encode_ecg,
+    write_ecg_block,
+)
+from ecgprocess.pyramid import (
+    build_pyramid,
+)
+from ecgprocess.batching import (
+    BatchController,
+    ReadAhead,
+    ecg_nbytes,
+    lead_nbytes,
+)
+from ecgprocess.isolation import (
+    IsolatedReader,
 )
+from ecgprocess.telemetry import (
+    Telemetry,
+)
+from ecgprocess.profiling import (
+    StageProfiler,
+)
+from ecgprocess.quality import (
+    qc_metrics,
+    METRICS as QC_METRICS,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+if TYPE_CHECKING:
+    from ecgprocess.plot_ecgs import ECGDrawing
+# NOTE imported on first use, keeping headless workers fast to start
+pd = LazyModule('pandas')
+plt = LazyModule('matplotlib.pylab')
+signal = LazyModule('scipy.signal')
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -84,6 +140,38 @@ class ECGDICOMReader(BaseECGDICOMReader):
         Set to `False` to decrease memory usage. Set to `True` to explore the
         orignal pydicom instance. For example, use this one a few files to
         identify none-standard information to extract.
+    extract_traits : bool, default `False`
+        Whether the ECG traits (machine measurements such as the QT interval)
+        listed in `ECG_TRAIT_DICT` should be extracted from the
+        `WaveformAnnotationSequence` and added to the metadata.
+    extract_annotations : bool, default `False`
+        Whether the sample positions referenced in the
+        `WaveformAnnotationSequence` (e.g. pacemaker spikes) should be
+        extracted to the `Annotations` attribute.
+    raw_waveforms : bool, default `False`
+        Whether to keep the waveforms as the stored integers (typically
+        int16) together with the per-channel sensitivity, baseline and
+        correction factor, instead of float64 voltages. Scaling, augmenting
+        and resampling are deferred to `get_voltages`, reducing the memory
+        of the extracted waveforms about four-fold.
+    dtype : {`float64`, `float32`}, default `float64`
+        The floating point precision of the voltages. `float32` keeps the
+        decoded, augmented and resampled leads, as well as the table voltage
+        column and plotted signals, in single precision, halving memory.
+    ecgfilter : ECGFilter, default `NoneType`
+        An optional `ECGFilter` applying zero-phase baseline removal,
+        bandpass and notch filters to the rhythm waveforms, after
+        resampling. The filter settings are recorded in the metadata as
+        `FilterSettings`.
+    derive_median : bool, default `False`
+        Whether to derive the median beats from the rhythm waveforms if the
+        DICOM does not contain these (see `rhythm.derive_median_beat`). The
+        derived median beats have 600 samples at 500 Hertz, and are flagged
+        by `MedianWaveformDerived`.
+    quality_control : bool, default `False`
+        Whether to compute the per-lead quality control metrics of the
+        rhythm waveforms (see `quality.qc_metrics`), before filtering. The
+        metrics are stored in the `QualityControl` attribute.
     
     Attributes
     ----------
@@ -93,6 +181,20 @@ class ECGDICOMReader(BaseECGDICOMReader):
         Whether the ECG was resampled to a 500 Hertz frequency.
     retain_raw : bool
         Whether the raw pydicom data was retained.
+    extract_traits : bool
+        Whether the ECG traits were extracted.
+    extract_annotations : bool
+        Whether the referenced sample positions were extracted.
+    raw_waveforms : bool
+        Whether the waveforms were kept as stored integers.
+    dtype : str
+        The floating point precision of the voltages.
+    ecgfilter : ECGFilter or `NoneType`
+        The filters applied to the rhythm waveforms.
+    derive_median : bool
+        Whether absent median beats were derived.
+    quality_control : bool
+        Whether the quality control metrics were computed.
     METADATA : dict [`str`, `str`]
         A dictionary describing the metadata one wants to extract from a
         DICOM. The dictionary keys represents the `target` (new) name and the
@@ -106,18 +208,16 @@ class ECGDICOMReader(BaseECGDICOMReader):
         values are all the same, if not multiple entries will be returned for
         the user to decide what to do next. The extracted ECG traits will be
         included with the extracted METADATA.
-    STUDY_DATE_SOURCE : str
-        The study date format of the source DICOM.  This will be used in
-        `datetime.strptime` as format argument.
+    DATE_COLUMNS : dict [`str`, `str`]
+        The metadata columns formatted by `format_dates`, mapped to their
+        DICOM value representation (`DA`, `TM` or `DT`).
     STUDY_DATE_TARGET : str
         The target formatting of the study date.  This will be used in
-        `datetime.strptime` as format argument.
-    ACQUISITION_DATE_SOURCE : str
-        The acquisition date and time format of the source DICOM.  This will be
-        used in `datetime.strptime` as format argument.
+        `strftime` as format argument.
+    STUDY_TIME_TARGET : str
+        The target formatting of the study time.
     ACQUISITION_DATE_TARGET : str
-        The target formatting of the acquisition date and time.  This will be
-        used in `datetime.strptime` as format argument.
+        The target formatting of the acquisition date and time.
     
     Methods
     -------
@@ -126,6 +226,14 @@ class ECGDICOMReader(BaseECGDICOMReader):
     make_leadvoltages(waveform_array, lead_info, augment_leads)
         Extracts the voltages from a DICOM file. Will automatically extract the
         limb leads if missing.
+    get_annotations(path, dicom_instance)
+        Extracts the referenced sample positions of the waveform annotations.
+    get_voltages(median)
+        Returns the waveforms or median beats in physical units.
+    format_dates(table)
+        Formats the DICOM date and time columns of a metadata table.
+    to_voltages(leads, scaling, frequency, n_samples)
+        Converts stored integer waveforms to physical units.
     
     Notes
     -----
@@ -137,9 +245,19 @@ class ECGDICOMReader(BaseECGDICOMReader):
     augment_leads: bool=False
     resample_500:bool=True
     retain_raw:bool=False
+    extract_traits:bool=False
+    extract_annotations:bool=False
+    raw_waveforms:bool=False
+    dtype:Literal['float64', 'float32']='float64'
+    ecgfilter:ECGFilter|None=None
+    derive_median:bool=False
+    quality_control:bool=False
     # #### check input
     is_type(augment_leads, bool, 'augment_leads')
     is_type(resample_500, bool, 'resample_500')
+    is_type(extract_traits, bool, 'extract_traits')
+    is_type(extract_annotations, bool, 'extract_annotations')
+    is_type(raw_waveforms, bool, 'raw_waveforms')
     # #### default tags - hacking about to make these non-persistance
     # NOTE this is probably related to DICOMTags being a @dataclass
     METADATA = copy.deepcopy(DICOMTags().METADATA)
@@ -149,13 +267,30 @@ class ECGDICOMReader(BaseECGDICOMReader):
     MEDIAN_BEATS_DICT = copy.deepcopy(DICOMTags().MEDIAN_BEATS_DICT)
     ECG_TRAIT_DICT = copy.deepcopy(DICOMTags().ECG_INTERPERTATION_DICT)
     # #### default dates to extract and format
-    STUDY_DATE_SOURCE = "%Y%m%d"
+    DATE_COLUMNS = {
+        PDNames.STUDY_DATE: PDNames.VR_DA,
+        PDNames.STUDY_TIME: PDNames.VR_TM,
+        PDNames.ACQUISITION_DATE: PDNames.VR_DT,
+    }
     STUDY_DATE_TARGET = "%Y-%m-%d"
-    ACQUISITION_DATE_SOURCE = "%Y%m%d%H%M%S"
+    STUDY_TIME_TARGET = "%H:%M:%S"
     ACQUISITION_DATE_TARGET = "%Y-%m-%d %H:%M:%S"
     # #### Error MSG
     __MSG1=('Please supply either `path` or `dicom_instance` but not both.')
     # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __post_init__(self) -> None:
+        '''
+        Confirms the dtype and filter, and precompiles the case-folded ECG
+        trait synonym lookup.
+        '''
+        if not self.dtype in PDNames.DTYPES:
+            raise ValueError(Error_MSG.CHOICE_PARM.format(
+                'dtype', ', '.join(PDNames.DTYPES)))
+        is_type(self.ecgfilter, (type(None), ECGFilter), 'ecgfilter')
+        is_type(self.derive_median, bool, 'derive_median')
+        is_type(self.quality_control, bool, 'quality_control')
+        self._set_trait_lookup()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
     def __call__(self, path:str, skip_empty:bool=True, verbose:bool=False,
                  ) -> Self:
         """
@@ -177,11 +312,31 @@ class ECGDICOMReader(BaseECGDICOMReader):
         Attributes
         ----------
         GeneralInfo : list [`str`]
-            A list of dcmread extracted attributes.
+            A list of dcmread extracted attributes. The dates and times are
+            the DICOM strings, see `format_dates`.
         Waveforms : dict [`str`, `np.array`]
             The lead specific ECG waveforms.
         MedianWaveforms : dict [`str`, `np.array`]
             The lead specific ECG median beats.
+        WaveformScaling : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead specific sensitivity, baseline and correction factor,
+            only if `raw_waveforms` is `True`.
+        MedianWaveformScaling : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead specific sensitivity, baseline and correction factor of
+            the median beats, only if `raw_waveforms` is `True`.
+        MedianSamplingFrequency : float
+            The sampling frequency of `MedianWaveforms` as stored, i.e.,
+            before `get_voltages` resamples raw waveforms. Derived median
+            beats have 500 Hertz.
+        WaveformLimits : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead specific lower and upper ADC limits in physical units,
+            and the size of an ADC step.
+        QualityControl : dict [`str`, `np.array`]
+            The lead names and their quality control metrics, only if
+            `quality_control` is `True`.
+        Annotations : dict [`str`, `np.array`]
+            The referenced sample positions, only if `extract_annotations` is
+            `True`.
         
         Returns
         -------
@@ -210,7 +365,9 @@ class ECGDICOMReader(BaseECGDICOMReader):
             # the function will internally adjust
             # LEAD_VOLTAGES, and LEAD_VOLTAGES2
             # Nothing is returned
-            self._resampling_500hz(frequency=results_dict[PDNames.SF])
+            # NOTE raw waveforms are resampled by `get_voltages`
+            if self.raw_waveforms == False:
+                self._resampling_500hz(frequency=results_dict[PDNames.SF])
             setattr(self, PDNames.RESAMPLED, True)
             results_dict[PDNames.RESAMPLED] = True
             results_dict[PDNames.SF] = 500
@@ -218,6 +375,20 @@ class ECGDICOMReader(BaseECGDICOMReader):
         else:
             setattr(self, PDNames.RESAMPLED, False)
             results_dict[PDNames.RESAMPLED] = False
+        setattr(self, PDNames.SF_MEDIAN,
+                results_dict[PDNames.SF_ORIGINAL] if
+                self.raw_waveforms == True else results_dict[PDNames.SF])
+        # #### optional quality control, of the unfiltered waveforms
+        if self.quality_control == True:
+            setattr(self, PDNames.QUALITY, self._get_quality(results_dict))
+        # #### optional filtering of the rhythm waveforms
+        if self.ecgfilter is not None:
+            # NOTE raw waveforms are filtered by `get_voltages`
+            if self.raw_waveforms == False:
+                setattr(self, PDNames.LEAD_VOLTAGES, self._filter_leads(
+                    getattr(self, PDNames.LEAD_VOLTAGES),
+                    frequency=results_dict[PDNames.SF]))
+            results_dict[PDNames.FILTER_SETTINGS] = self.ecgfilter.settings()
         # #### remove raw data
         if self.retain_raw == False:
             try:
@@ -228,10 +399,15 @@ class ECGDICOMReader(BaseECGDICOMReader):
         ## Remove SF column
         #results_dict.drop[PDNames.SF]
         # #### Extract standard ECG measurements
-        #_, ecg_traits, missing_ecg_traits = self._get_waveform_annotation(
-        #    dicom_instance=ECG, skip_empty=skip_empty)
-        #results_dict.update(ecg_traits)
-        #empty_metadata = empty_metadata + missing_ecg_traits
+        if self.extract_traits == True:
+            _, ecg_traits, missing_ecg_traits = self._get_waveform_annotation(
+                dicom_instance=ECG, skip_empty=skip_empty)
+            results_dict.update(ecg_traits)
+            empty_metadata = empty_metadata + missing_ecg_traits
+        # #### Extract the referenced sample positions
+        if self.extract_annotations == True:
+            _, annotations = self.get_annotations(dicom_instance=ECG)
+            setattr(self, PDNames.ANNOTATIONS, annotations)
         # #### end of extractions, optionally printing tags which were missing
         if verbose == True:
             if len(empty_metadata) + len(empty_wave_forms) +\
@@ -247,17 +423,14 @@ class ECGDICOMReader(BaseECGDICOMReader):
             results_dict[PDNames.SAMPLING_NUMBER] /
             results_dict[PDNames.SAMPLING_FREQ]
         )
-        # #### add time variables
-        raw_AD = results_dict[PDNames.ACQUISITION_DATE]
-        raw_SD = results_dict[PDNames.STUDY_DATE]
-        results_dict[PDNames.ACQUISITION_DATE] = \
-            datetime.strptime(raw_AD, self.ACQUISITION_DATE_SOURCE).\
-            strftime(self.ACQUISITION_DATE_TARGET)
-        results_dict[PDNames.STUDY_DATE] = \
-            datetime.strptime(raw_SD, self.STUDY_DATE_SOURCE).\
-            strftime(self.STUDY_DATE_TARGET)
+        # NOTE the dates and times are formatted per table by `format_dates`
         # #### assign results_dict
         setattr(self, PDNames.RESULTS_DICT, results_dict)
+        # #### optionally derive absent median beats, after filtering
+        results_dict[PDNames.MEDIAN_DERIVED] = False
+        if self.derive_median == True and\
+                getattr(self, PDNames.MEDIAN_PRESENT) == False:
+            self._derive_median_beats()
         # assign unique identifier
         setattr(self, PDNames.SOP_UID, results_dict[PDNames.SOP_UID])
         # add the original dcmread instance
@@ -365,7 +538,7 @@ class ECGDICOMReader(BaseECGDICOMReader):
         try:
             nam, el = self.WAVE_FORMS_DICT[PDNames.WAVE_ARRAY]
             setattr(self, PDNames.WAVE_ARRAY,
-                    getattr(ECG, nam)(el).T)
+                    self._get_waveform_array(ECG, nam, el))
         except:
             raise AttributeError(Error_MSG.MISSING_DICOM.format(nam))
         WAVE = getattr(ECG, PDNames.WAVE_FORM_SEQ)[0]
@@ -390,18 +563,28 @@ class ECGDICOMReader(BaseECGDICOMReader):
             channel_seq = getattr(getattr(ECG, PDNames.WAVE_FORM_SEQ)[0],
                                   PDNames.CHANNEL_DEF_SEQ)
             lead_info_waveform, lead_units=self._get_lead_info(channel_seq)
+            # NOTE raw waveforms are augmented by `get_voltages`
             setattr(self, PDNames.LEAD_VOLTAGES,
                     self.make_leadvoltages(
                         lead_info=lead_info_waveform,
                         waveform_array=getattr(self, PDNames.WAVE_ARRAY),
-                        augment_leads=self.augment_leads,
+                        augment_leads=self.augment_leads and\
+                        not self.raw_waveforms,
                         ))
+            scaling = self._get_channel_scaling(channel_seq,
+                                                lead_info_waveform)
+            if self.raw_waveforms == True:
+                setattr(self, PDNames.LEAD_SCALING, scaling)
+            setattr(self, PDNames.LEAD_LIMITS,
+                    self._get_adc_limits(WAVE, scaling))
             temp_results_dict[PDNames.LEAD_UNITS] = lead_units
             temp_results_dict[PDNames.SAMPLING_FREQ] =\
                 temp_results_dict[PDNames.SF_ORIGINAL]
         else:
             # set to NA
             setattr(self, PDNames.LEAD_VOLTAGES, np.nan)
+            setattr(self, PDNames.LEAD_SCALING, np.nan)
+            setattr(self, PDNames.LEAD_LIMITS, np.nan)
             empty_wave_forms.append(PDNames.LEAD_VOLTAGES)
             temp_results_dict[PDNames.SAMPLING_FREQ] =\
                 temp_results_dict[PDNames.SF_ORIGINAL]
@@ -458,7 +641,7 @@ class ECGDICOMReader(BaseECGDICOMReader):
         try:
             nam, el = self.MEDIAN_BEATS_DICT[PDNames.MEDIAN_ARRAY]
             setattr(self, PDNames.MEDIAN_ARRAY,
-                    getattr(ECG, nam)(el).T)
+                    self._get_waveform_array(ECG, nam, el))
         except:
             if skip_empty == True:
                 sccss = False
@@ -495,14 +678,19 @@ class ECGDICOMReader(BaseECGDICOMReader):
                         lead_info=lead_info_median,
                         waveform_array=\
                         getattr(self, PDNames.MEDIAN_ARRAY),
-                        augment_leads=self.augment_leads,
+                        augment_leads=self.augment_leads and\
+                        not self.raw_waveforms,
                     ))
+            if self.raw_waveforms == True:
+                setattr(self, PDNames.LEAD_SCALING2, self._get_channel_scaling(
+                    channel_seq_median, lead_info_median))
             setattr(self, PDNames.MEDIAN_PRESENT, True)
             temp_results_dict[PDNames.MEDIAN_PRESENT] = True
             temp_results_dict[PDNames.LEAD_UNITS2] = lead_units2
         else:
             # set to missing
             setattr(self, PDNames.LEAD_VOLTAGES2, np.nan)
+            setattr(self, PDNames.LEAD_SCALING2, np.nan)
             setattr(self, PDNames.MEDIAN_PRESENT, False)
             temp_results_dict[PDNames.MEDIAN_PRESENT] = False
             temp_results_dict[PDNames.LEAD_UNITS2] = np.nan
@@ -551,100 +739,74 @@ class ECGDICOMReader(BaseECGDICOMReader):
                 ECG=dcmread(dicom)
         else:
             ECG=dicom_instance
+        # refresh the lookup if ECG_TRAIT_DICT was replaced after init
+        if self._trait_source is not self.ECG_TRAIT_DICT:
+            self._set_trait_lookup()
         # first set everything to NA
         for e in self.ECG_TRAIT_DICT:
-           default_results_dict[e] = np.nan
-           default_results_dict[e+PDNames.ECG_UNIT_STRING] = np.nan
-           free_text = np.nan
-           default_results_dict[PDNames.PACEMAKER_SPIKE]=np.nan
-        # next see if we can extract some interpretations.
+            default_results_dict[e] = np.nan
+            default_results_dict[e+PDNames.ECG_UNIT_STRING] = np.nan
+        default_results_dict[PDNames.PACEMAKER_SPIKE]=np.nan
+        free_text = np.nan
+        # next see if we can extract some interpretations, in a single pass
+        # collecting the values per trait and matching synonym.
         if hasattr(ECG, PDNames.ECG_INTERPERTATION):
-            free_text = ''
-            # get the values lower-case strings (which are lists)
-            ECG_CMPR_LWR = [it.lower() for sl\
-                            in self.ECG_TRAIT_DICT.values() for it in sl]
+            free_text = []
             for w in getattr(ECG, PDNames.ECG_INTERPERTATION):
-                if hasattr(w, PDNames.ECG_CONCEPTNAME):
-                    ecg_int = getattr(w, PDNames.ECG_CONCEPTNAME)[0]
-                    try:
-                        ecg_trait = getattr(ecg_int, PDNames.CODE_MEANING)
-                        # find matching element - using lower case again
-                        if ecg_trait.lower() in ECG_CMPR_LWR:
-                            # get the measurement and set to float
-                            temp_results_dict[ecg_trait.lower()] = float(
-                                        getattr(w, PDNames.ECG_TRAIT_VALUE)
-                                    )
-                            # get the unit
-                            try:
-                                temp_unit_dict[
-                                    ecg_trait.lower()+\
-                                    PDNames.ECG_UNIT_STRING]=getattr(
-                                        getattr(w, PDNames.ECG_UNIT)[0],
-                                        PDNames.CODE_MEANING)
-                            except (AttributeError, IndexError):
-                                pass
-                    except AttributeError:
-                        pass
-                    # #### ancillary info
-                    # see if there is a PaceMakerSpike
-                    if ecg_trait.lower() == PDNames.PACEMAKER_SPIKE.lower():
-                        try:
-                            default_results_dict[PDNames.PACEMAKER_SPIKE]=\
-                                getattr(w, PDNames.REFERENCED_POS)
-                        except AttributeError:
-                            pass
-                    # get free text
-                    if ecg_trait.lower() == PDNames.FREE_TEXT.lower():
-                        try:
-                            free_text = "%s\n%s" % (
-                                free_text,
-                                getattr(w, PDNames.FREE_TEXT)
-                            )
-                        except AttributeError:
-                            pass
+                # get free text
+                if hasattr(w, PDNames.FREE_TEXT):
+                    free_text.append(str(getattr(w, PDNames.FREE_TEXT)))
+                try:
+                    ecg_trait = getattr(
+                        getattr(w, PDNames.ECG_CONCEPTNAME)[0],
+                        PDNames.CODE_MEANING).casefold()
+                except (AttributeError, IndexError):
+                    continue
+                # #### ancillary info
+                # see if there is a PaceMakerSpike
+                if ecg_trait == self._pacemaker_key:
+                    default_results_dict[PDNames.PACEMAKER_SPIKE]=\
+                        getattr(w, PDNames.REFERENCED_POS, np.nan)
+                    continue
+                # find matching trait - using the case-folded lookup
+                match = self._trait_lookup.get(ecg_trait)
+                if match is None:
+                    continue
+                trait, synonym = match
+                try:
+                    value = float(getattr(w, PDNames.ECG_TRAIT_VALUE))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                try:
+                    unit = getattr(getattr(w, PDNames.ECG_UNIT)[0],
+                                   PDNames.CODE_MEANING)
+                except (AttributeError, IndexError):
+                    unit = np.nan
+                temp_results_dict.setdefault(trait, {})[synonym] = value
+                temp_unit_dict.setdefault(trait, {})[synonym] = unit
+            free_text = '\n'.join(free_text)
         # assing the final free_text object
         default_results_dict[PDNames.FREE_TEXT]=free_text
-        # now assign temp_results_dict todefault_results_dict dealing with
-        # keys with more than one matching string.
-        if len(temp_results_dict) > 0:
-            for k, idx in self.ECG_TRAIT_DICT.items():
-                # Check if idx has more than one entry
-                # extract all entries and make sure they are the
-                # same  - NOTE using set comprehension to get the
-                # unique elements
-                unique_set = list({temp_results_dict[el.lower()] for el in\
-                                   idx if el.lower() in temp_results_dict})
-                if len(unique_set) == 1:
-                    # if only one unique entry simply assign this to k
-                    for e in idx:
-                        try:
-                           default_results_dict[k] =\
-                                temp_results_dict[e.lower()]
-                           default_results_dict[k+PDNames.ECG_UNIT_STRING] =\
-                                temp_unit_dict[
-                                    e.lower()+PDNames.ECG_UNIT_STRING]
-                        except KeyError:
-                            # NOTE the KeyError is expected behaviour,
-                            # some of the `e`'s will not be in the
-                            # temp_results_dict
-                            pass
-                elif len(unique_set) > 1:
-                    # given that the results are not unique
-                    # we will return all using the individual `idx` elements
-                    # instead of `k` - NOTE the index without call to lower
-                    # is intended.
-                    for e in idx:
-                        try:
-                           default_results_dict[e] =\
-                                temp_results_dict[e.lower()]
-                           default_results_dict[e+PDNames.ECG_UNIT_STRING] =\
-                                temp_unit_dict[
-                                    e.lower()+PDNames.ECG_UNIT_STRING]
-                        except KeyError:
-                            pass
+        # now assign temp_results_dict to default_results_dict dealing with
+        # traits with more than one matching synonym.
+        for k, values in temp_results_dict.items():
+            units = temp_unit_dict[k]
+            if len(set(values.values())) == 1:
+                # if only one unique entry simply assign this to k
+                default_results_dict[k] = next(iter(values.values()))
+                default_results_dict[k+PDNames.ECG_UNIT_STRING] = next(
+                    (u for u in units.values() if not _is_nan(u)), np.nan)
+            else:
+                # given that the results are not unique
+                # we will return all using the individual synonyms
+                # instead of `k`.
+                for e, v in values.items():
+                    default_results_dict[e] = v
+                    default_results_dict[e+PDNames.ECG_UNIT_STRING] = units[e]
         # which ECG traits are still nan
+        # NOTE the pacemaker sample positions may be multi-valued
         missing_ecg_traits =\
-            [k for k,v in default_results_dict.items() if pd.isna(v)]
+            [k for k,v in default_results_dict.items() if _is_nan(v)]
         if skip_empty == False and len(missing_ecg_traits) > 0:
             # Should an Error be returned
             raise ValueError('The following ECG measurments are '
@@ -652,6 +814,103 @@ class ECGDICOMReader(BaseECGDICOMReader):
         # return
         return ECG, default_results_dict, missing_ecg_traits
     # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def get_annotations(self, path:str|None=None,
+                        dicom_instance: DCM_Class|None=None,
+                        ) -> tuple[DCM_Class, dict[str, np.ndarray]]:
+        '''
+        Extracts the referenced sample positions from the
+        `WaveformAnnotationSequence` attribute of a dicom file, returning one
+        entry per annotation, referenced channel and sample position.
+        
+        Parameters
+        ----------
+        path : str, default `NoneType`.
+            The path to the .dcm file.
+        dicom_instance : DCM_Class, default `NoneType`.
+            A DCM_Class instance.
+        
+        Returns
+        -------
+        results : DCM_Class, dict
+            - A `DCM_Class` instance.
+            - A dictionary with equal length arrays: the annotation concept
+              names (`Annotation`), the waveform multiplex group
+              (`WaveformGroup`), the channel (`Channel`) and the sample
+              position (`SamplePosition`).
+        
+        Notes
+        -----
+        Either supply a path to a dicom file or a DCM_Class instance.
+        
+        The waveform group, channel and sample position are integers and
+        follow the 1-based DICOM numbering; the sample positions refer to the
+        original sampling frequency. Annotations without referenced
+        channels are assigned a group and channel of -1.
+        '''
+        # #### check input
+        is_type(path, (type(None), pathlib.PosixPath, str))
+        is_type(dicom_instance, (type(None), DCM_Class))
+        if (not dicom_instance is None) and (not path is None):
+            raise ValueError(self.__MSG1)
+        # #### Read DICOM
+        # NOTE `with` closes automatically if an error is raised
+        if not path is None:
+            with open(path, 'rb') as dicom:
+                # reads standard dicom content
+                ECG=dcmread(dicom)
+        else:
+            ECG=dicom_instance
+        # #### loop over the annotations with sample positions
+        concepts, groups, channels, positions = [[] for _ in range(4)]
+        for w in getattr(ECG, PDNames.ECG_INTERPERTATION, []):
+            if not hasattr(w, PDNames.REFERENCED_POS):
+                continue
+            pos = np.atleast_1d(np.asarray(
+                getattr(w, PDNames.REFERENCED_POS), dtype=np.int64))
+            try:
+                concept = str(getattr(getattr(w, PDNames.ECG_CONCEPTNAME)[0],
+                                      PDNames.CODE_MEANING))
+            except (AttributeError, IndexError):
+                concept = ''
+            # channel references are stored as (group, channel) pairs
+            chan = np.asarray(getattr(w, PDNames.REFERENCED_CHANNELS, [-1, -1]),
+                              dtype=np.int64).reshape(-1, 2)
+            concepts.append(np.full(len(chan) * len(pos), concept,
+                                    dtype=object))
+            groups.append(np.repeat(chan[:, 0], len(pos)))
+            channels.append(np.repeat(chan[:, 1], len(pos)))
+            positions.append(np.tile(pos, len(chan)))
+        annotations = {
+            PDNames.COL_ANN_CONCEPT: np.concatenate(concepts) if concepts
+            else np.empty(0, dtype=object),
+            PDNames.COL_ANN_GROUP: np.concatenate(groups) if groups
+            else np.empty(0, dtype=np.int64),
+            PDNames.COL_ANN_CHANNEL: np.concatenate(channels) if channels
+            else np.empty(0, dtype=np.int64),
+            PDNames.COL_ANN_POSITION: np.concatenate(positions) if positions
+            else np.empty(0, dtype=np.int64),
+        }
+        # return
+        return ECG, annotations
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _set_trait_lookup(self) -> None:
+        '''
+        Maps each case-folded synonym in `ECG_TRAIT_DICT` to its trait name
+        and the original synonym, so annotation items can be matched using a
+        single dictionary lookup.
+        
+        Attributes
+        ----------
+        _trait_lookup : dict [`str`, `tuple` [`str`, `str`]]
+            The case-folded synonyms mapped to a (trait, synonym) tuple.
+        '''
+        self._trait_lookup = {
+            syn.casefold(): (trait, syn) for trait, synonyms in\
+            self.ECG_TRAIT_DICT.items() for syn in synonyms
+        }
+        self._trait_source = self.ECG_TRAIT_DICT
+        self._pacemaker_key = PDNames.PACEMAKER_SPIKE.casefold()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
     def _get_lead_info(self, channel_seq: DCM_Class
                        ) -> tuple[dict[int, str], str]:
         """
@@ -697,6 +956,296 @@ class ECGDICOMReader(BaseECGDICOMReader):
         # return stuff
         return leadnames, unique_unit[0]
     # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _get_waveform_array(self, ECG:DCM_Class, nam:str, el:int,
+                            ) -> np.ndarray:
+        '''
+        Returns the transposed multiplex group `el`, as stored integers if
+        `raw_waveforms` is `True` and otherwise in physical units using the
+        `nam` method of the `DCM_Class` instance.
+        '''
+        if self.raw_waveforms == True:
+            return multiplex_array(ECG, el, as_raw=True).T
+        # NOTE pydicom always returns float64
+        return getattr(ECG, nam)(el).T.astype(self.dtype, copy=False)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _get_channel_scaling(self, channel_seq: DCM_Class,
+                             lead_info:Dict[int, str],
+                             ) -> dict[str, tuple[float, float, float]]:
+        '''
+        Extracts the sensitivity, baseline and sensitivity correction factor
+        of each channel, using the pydicom defaults (1, 0 and 1) for absent
+        attributes.
+        
+        Parameters
+        ----------
+        channel_seq : DCM_Class
+            A `pydicom.sequence.Sequence` instance.
+        lead_info: dict [`int`, `str`]
+            The lead names, as returned by `_get_lead_info`.
+        
+        Returns
+        -------
+        scaling : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead names with the sensitivity, baseline and correction
+            factor.
+        '''
+        scaling = {}
+        for k, channel in enumerate(channel_seq):
+            scaling[lead_info[k]] = (
+                float(getattr(channel, PDNames.CHANNEL_SENS, 1.0)),
+                float(getattr(channel, PDNames.CHANNEL_BASELINE, 0.0)),
+                float(getattr(channel, PDNames.CHANNEL_CORRECTION, 1.0)),
+            )
+        return scaling
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _get_adc_limits(self, wave:DCM_Class,
+                        scaling:Dict[str, tuple[float, float, float]],
+                        ) -> dict[str, tuple[float, float, float]]|float:
+        '''
+        The lower and upper limits of the analogue-to-digital converter in
+        physical units, used to detect clipped samples.
+        
+        Parameters
+        ----------
+        wave : DCM_Class
+            The multiplex group, providing `WaveformBitsAllocated` and
+            `WaveformSampleInterpretation`.
+        scaling : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead specific sensitivity, baseline and correction factor.
+        
+        Returns
+        -------
+        limits : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead names with the lower and upper limit and the size of an
+            ADC step; `np.nan` for companded (mu- or A-law) samples.
+        
+        Notes
+        -----
+        Absent attributes default to 16 bits signed integers.
+        '''
+        bits = int(getattr(wave, PDNames.BITS_ALLOCATED, 16))
+        interpretation = str(getattr(wave, PDNames.SAMPLE_INTERPRETATION,
+                                     PDNames.SIGNED[0]))
+        if interpretation in PDNames.SIGNED:
+            low, high = -2 ** (bits - 1), 2 ** (bits - 1) - 1
+        elif interpretation in PDNames.UNSIGNED:
+            low, high = 0, 2 ** bits - 1
+        else:
+            return np.nan
+        limits = {}
+        for lead, (sensitivity, baseline, correction) in scaling.items():
+            step = sensitivity * correction
+            bounds = sorted([low * step + baseline, high * step + baseline])
+            limits[lead] = (bounds[0], bounds[1], abs(step))
+        return limits
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def to_voltages(self, leads:Dict[str, np.ndarray],
+                    scaling:Dict[str, tuple[float, float, float]],
+                    frequency:int|float, n_samples:int,
+                    ) -> Dict[str, np.ndarray]:
+        '''
+        Converts stored integer waveforms to physical units, calculating the
+        augmented leads and resampling according to the instance settings.
+        
+        Parameters
+        ----------
+        leads : dict [`str`, `np.ndarray`]
+            The lead specific integer waveforms.
+        scaling : dict [`str`, `tuple` [`float`, `float`, `float`]]
+            The lead specific sensitivity, baseline and correction factor.
+        frequency : int or float
+            The original sampling frequency.
+        n_samples : int
+            The number of samples after resampling to 500 Hertz.
+        
+        Returns
+        -------
+        leads: dict [`str`, `np.ndarray`]
+            A dictionary with the lead name string as keys and voltages of
+            `dtype` as np.ndarray values.
+        
+        Notes
+        -----
+        The scaling follows pydicom: `raw * sensitivity * correction +
+        baseline`.
+        '''
+        voltages = {}
+        for lead, raw in leads.items():
+            sensitivity, baseline, correction = scaling[lead]
+            voltages[lead] = np.multiply(raw, sensitivity * correction,
+                                         dtype=self.dtype) + baseline
+        voltages = self.make_leadvoltages(
+            waveform_array=np.stack(list(voltages.values())),
+            lead_info=dict(enumerate(voltages)),
+            augment_leads=self.augment_leads,
+        )
+        if self.resample_500 == True and int(frequency) != 500:
+            for lead in voltages:
+                voltages[lead] = signal.resample(
+                    voltages[lead], n_samples).astype(self.dtype, copy=False)
+        return voltages
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def get_voltages(self, median:bool=False) -> Dict[str, np.ndarray]:
+        '''
+        Returns the waveforms, or median beats, of the last read file in
+        physical units.
+        
+        Parameters
+        ----------
+        median : bool, default `False`
+            Set to `True` to return the median beats.
+        
+        Returns
+        -------
+        leads: dict [`str`, `np.ndarray`]
+            The lead specific voltages; `np.nan` if absent.
+        
+        Notes
+        -----
+        This simply returns `Waveforms` or `MedianWaveforms` unless
+        `raw_waveforms` is `True`, in which case the waveforms are also
+        filtered here.
+        '''
+        is_type(median, bool, 'median')
+        leads = getattr(self, PDNames.LEAD_VOLTAGES2 if median == True else
+                        PDNames.LEAD_VOLTAGES)
+        if self.raw_waveforms == False or not isinstance(leads, dict):
+            return leads
+        leads = self.to_voltages(
+            leads,
+            scaling=getattr(self, PDNames.LEAD_SCALING2 if median == True
+                            else PDNames.LEAD_SCALING),
+            frequency=getattr(self, PDNames.SF_MEDIAN) if median == True
+            else getattr(self, PDNames.RESULTS_DICT)[PDNames.SF_ORIGINAL],
+            n_samples=600 if median == True else 5000,
+        )
+        if self.ecgfilter is not None and median == False:
+            leads = self._filter_leads(
+                leads, frequency=getattr(self, PDNames.RESULTS_DICT)[PDNames.SF])
+        return leads
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _derive_median_beats(self) -> None:
+        '''
+        Derives the median beats from the rhythm waveforms, updating
+        `MedianWaveforms` and the `GeneralInfo` if enough beats were found.
+        
+        Notes
+        -----
+        With `raw_waveforms` the derived median beats are voltages, stored
+        with an identity `MedianWaveformScaling`. The derived median beats
+        have 600 samples at 500 Hertz, recorded as `MedianSamplingFrequency`
+        so these are not resampled again.
+        '''
+        results_dict = getattr(self, PDNames.RESULTS_DICT)
+        leads = self.get_voltages()
+        if not isinstance(leads, dict) or len(leads) == 0 or\
+                _is_nan(results_dict[PDNames.SF]):
+            return
+        names = list(leads)
+        median = derive_median_beat(np.stack([leads[n] for n in names]),
+                                    frequency=results_dict[PDNames.SF])
+        if median is None:
+            return
+        setattr(self, PDNames.LEAD_VOLTAGES2,
+                dict(zip(names, median.astype(self.dtype, copy=False))))
+        if self.raw_waveforms == True:
+            setattr(self, PDNames.LEAD_SCALING2,
+                    {n: (1.0, 0.0, 1.0) for n in names})
+        setattr(self, PDNames.SF_MEDIAN, 500)
+        results_dict[PDNames.MEDIAN_DERIVED] = True
+        results_dict[PDNames.LEAD_UNITS2] = results_dict[PDNames.LEAD_UNITS]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _filter_leads(self, leads:Dict[str, np.ndarray]|float,
+                      frequency:int|float,
+                      ) -> Dict[str, np.ndarray]|float:
+        '''
+        Applies `ecgfilter` to the lead matrix of a single ECG, returning
+        absent (NaN) waveforms unchanged.
+        '''
+        if not isinstance(leads, dict) or _is_nan(frequency):
+            return leads
+        return self.ecgfilter.filter_leads(leads, frequency=frequency)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _get_quality(self, results_dict:Dict[str, Any],
+                     ) -> Dict[str, np.ndarray]|float:
+        '''
+        Computes the quality control metrics of the unfiltered rhythm
+        waveforms in physical units, see `quality.qc_metrics`.
+        
+        Parameters
+        ----------
+        results_dict : dict [`str`, `any`]
+            The extracted metadata, providing the sampling frequencies.
+        
+        Returns
+        -------
+        quality : dict [`str`, `np.ndarray`]
+            The `Lead` names and the lead specific metrics; `np.nan` if the
+            waveforms are absent.
+        '''
+        leads = getattr(self, PDNames.LEAD_VOLTAGES)
+        frequency = results_dict[PDNames.SF]
+        if not isinstance(leads, dict) or len(leads) == 0 or\
+                _is_nan(frequency):
+            return np.nan
+        if self.raw_waveforms == True:
+            leads = self.to_voltages(
+                leads, scaling=getattr(self, PDNames.LEAD_SCALING),
+                frequency=results_dict[PDNames.SF_ORIGINAL], n_samples=5000)
+        names = list(leads)
+        # NOTE the calculated augmented leads have unknown limits
+        limits = getattr(self, PDNames.LEAD_LIMITS)
+        limits = np.array([limits.get(n, (np.nan,) * 3) for n in names])\
+            if isinstance(limits, dict) else None
+        quality = {PDNames.COL_LEAD: np.array(names)}
+        quality.update(qc_metrics(np.stack([leads[n] for n in names]),
+                                  frequency=frequency, limits=limits))
+        return quality
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def format_dates(self, table:pd.DataFrame) -> pd.DataFrame:
+        '''
+        Formats the `DATE_COLUMNS` of a metadata table in a single vectorised
+        pass per column.
+        
+        Parameters
+        ----------
+        table : pd.DataFrame
+            A table with one row per ECG, such as the `GeneralInfoTable`.
+        
+        Returns
+        -------
+        pd.DataFrame
+            The table with formatted date and time columns. Values which
+            cannot be parsed are set to NaN. `DT` columns gain a
+            `<column> UTCOffset` column with the optional `&ZZXX` suffix.
+        
+        Notes
+        -----
+        Absent columns are ignored. See `format_dicom_datetime` for the
+        supported DICOM variants.
+        
+        This changes the metadata schema of earlier versions, which only
+        formatted `StudyDate` and `AcquisitionDateTime`: `StudyTime` is now
+        formatted as `HH:MM:SS` instead of the DICOM `HHMMSS.FFFFFF` string,
+        and `AcquisitionDateTime` gains an `AcquisitionDateTime UTCOffset`
+        column.
+        '''
+        is_type(table, pd.DataFrame, 'table')
+        TARGETS = {PDNames.VR_DA: self.STUDY_DATE_TARGET,
+                   PDNames.VR_TM: self.STUDY_TIME_TARGET,
+                   PDNames.VR_DT: self.ACQUISITION_DATE_TARGET}
+        table = table.copy()
+        for column, vr in self.DATE_COLUMNS.items():
+            if not column in table.columns:
+                continue
+            values, offset = format_dicom_datetime(
+                table[column], vr=vr, target=TARGETS[vr])
+            table[column] = values
+            if vr == PDNames.VR_DT:
+                table[column + PDNames.UTC_OFFSET] = offset
+        # return
+        return table
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
     def make_leadvoltages(self, waveform_array: np.ndarray,
                           lead_info:Dict[int, str],
                           augment_leads:bool,
@@ -759,14 +1308,16 @@ class ECGDICOMReader(BaseECGDICOMReader):
             lead_volt_temp = getattr(self, PDNames.LEAD_VOLTAGES)
             for i in lead_volt_temp:
                 lead_volt_temp[f"{i}"] =\
-                    signal.resample(lead_volt_temp[f"{i}"], 5000)
+                    signal.resample(lead_volt_temp[f"{i}"], 5000).astype(
+                        self.dtype, copy=False)
             setattr(self, PDNames.LEAD_VOLTAGES, lead_volt_temp)
             # #### median beats
             if getattr(self, PDNames.MEDIAN_PRESENT) == True:
                 lead_volt_temp2 = getattr(self, PDNames.LEAD_VOLTAGES2)
                 for i in lead_volt_temp2:
                     lead_volt_temp2[f"{i}"] = \
-                        signal.resample(lead_volt_temp2[f"{i}"], 600)
+                        signal.resample(lead_volt_temp2[f"{i}"], 600).astype(
+                            self.dtype, copy=False)
                 setattr(self, PDNames.LEAD_VOLTAGES2, lead_volt_temp2)
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -796,11 +1347,17 @@ class ECGDICOMTable(object):
     write_pdf(ecgdrawing, target_path, write_failed, kwargs_reader,
     kwargs_drawing, kwargs_savefig)
         writes dicom files to pdfs using the dicom unique id as file name.
+    write_images(ecgdrawing, target_path, shard_size, grayscale, crop, dpi,
+    n_jobs, table_prefix, write_failed, kwargs_reader, kwargs_drawing)
+        renders dicom files to images and writes these to memory-mapped
+        uint8 numpy shards with a unique id index per shard.
     '''
     
     # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
     def __init__(self, ecgdicomreader:ECGDICOMReader, path_list:List[str],
-                 info_type:Literal['all', 'rhythm', 'median', 'meta'] = 'all'
+                 info_type:Literal['all', 'rhythm', 'median', 'meta'] = 'all',
+                 dtype:Literal['float64', 'float32', None]=None,
+                 ecgfilter:ECGFilter|None=None,
                  ) -> None:
         """
         Initialises a new instance of `ECGDICOMTable`.
@@ -813,6 +1370,14 @@ class ECGDICOMTable(object):
             A list of paths to one or more .dcm files.
         info_type : {`all`, `rhythm`, `median`, `meta`}
             Which information should be extracted.
+        dtype : {`float64`, `float32`}, default `NoneType`
+            The floating point precision of the voltages. Uses a copy of
+            `ecgdicomreader` with this `dtype`; set to `NoneType` to use the
+            precision of `ecgdicomreader`.
+        ecgfilter : ECGFilter, default `NoneType`
+            Filters applied to the rhythm waveforms of each ECG. Uses a copy
+            of `ecgdicomreader` with this `ecgfilter`; set to `NoneType` to
+            use the filter of `ecgdicomreader`.
         """
         EXP_INFO=[PDNames.INFO_TYPE_ALL, PDNames.INFO_TYPE_RTM,
                   PDNames.INFO_TYPE_MED, PDNames.INFO_TYPE_MET,
@@ -825,6 +1390,11 @@ class ECGDICOMTable(object):
         is_type(path_list, list, 'path_list')
         if not info_type in EXP_INFO:
             raise ValueError(f'`info_type` is restricted to `{EXP_INFO}`.')
+        if dtype is not None and dtype != ecgdicomreader.dtype:
+            ecgdicomreader = dataclasses.replace(ecgdicomreader, dtype=dtype)
+        if ecgfilter is not None:
+            ecgdicomreader = dataclasses.replace(ecgdicomreader,
+                                                 ecgfilter=ecgfilter)
         self.ecgdicomreader = ecgdicomreader
         setattr(self, PDNames.INFO_TYPE, info_type)
         setattr(self, PDNames.RPATH_L, path_list)
@@ -845,6 +1415,14 @@ class ECGDICOMTable(object):
     def __call__(
         self, skip_missing:Literal['Permissions', 'Data', 'None']='Permissions',
         verbose:bool=False,
+        duplicates:Literal['raise', 'skip', 'keep_latest']='raise',
+        uid_index:str|None=None,
+        partition:str|tuple[int, int]|None=None,
+        partition_by:Literal['path', 'uid']='path',
+        partition_root:str|None=None,
+        timeout:float|None=None,
+        memory_limit:int|None=None,
+        telemetry:Telemetry|None=None,
     ) -> Self:
         """
         Will take a ECGDICOMReader and loops over a list of dcm file paths and
@@ -863,6 +1441,41 @@ class ECGDICOMTable(object):
             waveform_array), `None` will not skip errors.
         verbose : bool, default `False`
             Prints missing files if skip_missing is set to `True`.
+        duplicates : {'raise', 'skip', 'keep_latest'}, default `raise`
+            How files with an already extracted SOPinstanceUID are handled.
+            `raise` raises an IndexError, `skip` skips the later files, and
+            `keep_latest` only extracts the file with the most recent
+            AcquisitionDateTime (this requires a quick header read of all
+            files). Skipped files are recorded in `DuplicateList`.
+        uid_index : str, default `NoneType`
+            Path to a tab-delimited file with previously extracted
+            SOPinstanceUIDs. If supplied, the file is read before extraction
+            and the newly extracted SOPinstanceUIDs are appended afterwards,
+            so that duplicates are detected across incremental runs.
+        partition : `str` or `tuple` [`int`, `int`], default `NoneType`
+            Only extract partition `i/N` (zero-based) of the paths, see
+            `partitions.select_partition`. Each server can extract its own
+            partition of the same path list without any coordination.
+        partition_by : {`path`, `uid`}, default `path`
+            Whether the partitions are based on a hash of the file path or
+            of the SOPinstanceUID (requiring a header read of all paths).
+        partition_root : `str`, default `NoneType`
+            The file paths are hashed relative to this directory.
+        timeout : `float`, default `NoneType`
+            The maximum number of seconds to read a single file. If either
+            `timeout` or `memory_limit` is supplied the files are read in an
+            isolated worker process (see `isolation.IsolatedReader`), and
+            files exceeding the limits or crashing the worker are added to
+            `QuarantineList` while extraction continues.
+        memory_limit : `int`, default `NoneType`
+            The maximum address space in bytes of the worker process reading
+            the files (POSIX only).
+        telemetry : `Telemetry`, default `NoneType`
+            Records the files and bytes read, the extracted ECGs, failures
+            by cause, read-ahead depth and reader and writer utilization of
+            `get_table` and `write_ecg`, and periodically writes these to its
+            metrics file. The `verbose` messages are rate-limited by its
+            `printer`.
         
         Attributes
         ----------
@@ -870,6 +1483,10 @@ class ECGDICOMTable(object):
             File paths which were either absent or without read permission.
         CuratedPathList : list [`str`]
             File paths which are readable.
+        partition : `tuple` [`int`, `int`] or `NoneType`
+            The extracted partition.
+        isolated_reader : `IsolatedReader` or `NoneType`
+            The worker reading the files, if limits were supplied.
         
         Returns
         -------
@@ -878,8 +1495,14 @@ class ECGDICOMTable(object):
         """
         is_type(skip_missing, str)
         is_type(verbose, bool)
+        is_type(duplicates, str)
+        is_type(uid_index, (type(None), pathlib.PosixPath, str))
+        is_type(telemetry, (type(None), Telemetry), 'telemetry')
+        self.telemetry = telemetry
         self.skip_missing = skip_missing
         self.verbose = verbose
+        self.duplicates = duplicates
+        self.uid_index = uid_index
         SKIP_MISSING = [PDNames.SKIP_PERMISSIONS,
                         PDNames.SKIP_DATA,
                         PDNames.SKIP_NONE,
@@ -887,11 +1510,28 @@ class ECGDICOMTable(object):
         if not skip_missing in SKIP_MISSING:
             raise ValueError(Error_MSG.CHOICE_PARM.\
                              format('skip_missing', ', '.join(SKIP_MISSING)))
+        DUPLICATES = [PDNames.DUP_RAISE, PDNames.DUP_SKIP, PDNames.DUP_LATEST]
+        if not duplicates in DUPLICATES:
+            raise ValueError(Error_MSG.CHOICE_PARM.\
+                             format('duplicates', ', '.join(DUPLICATES)))
+        # #### optionally read the files in an isolated worker
+        self.isolated_reader = None
+        if timeout is not None or memory_limit is not None:
+            self.isolated_reader = IsolatedReader(
+                self.ecgdicomreader, timeout=timeout,
+                memory_limit=memory_limit)
+        # #### select the partition
+        paths = getattr(self, PDNames.RPATH_L)
+        self.partition = None
+        if partition is not None:
+            self.partition = parse_partition(partition)
+            paths = select_partition(paths, self.partition, by=partition_by,
+                                     root=partition_root)
         # #### loop over path
         empty_list = []
         curated_list = []
         # #### loop over individual dcm files and assign to self
-        for p in getattr(self, PDNames.RPATH_L):
+        for p in paths:
             try:
                 # add p and remove if skipp_missing == True
                 curated_list.append(p)
@@ -906,6 +1546,8 @@ class ECGDICOMTable(object):
                     raise PE
         setattr(self, PDNames.FPATH_L, empty_list)
         setattr(self, PDNames.CPATH_L, curated_list)
+        if telemetry is not None and len(empty_list) > 0:
+            telemetry.failure(PDNames.FAIL_UNREADABLE, len(empty_list))
         # #### do we want to print empty_list
         if self.verbose == True:
             if len(getattr(self, PDNames.FPATH_L))>0:
@@ -917,6 +1559,9 @@ class ECGDICOMTable(object):
         return self
     # /////////////////////////////////////////////////////////////////////////
     def get_table(self, update_keys:Optional[Dict[str, str]]=None,
+                  rhythm_leads:str|List[str]|None=None,
+                  memory_budget:int|None=None,
+                  profile:int|float|None=None,
                   **kwargs:Optional[Any],
                   ) -> Self:
         """
@@ -926,6 +1571,22 @@ class ECGDICOMTable(object):
         ----------
         update_keys: dict [`str`, `str`], default `NoneType`
             A dictionary to remap lead names: [`old`, `new`]
+        rhythm_leads: `str` or list [`str`], default `NoneType`
+            The lead (e.g. `II`), or lead combination, used to detect the
+            R-peaks. If supplied, the heart rate, RR interval and heart rate
+            variability features are added to the `GeneralInfoTable`, see
+            `rhythm.rhythm_features`. The ECGs are processed in batches of
+            equal sampling frequency and length. Requires `info_type` `all`
+            or `meta`.
+        memory_budget: `int`, default `NoneType`
+            The bytes available for the lead arrays held before conversion
+            to the long-format tables. If supplied the waveforms are
+            converted in batches sized by the measured bytes per ECG (see
+            `batching.BatchController`), otherwise all at once.
+        profile: `int` or `float`, default `NoneType`
+            Profiles reading the first `profile` files, or a fraction of the
+            files if a float, and making the tables with `cProfile`, see
+            `profiling.StageProfiler`.
         **kwargs: optional
             Keyword arguments used in the call method of a `ECGDICOMReader`
             instance
@@ -940,28 +1601,68 @@ class ECGDICOMTable(object):
             A  long-format table with waveforms.
         MedianWaveTable: pandas.DataFrame
             A long-format table with the median beat waveforms.
+        AnnotationTable: pandas.DataFrame
+            A long-format table with the referenced sample positions, only
+            if the `ECGDICOMReader` was initialised with
+            `extract_annotations=True`.
+        QualityTable: pandas.DataFrame
+            The quality control metrics with one row per ECG and lead, only
+            if the `ECGDICOMReader` was initialised with
+            `quality_control=True`.
         NoDataList : `list` [`str`]
             A list of dicom files without a waveform_array.
+        DuplicateList : `list` [`tuple` [`str`, `str`, `str`]]
+            The path, SOPinstanceUID and reason of skipped duplicate files.
+        QuarantineList : `list` [`tuple` [`str`, `str`, `float`]]
+            The path, reason and seconds of files exceeding the `timeout` or
+            `memory_limit` supplied to `__call__`.
+        BatchSizes : `list` [`int`]
+            The number of ECGs per converted batch.
+        Profiler : `StageProfiler` or `NoneType`
+            The `read` and `tables` profiles, if `profile` is supplied.
         
         Returns
         -------
         self : `ECGDICOMTable` instance
             Returns the class instance with updated attributes.
+        
+        Notes
+        -----
+        The long-format tables hold about five times the bytes of the lead
+        arrays. With a `memory_budget` the arrays of a batch are released
+        once converted, rather than held next to the complete tables. The
+        rows of the waveform tables are then ordered by batch, and by lead
+        within a batch.
         """
         self.kwargs = kwargs
+        is_type(rhythm_leads, (type(None), str, list), 'rhythm_leads')
+        is_type(memory_budget, (type(None), int), 'memory_budget')
+        self._check_rhythm_leads(rhythm_leads)
+        controller = None if memory_budget is None else\
+            BatchController(memory_budget)
         # #### check if __call__ has been run
         if not hasattr(self, PDNames.CPATH_L):
             raise NotCalledError()
+        self._start_uid_index()
+        self._start_profiler(profile)
         # #### extract dicom data
-        no_data_list, key_list, info_list, wave_list, median_list =\
-            [[] for _ in range(5)]
+        no_data_list, key_list, info_list, wave_list, median_list,\
+            annotation_list, frequency_list, quality_list =\
+            [[] for _ in range(8)]
+        # the converted waveform tables, rhythm features and the keys of the
+        # current batch
+        wave_frames, median_frames, feature_frames, batch_keys =\
+            [], [], [], []
+        # the lead names of the last converted ECG by waveform type
+        previous = {}
+        raw = self.ecgdicomreader.raw_waveforms
         # loop over individual dcm files
         for p in getattr(self, PDNames.CPATH_L):
             if self.verbose == True:
-                print(STDOUT_MSG.PROCESSING_PATH.format(p), file=sys.stdout)
+                self._print(STDOUT_MSG.PROCESSING_PATH.format(p))
             # get instance
             try:
-                ecg_inst = self.ecgdicomreader(p, **self.kwargs)
+                ecg_inst = self._read_ecg(p, **self.kwargs)
             except AttributeError as AE:
                 if self.skip_missing == PDNames.SKIP_DATA:
                     no_data_list.append(p)
@@ -969,53 +1670,308 @@ class ECGDICOMTable(object):
                     continue
                 else:
                     raise AE
+            if ecg_inst is None:
+                continue
             # extract unique identifier and check if it has been used before
             if hasattr(ecg_inst, PDNames.SOP_UID) == False:
                 raise AttributeError(Error_MSG.MISSING_ATTR.format(
                     PDNames.SOP_UID, 'ecg_inst'))
             key = str(getattr(ecg_inst, PDNames.SOP_UID))
-            if key in key_list:
-                raise IndexError('{0}:{1} was already extracted before. Please '
-                                 'ensure the supplied files are unique.'.\
-                                 format(PDNames.SOP_UID, key))
-            else:
-                key_list.append(key)
+            if self._check_duplicate(key, p) == False:
+                continue
+            key_list.append(key)
+            if self.telemetry is not None:
+                self.telemetry.ecg_extracted()
             # extract the remaining
             if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
                 info_list.append(getattr(ecg_inst, PDNames.RESULTS_DICT))
-            if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM:
-                wave_list.append(getattr(ecg_inst, PDNames.LEAD_VOLTAGES))
+            # NOTE raw waveforms are kept as integers until the tables are made
+            frequency = getattr(ecg_inst, PDNames.RESULTS_DICT)[
+                PDNames.SF_ORIGINAL]
+            # the rhythm features are detected once a batch is converted
+            if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM or\
+                    rhythm_leads is not None:
+                wave_list.append(getattr(ecg_inst, PDNames.LEAD_VOLTAGES)
+                                 if raw == False else
+                                 (getattr(ecg_inst, PDNames.LEAD_VOLTAGES),
+                                  getattr(ecg_inst, PDNames.LEAD_SCALING),
+                                  frequency))
             if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED:
-                median_list.append(getattr(ecg_inst, PDNames.LEAD_VOLTAGES2))
+                median_list.append(getattr(ecg_inst, PDNames.LEAD_VOLTAGES2)
+                                   if raw == False else
+                                   (getattr(ecg_inst, PDNames.LEAD_VOLTAGES2),
+                                    getattr(ecg_inst, PDNames.LEAD_SCALING2),
+                                    getattr(ecg_inst, PDNames.SF_MEDIAN)))
+            if self.ecgdicomreader.extract_annotations == True:
+                annotation_list.append(getattr(ecg_inst, PDNames.ANNOTATIONS))
+            if self.ecgdicomreader.quality_control == True:
+                quality_list.append(getattr(ecg_inst, PDNames.QUALITY))
+            if rhythm_leads is not None:
+                frequency_list.append(getattr(ecg_inst, PDNames.RESULTS_DICT)[
+                    PDNames.SF])
+            # #### convert a batch fitting the memory budget
+            if controller is not None:
+                batch_keys.append(key)
+                nbytes = [lead_nbytes(l[-1]) for l in [wave_list, median_list]
+                          if len(l) > 0]
+                controller.observe(sum(n[0] for n in nbytes),
+                                   sum(n[1] for n in nbytes))
+                if len(batch_keys) >= controller.size:
+                    self._start_stage(PDNames.PROFILE_TABLES, force=True)
+                    self._convert_batch(wave_list, median_list, batch_keys,
+                                        wave_frames, median_frames,
+                                        update_keys, controller,
+                                        rhythm_leads, frequency_list,
+                                        feature_frames, previous)
+                    self._stop_stage()
+        self._close_reader()
         # #### make tables
+        self._start_stage(PDNames.PROFILE_TABLES, force=True)
         setattr(self, PDNames.FAILED_DATA_L, no_data_list)
+        if controller is None:
+            batch_keys = list(key_list)
+        self._convert_batch(wave_list, median_list, batch_keys, wave_frames,
+                            median_frames, update_keys, controller,
+                            rhythm_leads, frequency_list, feature_frames,
+                            previous)
+        setattr(self, PDNames.BATCH_SIZES, [] if controller is None else
+                controller.sizes)
         setattr(self, PDNames.KEY_L, key_list)
         # general info
         if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
-            setattr(self, PDNames.INFO_T, pd.DataFrame(
-                info_list, index=getattr(self, PDNames.KEY_L)
+            setattr(self, PDNames.INFO_T, self.ecgdicomreader.format_dates(
+                pd.DataFrame(info_list, index=getattr(self, PDNames.KEY_L))
             ))
+            if rhythm_leads is not None:
+                setattr(self, PDNames.INFO_T, self._add_rhythm_features(
+                    getattr(self, PDNames.INFO_T), pd.concat(feature_frames)))
+                del feature_frames
         # wave forms, and median beats
-        if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM:
-            setattr(self, PDNames.WAVE_T, self._get_long_table(
-                wave_list, wave_type=PDNames.WAVETYPE_RHYTHM,
-                update_keys=update_keys,
-                purge_header=True,
-            ))
-        if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED:
-            setattr(self, PDNames.MEDIAN_T, self._get_long_table(
-                median_list, wave_type=PDNames.WAVETYPE_MEDIAN,
-                update_keys=update_keys,
-                purge_header=True,
-            ))
+        for name, frames in [(PDNames.WAVE_T, wave_frames),
+                             (PDNames.MEDIAN_T, median_frames)]:
+            if len(frames) > 0:
+                setattr(self, name, frames[0] if len(frames) == 1 else
+                        pd.concat(frames, ignore_index=True))
+        del wave_frames, median_frames
+        # annotations
+        if self.ecgdicomreader.extract_annotations == True:
+            setattr(self, PDNames.ANNOTATION_T, self._get_annotation_table(
+                annotation_list))
+        # quality control
+        if self.ecgdicomreader.quality_control == True:
+            setattr(self, PDNames.QUALITY_T, self._get_quality_table(
+                quality_list, update_keys=update_keys))
+        self._stop_profiler()
+        self._finish_uid_index()
+        if self.telemetry is not None:
+            self.telemetry.emit()
         # #### Return
         setattr(self, PDNames.TABLE_CALLED, 'True')
         return self
     # /////////////////////////////////////////////////////////////////////////
+    def _convert_batch(self, wave_list:list, median_list:list,
+                       batch_keys:List[str], wave_frames:List[pd.DataFrame],
+                       median_frames:List[pd.DataFrame],
+                       update_keys:Optional[Dict[str, str]]=None,
+                       controller:BatchController|None=None,
+                       rhythm_leads:str|List[str]|None=None,
+                       frequencies:List[float]|None=None,
+                       feature_frames:List[pd.DataFrame]|None=None,
+                       previous:Dict[str, List[str]]|None=None,
+                       ) -> None:
+        '''
+        Converts the waveforms of a batch to long-format tables, appended to
+        `wave_frames` and `median_frames`. The batch lists are emptied to
+        release the lead arrays, and raw waveforms are converted to physical
+        units one file at a time while the tables are made. If
+        `rhythm_leads` is supplied the rhythm features of the batch, detected
+        on these leads of each converted ECG, are appended to
+        `feature_frames`.
+        
+        Parameters
+        ----------
+        wave_list, median_list : `list`
+            The rhythm and median lead arrays of the batch, or raw
+            `(leads, scaling, frequency)` tuples.
+        batch_keys : `list` [`str`]
+            The SOPinstanceUIDs of the batch.
+        controller : BatchController, default `NoneType`
+            Records the batch size and the measured bytes per table row.
+        rhythm_leads : `str` or list [`str`], default `NoneType`
+            The lead, or lead combination, used to detect the R-peaks.
+        frequencies : list [`float`], default `NoneType`
+            The sampling frequency of the rhythm waveforms of the batch,
+            emptied with the batch lists.
+        feature_frames : list [`pd.DataFrame`], default `NoneType`
+            The rhythm features of the converted batches.
+        previous : dict [`str`, list [`str`]], default `NoneType`
+            The lead names of the last converted ECG by waveform type,
+            updated so ECGs with distinct leads raise a `KeyError` across
+            batches as well.
+        '''
+        if len(batch_keys) == 0:
+            return
+        previous = {} if previous is None else previous
+        raw = self.ecgdicomreader.raw_waveforms
+        # the rhythm leads of each converted ECG
+        rhythm = []
+        def convert(leads, median):
+            if raw == True:
+                leads = self._raw_to_voltages(leads, median=median)
+            if rhythm_leads is not None and median == False:
+                rhythm.append(_select_leads(leads, rhythm_leads))
+            return leads
+        # NOTE `_get_long_table` maps the lists to `IndexList`
+        setattr(self, PDNames.KEY_L, list(batch_keys))
+        for lst, frames, wave_type, info_types, median in [
+            (wave_list, wave_frames, PDNames.WAVETYPE_RHYTHM, self.INFO_RTM,
+             False),
+            (median_list, median_frames, PDNames.WAVETYPE_MEDIAN,
+             self.INFO_MED, True)]:
+            if not getattr(self, PDNames.INFO_TYPE) in info_types:
+                # the rhythm waveforms are only kept for the rhythm features
+                for leads in lst:
+                    convert(leads, median)
+                lst.clear()
+                continue
+            # NOTE the header is only purged for the first batch
+            if wave_type in previous:
+                self.previous = previous[wave_type]
+            frames.append(self._get_long_table(
+                lst, wave_type=wave_type, update_keys=update_keys,
+                purge_header=not wave_type in previous,
+                convert=functools.partial(convert, median=median),
+            ))
+            previous[wave_type] = self.previous
+            if controller is not None:
+                controller.observe_frame(
+                    int(frames[-1].memory_usage(index=True).sum()),
+                    len(frames[-1]))
+            lst.clear()
+        if rhythm_leads is not None:
+            feature_frames.append(self._get_rhythm_features(
+                rhythm, list(frequencies), list(batch_keys), rhythm_leads))
+            frequencies.clear()
+        if controller is not None:
+            controller.record(len(batch_keys))
+        batch_keys.clear()
+    # /////////////////////////////////////////////////////////////////////////
+    def _raw_to_voltages(self, raw:tuple, median:bool=False,
+                         ) -> Dict[str, np.ndarray]|float:
+        '''
+        Converts a raw `(leads, scaling, frequency)` tuple to physical units,
+        filtering the rhythm waveforms after resampling.
+        '''
+        leads, scaling, frequency = raw
+        if not isinstance(leads, dict):
+            return leads
+        leads = self.ecgdicomreader.to_voltages(
+            leads, scaling, frequency, 600 if median == True else 5000)
+        if self.ecgdicomreader.ecgfilter is not None and median == False:
+            leads = self.ecgdicomreader._filter_leads(
+                leads, frequency=500 if
+                self.ecgdicomreader.resample_500 == True else frequency)
+        # return
+        return leads
+    # /////////////////////////////////////////////////////////////////////////
+    def _check_rhythm_leads(self, rhythm_leads:str|List[str]|None) -> None:
+        '''
+        Confirms the rhythm features can be added to a metadata table.
+        '''
+        if rhythm_leads is not None and\
+                not getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
+            raise ValueError('`rhythm_leads` requires `info_type` to be `{}` '
+                             'or `{}`.'.format(*self.INFO_MET))
+    # /////////////////////////////////////////////////////////////////////////
+    def _get_rhythm_features(self, waves:List[Dict[str, np.ndarray]|float],
+                             frequencies:List[float], keys:List[str],
+                             rhythm_leads:str|List[str],
+                             ) -> pd.DataFrame:
+        '''
+        Detects the rhythm features of a list of ECGs.
+        
+        Parameters
+        ----------
+        waves : list [`dict` [`str`, `np.ndarray`]]
+            The rhythm waveforms in physical units.
+        frequencies : list [`float`]
+            The sampling frequency per ECG.
+        keys : list [`str`]
+            The SOPinstanceUID per ECG, used as index.
+        rhythm_leads : `str` or list [`str`]
+            The lead, or lead combination, used to detect the R-peaks.
+        
+        Returns
+        -------
+        pd.DataFrame
+        '''
+        features = rhythm_features(
+            waves, frequencies=frequencies, leads=rhythm_leads)
+        features.index = keys
+        # return
+        return features
+    # /////////////////////////////////////////////////////////////////////////
+    def _add_rhythm_features(self, info:pd.DataFrame, features:pd.DataFrame,
+                             ) -> pd.DataFrame:
+        '''
+        Adds the detected rhythm features, and their difference from the
+        DICOM `VRate` and `RR Interval`, to a metadata table.
+        
+        Parameters
+        ----------
+        info : pd.DataFrame
+            The metadata.
+        features : pd.DataFrame
+            The `_get_rhythm_features`, indexed by SOPinstanceUID.
+        
+        Returns
+        -------
+        pd.DataFrame
+        '''
+        return compare_annotations(info.join(features))
+    # /////////////////////////////////////////////////////////////////////////
+    def _get_quality_table(self, quality_list:List[Dict[str, np.ndarray]|float],
+                           update_keys:Optional[Dict[str,str]]=None,
+                           ) -> pd.DataFrame:
+        '''
+        Mapping lists of lead specific quality control metrics to a table
+        with one row per ECG and lead.
+        
+        Parameters
+        ----------
+        quality_list : list [`dict` [`str`, `np.ndarray`]]
+            The `QualityControl` attributes, matching `IndexList`.
+        update_keys : dict [`str`, `str`], default `NoneType`
+            A dictionary to remap lead names: [`old`, `new`]
+        
+        Returns
+        -------
+        pd.DataFrame
+            The table, ECGs without rhythm waveforms are omitted.
+        '''
+        tables = []
+        for q, k in zip(quality_list, getattr(self, PDNames.KEY_L),
+                        strict=True):
+            if not isinstance(q, dict):
+                continue
+            temp_df = pd.DataFrame(q)
+            temp_df.insert(0, PDNames.SOP_UID, k)
+            tables.append(temp_df)
+        if len(tables) == 0:
+            return pd.DataFrame(columns=[PDNames.SOP_UID, PDNames.COL_LEAD] +
+                                QC_METRICS)
+        table = pd.concat(tables, ignore_index=True)
+        if update_keys is not None:
+            table[PDNames.COL_LEAD] = table[PDNames.COL_LEAD].replace(
+                update_keys)
+        # return
+        return table
+    # /////////////////////////////////////////////////////////////////////////
     def _get_long_table(self, lead_list:List[Dict[str, np.ndarray]],
                         wave_type:str,
                         update_keys:Optional[Dict[str,str]]=None,
                         purge_header:bool=True,
+                        convert:Callable[[Any], Dict[str, np.ndarray]]|None=None,
                         **kwargs,
                         ) -> pd.DataFrame:
         '''
@@ -1034,6 +1990,10 @@ class ECGDICOMTable(object):
         purge_header : bool, default True
             Set to `False` to make sure the file header persists between calls.
             This is used to ensure the headers are the same between files.
+        convert : callable, default `NoneType`
+            Applied to each entry of `lead_list` just before it is mapped,
+            e.g. to convert raw waveforms to physical units one file at a
+            time.
         **kwargs : optional
             keyword arguments passed to pd.DataFrame.
         
@@ -1063,6 +2023,9 @@ class ECGDICOMTable(object):
         # #### initiate table and map lists
         table = pd.DataFrame()
         for w, k in zip(lead_list, getattr(self, PDNames.KEY_L), strict=True):
+            # NOTE the converted entry is released on the next iteration
+            if convert is not None:
+                w = convert(w)
             # do we need to remap key names
             if update_keys is not None:
                 w = {update_keys.get(k, k): v for k, v in w.items()}
@@ -1094,11 +2057,58 @@ class ECGDICOMTable(object):
         # #### return
         return long_table
     # /////////////////////////////////////////////////////////////////////////
+    def _get_annotation_table(self, annotation_list:List[Dict[str, np.ndarray]],
+                              ) -> pd.DataFrame:
+        '''
+        Mapping lists of dictionaries with annotation arrays to a
+        long-formatted pandas table.
+        
+        Parameters
+        ----------
+        annotation_list : list [`dict`]
+            A list of dictionaries as returned by
+            `ECGDICOMReader.get_annotations`, ordered as the `IndexList`.
+        
+        Returns
+        -------
+        table : pd.DataFrame
+            A long-formatted table with one row per annotation, referenced
+            channel and sample position, including an unique file indicator
+            column.
+        '''
+        is_type(annotation_list, list, 'annotation_list')
+        COLUMNS = [PDNames.COL_ANN_CONCEPT, PDNames.COL_ANN_GROUP,
+                   PDNames.COL_ANN_CHANNEL, PDNames.COL_ANN_POSITION]
+        keys = getattr(self, PDNames.KEY_L)
+        sizes = [len(a[PDNames.COL_ANN_POSITION]) for a in annotation_list]
+        # concatenate the arrays once instead of per file
+        table = pd.DataFrame({
+            PDNames.SOP_UID: np.repeat(np.asarray(keys, dtype=object), sizes),
+            **{c: np.concatenate(
+                [a[c] for a in annotation_list] +
+                [np.empty(0, dtype=object if c == PDNames.COL_ANN_CONCEPT
+                          else np.int64)]
+            ) for c in COLUMNS},
+        })
+        # return
+        return table
+    # /////////////////////////////////////////////////////////////////////////
     def write_ecg(self, target_tar:Union[None,str]=None, target_path:str='.',
                   table_prefix:str='',
                   sep:str='\t', mode:str='w:gz', compression:str='gzip',
                   update_keys:Optional[Dict[str,str]]=None,
                   write_failed:bool=True,
+                  catalog:Union[None,str]=None,
+                  random_access:bool=False,
+                  ecgs_per_shard:int|None=None,
+                  max_shard_size:int|None=None,
+                  rhythm_leads:str|List[str]|None=None,
+                  waveform_format:str='tsv',
+                  codec_compressor:str='zlib',
+                  preview_levels:List[int]|None=None,
+                  memory_budget:int|None=None,
+                  profile:int|float|None=None,
+                  info_chunk_size:int=1000,
                   **kwargs:Optional[Any],
                   ) -> Self:
         '''
@@ -1134,6 +2144,50 @@ class ECGDICOMTable(object):
         write_failed : bool, default `True`
             Whether to write a text file to disk containing the failed file
             names.
+        catalog : str, default `NoneType`
+            The path to an optional SQLite catalog (see `ECGCatalog`). The
+            metadata of each extracted ECG is added to this catalog, together
+            with the source path and output location. An existing catalog is
+            updated.
+        random_access : bool, default `False`
+            Whether to write `WaveformIndex.tsv` recording the byte offset
+            and length of each ECG's block in the rhythm and median tables,
+            which allows `WaveformIndex.load_ecg` to read a single ECG
+            without decompressing the entire table. Requires `target_tar` to
+            be `NoneType` and `compression` to be `gzip` or `NoneType`.
+        ecgs_per_shard : `int`, default `NoneType`
+            The maximum number of ECGs per shard.
+        max_shard_size : `int`, default `NoneType`
+            The approximate maximum size in bytes of a shard, summed over its
+            (compressed) tables. A new shard is started once this size has
+            been reached.
+        rhythm_leads : `str` or list [`str`], default `NoneType`
+            The lead, or lead combination, used to detect the R-peaks. If
+            supplied the rhythm features are added to the metadata, see
+            `get_table`.
+        waveform_format : {`tsv`, `ecgz`}, default `tsv`
+            Whether to write the rhythm and median waveforms as long-format
+            tables, or as lossless binary blocks (see `codec.encode_ecg`).
+        codec_compressor : {`zlib`, `lzma`, `zstd`}, default `zlib`
+            The compression of the `ecgz` blocks.
+        preview_levels : list [`int`], default `NoneType`
+            The decimation factors of the min/max preview envelopes of the
+            rhythm waveforms, e.g. `[4, 16]` for 125 and 31.25 Hertz
+            envelopes of a 500 Hertz ECG (see `pyramid.build_pyramid`).
+        memory_budget : `int`, default `NoneType`
+            The bytes available for ECGs read ahead of the writer. If
+            supplied the files are read in a background thread, which blocks
+            once the ECGs waiting to be written exceed the budget (see
+            `batching.ReadAhead`).
+        profile : `int` or `float`, default `NoneType`
+            Profiles reading and writing the first `profile` files, or a
+            fraction of the files if a float, with `cProfile`. The files are
+            then read without `memory_budget` read-ahead, so the reading is
+            profiled in the calling thread.
+        info_chunk_size : `int`, default 1000
+            The number of metadata rows formatted (see
+            `ECGDICOMReader.format_dates`) and written at once. The rows are
+            also written before a new shard is started.
         **kwargs : Optional[Any],
             Keyword arguments used in the call method of a `ECGDICOMReader`
             instance.
@@ -1144,6 +2198,18 @@ class ECGDICOMTable(object):
             The directory or tar file path were the files are written to.
         NoDataList : `list` [`str`]
             A list of dicom files without a waveform_array.
+        QuarantineList : `list` [`tuple` [`str`, `str`, `float`]]
+            The path, reason and seconds of quarantined files.
+        BatchSizes : `list` [`int`]
+            The successive number of ECGs the read-ahead may hold, if
+            `memory_budget` is supplied.
+        BackpressureSeconds : `float`
+            The seconds the reading thread waited for the writer.
+        Profiler : `StageProfiler` or `NoneType`
+            The `read` and `write` profiles, if `profile` is supplied.
+        ShardManifest : pd.DataFrame
+            The shard manifest, if `ecgs_per_shard` or `max_shard_size` is
+            supplied.
         
         Returns
         -------
@@ -1156,7 +2222,63 @@ class ECGDICOMTable(object):
         - `GeneralInfoTable.tsv`
         - `WaveFormsTable.tsv`
         - `MedianWaveTable.tsv`
+        - `AnnotationTable.tsv`, if the `ECGDICOMReader` was initialised with
+          `extract_annotations=True`.
+        - `QualityTable.tsv`, if the `ECGDICOMReader` was initialised with
+          `quality_control=True`.
         - `FailedFiles.txt`
+        - `DuplicateFiles.txt`
+        - `QuarantineFiles.txt`, if files were quarantined.
+        - `WaveForms.ecgz` and `MedianWaves.ecgz`, instead of the
+          waveform tables if `waveform_format` is `ecgz`.
+        - `WavePreview.ecgz`, if `preview_levels` is supplied.
+        - `WaveformIndex.tsv`, if `random_access` is `True`.
+        - `ShardManifest.tsv`, if `ecgs_per_shard` or `max_shard_size` is
+          supplied.
+        - `PartitionManifest.tsv`, if a `partition` was selected.
+        - `Profile_read.pstats`, `Profile_write.pstats`,
+          `ProfileSummary.tsv` and `ProfileComponents.tsv`, if `profile` is
+          supplied.
+        
+        If `__call__` selected a partition all file names are prefixed by
+        the partition (e.g. `Partition_00001_of_00004_`), so several servers
+        can write to the same directory. `PartitionManifest.tsv` lists the
+        written SOPinstanceUIDs and their source path, and is combined across
+        servers by `partitions.merge_partitions`.
+        
+        Each ECG is appended as a separate gzip member, hence the
+        compressed tables can be read from any recorded block offset.
+        
+        The `ecgz` blocks depend on the `ECGDICOMReader`:
+        
+        - With `raw_waveforms=True` the integer samples of the dicom are
+          stored, delta encoded per lead, with the per-lead scaling at the
+          original sampling frequency; typically an order of magnitude
+          smaller than the gzip tables. These are not resampled, augmented
+          or filtered and hence differ from the `tsv` tables:
+          `codec.to_voltages` only applies the scaling, while
+          `ECGDICOMReader.to_voltages` (followed by the `ecgfilter`, if any)
+          reproduces the `tsv` voltages exactly.
+        - Otherwise the voltages of the `tsv` tables are stored as floating
+          point byte planes without delta encoding, which is considerably
+          larger, and a warning is raised.
+        
+        The preview envelopes are written as `ecgz` blocks with `Waveform
+        type` `rhythm_x4`, `rhythm_x16`, etc., holding the decimated integer
+        samples and their scaling if the raw waveforms are neither filtered,
+        resampled nor augmented, and `float32` voltages otherwise. These are
+        indexed in `WaveformIndex.tsv` if `random_access` is `True`, so a
+        review tool can load the level matching its pixel width
+        (`pyramid.select_level`) using `WaveformIndex.load_previews`.
+        
+        If either `ecgs_per_shard` or `max_shard_size` is supplied the tables
+        are rotated into numbered shards, prefixing the file names with
+        `Shard_00000_`, `Shard_00001_`, etc. The rotation is decided before
+        an ECG is written, hence the metadata, rhythm, median and annotation
+        tables of a shard contain the same ECGs and each shard file has its
+        own header. `ShardManifest.tsv` lists the files per shard, with the
+        number of ECGs, the size in bytes, the first and last dicom UID, and
+        the legacy batch range (e.g. `001000_002000`) of the shard.
         
         Raises
         ------
@@ -1171,6 +2293,48 @@ class ECGDICOMTable(object):
         is_type(table_prefix, str, 'table_prefix')
         is_type(mode, str, 'mode')
         is_type(compression, (type(None), str), 'compression')
+        is_type(random_access, bool, 'random_access')
+        is_type(ecgs_per_shard, (type(None), int), 'ecgs_per_shard')
+        is_type(max_shard_size, (type(None), int), 'max_shard_size')
+        is_type(rhythm_leads, (type(None), str, list), 'rhythm_leads')
+        is_type(memory_budget, (type(None), int), 'memory_budget')
+        is_type(info_chunk_size, int, 'info_chunk_size')
+        self._check_rhythm_leads(rhythm_leads)
+        if info_chunk_size < 1:
+            raise ValueError('`info_chunk_size` should be larger than 0.')
+        if memory_budget is not None and profile is not None:
+            warnings.warn('`memory_budget` is ignored while profiling.')
+            memory_budget = None
+        controller = None if memory_budget is None else\
+            BatchController(memory_budget)
+        if not waveform_format in PDNames.WAVE_FORMATS:
+            raise ValueError(Error_MSG.CHOICE_PARM.format(
+                'waveform_format', ', '.join(PDNames.WAVE_FORMATS)))
+        if not codec_compressor in PDNames.CODEC_COMPRESSORS:
+            raise ValueError(Error_MSG.CHOICE_PARM.format(
+                'codec_compressor', ', '.join(PDNames.CODEC_COMPRESSORS)))
+        codec = waveform_format == PDNames.WAVE_FORMAT_CODEC
+        if codec == True and self.ecgdicomreader.raw_waveforms == False:
+            warnings.warn('`waveform_format` `ecgz` stores the voltages '
+                          'without delta encoding, initialise the '
+                          '`ECGDICOMReader` with `raw_waveforms=True` to '
+                          'store the integer samples.')
+        is_type(preview_levels, (type(None), list), 'preview_levels')
+        if preview_levels is not None and (
+                not getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM or
+                any(not isinstance(l, int) or l < 2 for l in preview_levels)):
+            raise ValueError('`preview_levels` should contain integers larger '
+                             'than 1, and requires the rhythm waveforms.')
+        if (ecgs_per_shard is not None and ecgs_per_shard < 1) or\
+                (max_shard_size is not None and max_shard_size < 1):
+            raise ValueError('`ecgs_per_shard` and `max_shard_size` should be '
+                             'larger than 0.')
+        sharded = ecgs_per_shard is not None or max_shard_size is not None
+        if random_access == True and (target_tar is not None or (
+                codec == False and compression not in [None, 'gzip'])):
+            raise ValueError('`random_access` requires `target_tar` to be '
+                             '`NoneType` and `compression` to be `gzip` or '
+                             '`NoneType`.')
         # check readability
         _check_presence(target_path)
         _check_readable(target_path)
@@ -1194,121 +2358,530 @@ class ECGDICOMTable(object):
         # #### check if __call__ has been run
         if not hasattr(self, PDNames.CPATH_L):
             raise NotCalledError()
+        self._start_uid_index()
+        self._start_profiler(profile)
+        # #### tag the output with the partition
+        if getattr(self, 'partition', None) is not None:
+            table_prefix = partition_prefix(self.partition) + table_prefix
+        # #### optional metadata catalog
+        ecg_catalog, output_location = None, None
+        if catalog is not None:
+            from ecgprocess.catalog import ECGCatalog
+            ecg_catalog = ECGCatalog(
+                catalog, columns=list(self.ecgdicomreader.METADATA) +\
+                list(self.ecgdicomreader.WAVE_FORMS))
+            output_location = target if target_tar is None else\
+                os.path.join(target_path, target_tar)
+        # the metadata rows, source paths and rhythm features of the current
+        # chunk, formatted and written together by `_write_info`
+        info_chunk = [[] for _ in range(4)]
+        info_header = True
         # #### extract dicom data
         first=True
-        key_list, no_data_list = [[] for _ in range(2)]
+        key_list, no_data_list, block_index, written = [[] for _ in range(4)]
+        # the shard state, `prefix` is used for the shard specific tables
+        shard, shard_keys, manifest, n_written = 0, [], [], 0
+        prefix = table_prefix + PDNames.SHARD_PREFIX.format(
+            str(shard).zfill(5)) if sharded == True else table_prefix
         # loop over individual dcm files
-        for p in getattr(self, PDNames.CPATH_L):
-            no_data_list, key_list, ecg_inst = self._write_internal(
-                path=p, no_data_list=no_data_list, key_list=key_list,
-                **self.kwargs,
-                )
-            if isinstance(ecg_inst, str):
-                continue
-            # #### extract data from ecg_inst
-            if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
-                info=getattr(ecg_inst, PDNames.RESULTS_DICT)
-            if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM:
-                wave=getattr(ecg_inst, PDNames.LEAD_VOLTAGES)
-            if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED:
-                median=getattr(ecg_inst, PDNames.LEAD_VOLTAGES2)
-            # assign key to self for use in `_get_long_table`
-            setattr(self, PDNames.KEY_L, [key_list[-1]])
-            # #### write to disk
-            if first==True:
-                first = False
-                # metadata
-                print([key_list[-1]])
-                if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
-                    pd.DataFrame([info], index=[key_list[-1]]).to_csv(
-                        os.path.join(target, table_prefix + PDNames.INFO_FILE), sep=sep,
-                        header=True, index=False, compression=compression)
-                # waveforms
+        setattr(self, PDNames.BACKPRESSURE, 0.0)
+        # NOTE the catalog and isolated reader are closed if writing fails
+        try:
+            for p, key, ecg_inst in self._iter_ecgs(
+                    getattr(self, PDNames.CPATH_L), no_data_list, key_list,
+                    controller):
+                start = time.perf_counter()
+                self._start_stage(PDNames.PROFILE_WRITE)
+                # #### extract data from ecg_inst
+                # the rhythm waveforms in physical units, converted once for
+                # the rhythm features, tables and previews
+                voltages = None
+                if rhythm_leads is not None or preview_levels is not None or\
+                        (getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM and
+                         codec == False):
+                    voltages = ecg_inst.get_voltages()
+                # NOTE the codec stores raw waveforms without conversion
                 if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM:
-                    self._get_long_table(
-                        [wave], wave_type=PDNames.WAVETYPE_RHYTHM,
-                        update_keys=update_keys,
-                        purge_header=True,
-                    ).to_csv(
-                            os.path.join(target, table_prefix + PDNames.WAVE_FILE), sep=sep,
-                            header=True, index=False, compression=compression)
-                # median beats
+                    wave=voltages if codec == False else\
+                        self._encode_waves(ecg_inst, key, median=False,
+                                           update_keys=update_keys,
+                                           compressor=codec_compressor)
                 if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED:
-                    self._get_long_table(
-                        [median], wave_type=PDNames.WAVETYPE_MEDIAN,
-                        update_keys=update_keys,
-                        purge_header=True,
-                    ).to_csv(
-                            os.path.join(target, table_prefix + PDNames.MEDIAN_FILE), sep=sep,
-                            header=True, index=False, compression=compression)
-            else:
-                # appending using mode = 'a'
-                # metadata
-                if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
-                    pd.DataFrame([info], index=[key_list[-1]]).to_csv(
-                        os.path.join(target, table_prefix + PDNames.INFO_FILE), sep=sep,
-                        header=False, index=False, mode='a', compression=compression)
+                    median=ecg_inst.get_voltages(median=True) if codec == False\
+                        else self._encode_waves(ecg_inst, key,
+                                                median=True,
+                                                update_keys=update_keys,
+                                                compressor=codec_compressor)
+                # assign key to self for use in `_get_long_table`
+                setattr(self, PDNames.KEY_L, [key])
+                written.append((key, p))
+                # #### rotate the shard by ECG count or size, before writing
+                if sharded == True and len(shard_keys) > 0 and (
+                        (ecgs_per_shard is not None and
+                         len(shard_keys) >= ecgs_per_shard) or
+                        (max_shard_size is not None and
+                         sum(self._shard_sizes(target, prefix).values()) >=
+                         max_shard_size)):
+                    self._write_info(info_chunk, target, prefix, info_header,
+                                     sep, compression, ecg_catalog,
+                                     output_location)
+                    info_header = True
+                    manifest.extend(self._shard_manifest(
+                        target, prefix, shard, shard_keys, n_written))
+                    n_written += len(shard_keys)
+                    shard, shard_keys, first = shard + 1, [], True
+                    prefix = table_prefix + PDNames.SHARD_PREFIX.format(
+                        str(shard).zfill(5))
+                shard_keys.append(key)
+                # #### write to disk, the first file includes the header
+                header = first
+                first = False
+                # metadata, the dates are formatted once per chunk of rows
+                if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET or\
+                        catalog is not None:
+                    results_dict = getattr(ecg_inst, PDNames.RESULTS_DICT)
+                    info_chunk[0].append(results_dict)
+                    info_chunk[1].append(key)
+                    info_chunk[2].append(p)
+                    if rhythm_leads is not None:
+                        info_chunk[3].append(self._get_rhythm_features(
+                            [voltages], [results_dict[PDNames.SF]], [key],
+                            rhythm_leads))
+                if len(info_chunk[0]) >= info_chunk_size:
+                    info_header = self._write_info(
+                        info_chunk, target, prefix, info_header, sep,
+                        compression, ecg_catalog, output_location)
+                # binary waveforms
+                if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM and\
+                        codec == True:
+                    block_index.append((key, PDNames.WAVETYPE_RHYTHM,
+                                        prefix + PDNames.WAVE_CODEC_FILE) +\
+                                       write_ecg_block(os.path.join(
+                                           target, prefix + PDNames.WAVE_CODEC_FILE),
+                                           wave, header=header))
+                if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED and\
+                        codec == True:
+                    block_index.append((key, PDNames.WAVETYPE_MEDIAN,
+                                        prefix + PDNames.MEDIAN_CODEC_FILE) +\
+                                       write_ecg_block(os.path.join(
+                                           target, prefix + PDNames.MEDIAN_CODEC_FILE),
+                                           median, header=header))
+                # preview envelopes
+                if preview_levels is not None:
+                    for factor, block in self._encode_previews(
+                            ecg_inst, key, voltages, preview_levels,
+                            update_keys=update_keys,
+                            compressor=codec_compressor).items():
+                        block_index.append(
+                            (key, PDNames.WAVETYPE_PREVIEW.format(factor),
+                             prefix + PDNames.PREVIEW_CODEC_FILE) +\
+                            write_ecg_block(
+                                os.path.join(target,
+                                             prefix + PDNames.PREVIEW_CODEC_FILE),
+                                block,
+                                header=header and factor == preview_levels[0]))
                 # waveforms
-                if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM:
-                    self._get_long_table(
-                        [wave], wave_type=PDNames.WAVETYPE_RHYTHM,
-                        update_keys=update_keys,
-                        purge_header=False,
-                    ).to_csv(
-                            os.path.join(target, table_prefix + PDNames.WAVE_FILE), sep=sep,
-                            header=False, index=False, mode='a', compression=compression)
+                if getattr(self, PDNames.INFO_TYPE) in self.INFO_RTM and\
+                        codec == False:
+                    block_index.append((key, PDNames.WAVETYPE_RHYTHM,
+                                        prefix + PDNames.WAVE_FILE) +\
+                                       self._write_block(
+                        self._get_long_table(
+                            [wave], wave_type=PDNames.WAVETYPE_RHYTHM,
+                            update_keys=update_keys,
+                            purge_header=header,
+                        ),
+                        path=os.path.join(target, prefix + PDNames.WAVE_FILE),
+                        header=header, sep=sep, compression=compression))
                 # median beats
-                if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED:
-                    self._get_long_table(
-                        [median], wave_type=PDNames.WAVETYPE_MEDIAN,
-                        update_keys=update_keys,
-                        purge_header=False,
-                    ).to_csv(
-                            os.path.join(target, table_prefix + PDNames.MEDIAN_FILE), sep=sep,
-                            header=False, index=False, mode='a', compression=compression)
-            # delete key
-            delattr(self, PDNames.KEY_L)
+                if getattr(self, PDNames.INFO_TYPE) in self.INFO_MED and\
+                        codec == False:
+                    block_index.append((key, PDNames.WAVETYPE_MEDIAN,
+                                        prefix + PDNames.MEDIAN_FILE) +\
+                                       self._write_block(
+                        self._get_long_table(
+                            [median], wave_type=PDNames.WAVETYPE_MEDIAN,
+                            update_keys=update_keys,
+                            purge_header=header,
+                        ),
+                        path=os.path.join(target, prefix + PDNames.MEDIAN_FILE),
+                        header=header, sep=sep, compression=compression))
+                # annotations
+                if self.ecgdicomreader.extract_annotations == True:
+                    self._write_block(
+                        self._get_annotation_table(
+                            [getattr(ecg_inst, PDNames.ANNOTATIONS)]),
+                        path=os.path.join(target, prefix + PDNames.ANNOTATION_FILE),
+                        header=header, sep=sep, compression=compression)
+                # quality control
+                if self.ecgdicomreader.quality_control == True:
+                    self._write_block(
+                        self._get_quality_table(
+                            [getattr(ecg_inst, PDNames.QUALITY)],
+                            update_keys=update_keys),
+                        path=os.path.join(target, prefix + PDNames.QUALITY_FILE),
+                        header=header, sep=sep, compression=compression)
+                # delete key
+                delattr(self, PDNames.KEY_L)
+                self._stop_stage()
+                if self.telemetry is not None:
+                    self.telemetry.ecg_extracted(time.perf_counter() - start)
+            info_header = self._write_info(
+                info_chunk, target, prefix, info_header, sep, compression,
+                ecg_catalog, output_location)
+        finally:
+            if ecg_catalog is not None:
+                ecg_catalog.close()
+            self._close_reader()
+        setattr(self, PDNames.BATCH_SIZES, [] if controller is None else
+                controller.sizes)
+        if self.verbose == True and controller is not None:
+            self._print(STDOUT_MSG.BATCH_SIZES.format(
+                controller.sizes, getattr(self, PDNames.BACKPRESSURE)))
+        # #### write the shard manifest
+        if sharded == True:
+            if len(shard_keys) > 0:
+                manifest.extend(self._shard_manifest(
+                    target, prefix, shard, shard_keys, n_written))
+            setattr(self, PDNames.SHARD_MANIFEST_T, pd.DataFrame(
+                manifest, columns=[
+                    PDNames.COL_SHARD, PDNames.COL_SHARD_BATCH,
+                    PDNames.COL_BLOCK_FILE, PDNames.COL_SHARD_ECGS,
+                    PDNames.COL_SHARD_BYTES, PDNames.COL_SHARD_FIRST,
+                    PDNames.COL_SHARD_LAST,
+                ]))
+            getattr(self, PDNames.SHARD_MANIFEST_T).to_csv(
+                os.path.join(target, table_prefix + PDNames.SHARD_MANIFEST_FILE),
+                sep='\t', header=True, index=False)
+        # #### write the partition manifest
+        if getattr(self, 'partition', None) is not None:
+            manifest = pd.DataFrame(
+                written, columns=[PDNames.SOP_UID, PDNames.COL_SOURCE_PATH])
+            manifest.insert(0, PDNames.COL_PARTITIONS, self.partition[1])
+            manifest.insert(0, PDNames.COL_PARTITION, self.partition[0])
+            manifest.to_csv(os.path.join(
+                target, table_prefix + PDNames.PARTITION_MANIFEST_FILE),
+                sep='\t', header=True, index=False)
+        # #### write the block offsets
+        if random_access == True:
+            pd.DataFrame(block_index, columns=[
+                PDNames.SOP_UID, PDNames.COL_WAVETYPE, PDNames.COL_BLOCK_FILE,
+                PDNames.COL_BLOCK_OFFSET, PDNames.COL_BLOCK_LENGTH,
+            ]).to_csv(os.path.join(target, table_prefix + PDNames.WAVE_INDEX_FILE),
+                      sep='\t', header=True, index=False)
+        self._finish_uid_index()
+        # #### write the profiles
+        self._stop_profiler()
+        if getattr(self, PDNames.PROFILER) is not None:
+            getattr(self, PDNames.PROFILER).write(target, prefix=table_prefix)
         # #### write failed files, note not compressing these
-        DELIM = '\t'
         if write_failed == True:
-            # adding the reason for failing
-            total_failures = [
-                (p, PDNames.SKIP_PERMISSIONS) for p in\
-                getattr(self, PDNames.FPATH_L) ] + [
-                (p, PDNames.SKIP_DATA) for p in\
-                    getattr(self, PDNames.FAILED_DATA_L)]
-            # writing to text file
-            with open(os.path.join(target, table_prefix + PDNames.FAILED_FILE), 'w') as file:
-                for p, cause in total_failures:
-                    file.write(p + DELIM + cause + "\n")
+            self._write_failed(target, table_prefix=table_prefix)
         # #### if needed replace directory by tar.gz version
         if target_tar is not None:
             # create the final target path
             target_final = os.path.join(target_path, target_tar)
             replace_with_tar(target, target_final, mode=mode)
             setattr(self, PDNames.WRITE_ECG_PATH, target_final)
+        if self.telemetry is not None:
+            self.telemetry.emit()
         # #### return
         return self
     # /////////////////////////////////////////////////////////////////////////
-    def write_pdf(self, ecgdrawing:ECGDrawing,
-                  target_path:str='.', write_failed:bool=True,
-                  kwargs_reader:Dict[Any,Any] | None=None,
-                  kwargs_drawing:Dict[Any,Any] | None=None,
-                  kwargs_savefig:Dict[Any,Any] | None=None,
-                  ) -> Self:
+    def _shard_sizes(self, target:str, prefix:str) -> Dict[str, int]:
         '''
-        Extracts dicom files, and write these one by one to a pdf files
-        using a supplied `ECGDrawing` instance.
+        The size in bytes of each table file of a shard which has been
+        written to disk.
         
         Parameters
         ----------
-        ecgdrawing : ECGDrawing
-            An instance of the ECGDrawing data class.
-        target_path : `str`, default '.'
-            The full path where the pdfs should be written to.
+        target : str
+            The directory the tables are written to.
+        prefix : str
+            The shard specific file name prefix.
+        
+        Returns
+        -------
+        dict [`str`, `int`]
+            The file names mapped to their size.
+        '''
+        sizes = {}
+        for name in [PDNames.INFO_FILE, PDNames.WAVE_FILE,
+                     PDNames.MEDIAN_FILE, PDNames.ANNOTATION_FILE,
+                     PDNames.QUALITY_FILE, PDNames.WAVE_CODEC_FILE,
+                     PDNames.MEDIAN_CODEC_FILE, PDNames.PREVIEW_CODEC_FILE]:
+            path = os.path.join(target, prefix + name)
+            if os.path.isfile(path):
+                sizes[prefix + name] = os.path.getsize(path)
+        # return
+        return sizes
+    # /////////////////////////////////////////////////////////////////////////
+    def _shard_manifest(self, target:str, prefix:str, shard:int,
+                        shard_keys:List[str], start:int,
+                        ) -> List[tuple]:
+        '''
+        The manifest rows of a completed shard, one row per table file.
+        
+        Parameters
+        ----------
+        target : str
+            The directory the tables are written to.
+        prefix : str
+            The shard specific file name prefix.
+        shard : int
+            The shard number.
+        shard_keys : list [`str`]
+            The unique identifiers written to the shard.
+        start : int
+            The number of ECGs written to the preceding shards, used for the
+            legacy `get_batch_prefix` batch range.
+        
+        Returns
+        -------
+        list [`tuple`]
+        '''
+        end = start + len(shard_keys)
+        batch = get_batch_prefix(start) + str(start) + '_' +\
+            get_batch_prefix(end) + str(end)
+        # return
+        return [(shard, batch, name, len(shard_keys), size, shard_keys[0],
+                 shard_keys[-1])
+                for name, size in self._shard_sizes(target, prefix).items()]
+    # /////////////////////////////////////////////////////////////////////////
+    def _encode_waves(self, ecg_inst:ECGDICOMReader, key:str, median:bool,
+                      update_keys:Optional[Dict[str,str]]=None,
+                      compressor:str='zlib',
+                      ) -> bytes:
+        '''
+        Encodes the rhythm waveforms or median beats of an ECG to an `ecgz`
+        block.
+        
+        Parameters
+        ----------
+        ecg_inst : ECGDICOMReader
+            The instance after reading the ECG.
+        key : str
+            The unique identifier.
+        median : bool
+            Whether to encode the median beats.
+        update_keys : dict [`str`, `str`], default `NoneType`
+            A dictionary to remap lead names: [`old`, `new`]
+        compressor : str, default `zlib`
+            The block compression.
+        
+        Returns
+        -------
+        bytes
+        
+        Notes
+        -----
+        Raw waveforms are stored at their original sampling frequency
+        together with the scaling, absent waveforms as a block without leads.
+        The median beats are stored at `MedianSamplingFrequency`.
+        '''
+        leads = getattr(ecg_inst, PDNames.LEAD_VOLTAGES2 if median == True
+                        else PDNames.LEAD_VOLTAGES)
+        results_dict = getattr(ecg_inst, PDNames.RESULTS_DICT)
+        scaling, frequency = None, results_dict[PDNames.SF]
+        if not isinstance(leads, dict):
+            leads = {}
+        elif self.ecgdicomreader.raw_waveforms == True:
+            scaling = getattr(ecg_inst, PDNames.LEAD_SCALING2 if median == True
+                              else PDNames.LEAD_SCALING)
+            frequency = results_dict[PDNames.SF_ORIGINAL]
+        # NOTE derived median beats have their own sampling frequency
+        if median == True and isinstance(leads, dict) and len(leads) > 0:
+            frequency = getattr(ecg_inst, PDNames.SF_MEDIAN)
+        if update_keys is not None:
+            leads = {update_keys.get(k, k): v for k, v in leads.items()}
+            if scaling is not None:
+                scaling = {update_keys.get(k, k): v for k, v in
+                           scaling.items()}
+        # return
+        return encode_ecg(
+            leads, frequency=frequency, scaling=scaling, uid=key,
+            wave_type=PDNames.WAVETYPE_MEDIAN if median == True else
+            PDNames.WAVETYPE_RHYTHM, compressor=compressor)
+    # /////////////////////////////////////////////////////////////////////////
+    def _encode_previews(self, ecg_inst:ECGDICOMReader, key:str,
+                         voltages:Dict[str, np.ndarray]|float,
+                         levels:List[int],
+                         update_keys:Optional[Dict[str,str]]=None,
+                         compressor:str='zlib',
+                         ) -> Dict[int, bytes]:
+        '''
+        Encodes the min/max preview envelopes of the rhythm waveforms of an
+        ECG to `ecgz` blocks.
+        
+        Parameters
+        ----------
+        ecg_inst : ECGDICOMReader
+            The instance after reading the ECG.
+        key : str
+            The unique identifier.
+        voltages : dict [`str`, `np.ndarray`]
+            The rhythm waveforms in physical units, `np.nan` if absent.
+        levels : list [`int`]
+            The decimation factors.
+        update_keys : dict [`str`, `str`], default `NoneType`
+            A dictionary to remap lead names: [`old`, `new`]
+        compressor : str, default `zlib`
+            The block compression.
+        
+        Returns
+        -------
+        dict [`int`, `bytes`]
+            The decimation factors mapped to the blocks.
+        
+        Notes
+        -----
+        Raw waveforms which match the voltages apart from the scaling (i.e.
+        not filtered, resampled or augmented) are decimated as integers and
+        stored with their scaling, like the rhythm waveforms, using first
+        differences which compress the alternating minima and maxima better
+        than the second. Otherwise the envelopes of the voltages are stored
+        as `float32`.
+        '''
+        results_dict = getattr(ecg_inst, PDNames.RESULTS_DICT)
+        leads = getattr(ecg_inst, PDNames.LEAD_VOLTAGES)
+        scaling = None
+        if not isinstance(voltages, dict):
+            leads = {}
+        elif self.ecgdicomreader.raw_waveforms == True and\
+                self.ecgdicomreader.ecgfilter is None and\
+                results_dict[PDNames.SF_ORIGINAL] == results_dict[PDNames.SF]\
+                and list(leads) == list(voltages):
+            scaling = getattr(ecg_inst, PDNames.LEAD_SCALING)
+        else:
+            leads = {k: np.asarray(v, dtype=np.float32) for k, v in
+                     voltages.items()}
+        if update_keys is not None:
+            leads = {update_keys.get(k, k): v for k, v in leads.items()}
+            if scaling is not None:
+                scaling = {update_keys.get(k, k): v for k, v in
+                           scaling.items()}
+        # return
+        return {factor: encode_ecg(
+            envelope, frequency=results_dict[PDNames.SF] / factor,
+            scaling=scaling, uid=key,
+            wave_type=PDNames.WAVETYPE_PREVIEW.format(factor), order=1,
+            compressor=compressor)
+            for factor, envelope in build_pyramid(
+                leads, levels=levels).items()}
+    # /////////////////////////////////////////////////////////////////////////
+    def _write_info(self, info_chunk:List[list], target:str, prefix:str,
+                    header:bool, sep:str='\t', compression:str|None='gzip',
+                    ecg_catalog:Any|None=None,
+                    output_location:str|None=None,
+                    ) -> bool:
+        '''
+        Formats the buffered metadata rows in a single `format_dates` call,
+        adds these to the catalog and appends these to the metadata table.
+        
+        Parameters
+        ----------
+        info_chunk : list [`list`]
+            The `RESULTS_DICT` rows, SOPinstanceUIDs, source paths and
+            rhythm feature tables of the buffered ECGs. The lists are
+            emptied.
+        target : str
+            The output directory.
+        prefix : str
+            The prefix of the (shard specific) metadata table.
+        header : bool
+            Whether to write the column names and start a new file.
+        ecg_catalog : ECGCatalog, default `NoneType`
+            The catalog the rows are added to.
+        output_location : str, default `NoneType`
+            The output location recorded in the catalog.
+        
+        Returns
+        -------
+        bool
+            Whether the next rows should start a new file, i.e., `header`
+            if nothing was written.
+        '''
+        rows, keys, paths, features = info_chunk
+        if len(rows) == 0:
+            return header
+        info = self.ecgdicomreader.format_dates(pd.DataFrame(rows, index=keys))
+        if len(features) > 0:
+            info = self._add_rhythm_features(info, pd.concat(features))
+        if ecg_catalog is not None:
+            for record, path in zip(info.to_dict(orient='records'), paths):
+                ecg_catalog.insert(record, source_path=path,
+                                   output_path=output_location)
+        if getattr(self, PDNames.INFO_TYPE) in self.INFO_MET:
+            self._write_block(
+                info, path=os.path.join(target, prefix + PDNames.INFO_FILE),
+                header=header, sep=sep, compression=compression)
+            header = False
+        for lst in info_chunk:
+            lst.clear()
+        # return
+        return header
+    # /////////////////////////////////////////////////////////////////////////
+    def _write_block(self, table:pd.DataFrame, path:str, header:bool,
+                     sep:str='\t', compression:str|None='gzip',
+                     ) -> tuple[int, int]:
+        '''
+        Writes a table to `path`, overwriting the file if `header` is `True`
+        and appending otherwise.
+        
+        Parameters
+        ----------
+        table : pd.DataFrame
+            The table to write.
+        path : str
+            The file path.
+        header : bool
+            Whether to write the column names and start a new file.
+        sep : str, default '\t'
+            The file separator.
+        compression : str, default `gzip`
+            The file compression passed to pandas.DataFrame.to_csv.
+        
+        Returns
+        -------
+        `tuple` [`int`, `int`]
+            The byte offset and length of the written block. With gzip
+            compression each block is an independent gzip member.
+        '''
+        offset = 0 if header == True else os.path.getsize(path)
+        table.to_csv(path, sep=sep, header=header, index=False,
+                     mode='w' if header == True else 'a',
+                     compression=compression)
+        return offset, os.path.getsize(path) - offset
+    # /////////////////////////////////////////////////////////////////////////
+    def write_pdf(self, ecgdrawing:ECGDrawing,
+                  target_path:str='.', write_failed:bool=True,
+                  pages_per_file:int|None=None,
+                  max_file_size:int|None=None,
+                  table_prefix:str='',
+                  kwargs_reader:Dict[Any,Any] | None=None,
+                  kwargs_drawing:Dict[Any,Any] | None=None,
+                  kwargs_savefig:Dict[Any,Any] | None=None,
+                  ) -> Self:
+        '''
+        Extracts dicom files, and write these one by one to a pdf files
+        using a supplied `ECGDrawing` instance.
+        
+        Parameters
+        ----------
+        ecgdrawing : ECGDrawing
+            An instance of the ECGDrawing data class.
+        target_path : `str`, default '.'
+            The full path where the pdfs should be written to.
         write_failed : `bool`, default `True`
             Whether to write a text file to disk containing the failed file
             names.
+        pages_per_file : `int`, default `NoneType`
+            The maximum number of ECGs (pages) per combined multi-page pdf.
+        max_file_size : `int`, default `NoneType`
+            The approximate maximum size in bytes of a combined multi-page
+            pdf. A new file is started once this size has been reached.
+        table_prefix : `str`, default ''
+            Prefix for the `PdfIndex.tsv` and failed files.
         kwargs_*: dict [`any`, `any`], default `NoneType`
             dictionaries with keyword arguments for the `plt.savefig`,
             ECGDrawing, or ECGDICOMReader instances.
@@ -1327,7 +2900,10 @@ class ECGDICOMTable(object):
         
         Notes
         -----
-        The dicom UID instance will be used as file name for the pdfs.
+        The dicom UID instance will be used as file name for the pdfs. If
+        either `pages_per_file` or `max_file_size` is supplied the ECGs are
+        instead written to rolling multi-page pdfs (`ECGPages_*.pdf`) and
+        `PdfIndex.tsv` maps each dicom UID to its file and (1-based) page.
         
         Raises
         ------
@@ -1338,9 +2914,19 @@ class ECGDICOMTable(object):
         is_type(kwargs_reader, (type(None), dict))
         is_type(kwargs_drawing, (type(None), dict))
         is_type(kwargs_savefig, (type(None), dict))
+        from matplotlib.backends.backend_pdf import PdfPages
+        from ecgprocess.plot_ecgs import ECGDrawing
         is_type(ecgdrawing, ECGDrawing)
         is_type(target_path, (pathlib.PosixPath, str))
         is_type(write_failed, bool)
+        is_type(pages_per_file, (type(None), int))
+        is_type(max_file_size, (type(None), int))
+        is_type(table_prefix, str)
+        if (pages_per_file is not None and pages_per_file < 1) or\
+                (max_file_size is not None and max_file_size < 1):
+            raise ValueError('`pages_per_file` and `max_file_size` should be '
+                             'larger than 0.')
+        combine = pages_per_file is not None or max_file_size is not None
         # check readability
         _check_presence(target_path)
         _check_readable(target_path)
@@ -1348,13 +2934,7 @@ class ECGDICOMTable(object):
         kwargs_savefig, kwargs_reader, kwargs_drawing= assign_empty_default(
                 [kwargs_savefig, kwargs_reader, kwargs_drawing], dict)
         # map info type to type of plot
-        if getattr(self, PDNames.INFO_TYPE) == PDNames.INFO_TYPE_MET:
-            raise AttributeError('`info` should be {0} or {1}.'.format(
-                PDNames.INFO_TYPE_MED, PDNames.INFO_TYPE_RTM))
-        elif getattr(self, PDNames.INFO_TYPE) == PDNames.INFO_TYPE_ALL:
-            signal_type = PDNames.WAVETYPE_RHYTHM
-        else:
-            signal_type = getattr(self, PDNames.INFO_TYPE)
+        signal_type = self._get_signal_type()
         # #### create target path
         if target_path == '.':
             target_path = os.getcwd()
@@ -1364,41 +2944,285 @@ class ECGDICOMTable(object):
         # #### check if __call__ has been run
         if not hasattr(self, PDNames.CPATH_L):
             raise NotCalledError()
+        self._start_uid_index()
         # #### extract dicom data
-        key_list, no_data_list = [[] for _ in range(2)]
-        # loop over individual dcm files
-        for p in getattr(self, PDNames.CPATH_L):
-            no_data_list, key_list, ecg_inst = self._write_internal(
-                path=p, no_data_list=no_data_list, key_list=key_list,
-                **kwargs_reader,
+        key_list, no_data_list, pdf_index = [[] for _ in range(3)]
+        pdf_pages, filename_pdf, page, n_pdf = None, None, 0, 0
+        try:
+            # loop over individual dcm files
+            for p in getattr(self, PDNames.CPATH_L):
+                no_data_list, key_list, ecg_inst = self._write_internal(
+                    path=p, no_data_list=no_data_list, key_list=key_list,
+                    **kwargs_reader,
+                    )
+                if isinstance(ecg_inst, str):
+                    continue
+                # #### updated leads
+                # if update_keys is not None:
+                #     w = {update_keys.get(k, k): v for k, v in w.items()}
+                # ##### draw and write figure
+                artist = ecgdrawing(ecgreader=ecg_inst, wave_type=signal_type,
+                                    **kwargs_drawing)
+                if combine == False:
+                    filename_pdf = re.sub(r"[ ,\-\(\)\{\}]", '_', key_list[-1]) + '.pdf'
+                    plt.savefig(fname=os.path.join(target, filename_pdf), **kwargs_savefig)
+                else:
+                    # rotate the multi-page pdf by page count or file size
+                    if pdf_pages is None or\
+                            (pages_per_file is not None and
+                             page >= pages_per_file) or\
+                            (max_file_size is not None and
+                             os.path.getsize(os.path.join(
+                                 target, filename_pdf)) >= max_file_size):
+                        if pdf_pages is not None:
+                            pdf_pages.close()
+                        filename_pdf = PDNames.PDF_COMBINED_FILE.format(
+                            str(n_pdf).zfill(5))
+                        pdf_pages = PdfPages(os.path.join(target, filename_pdf))
+                        page = 0
+                        n_pdf += 1
+                    pdf_pages.savefig(artist.fig, **kwargs_savefig)
+                    page += 1
+                    pdf_index.append((key_list[-1], filename_pdf, page))
+                plt.close(artist.fig)
+        finally:
+            if pdf_pages is not None:
+                pdf_pages.close()
+        # #### write the uid to file and page index
+        if combine == True:
+            pd.DataFrame(pdf_index, columns=[
+                PDNames.SOP_UID, PDNames.COL_PDF_FILE, PDNames.COL_PDF_PAGE,
+            ]).to_csv(os.path.join(target, table_prefix + PDNames.PDF_INDEX_FILE),
+                      sep='\t', header=True, index=False)
+        self._finish_uid_index()
+        # #### write failed files, note not compressing these
+        if write_failed == True:
+            self._write_failed(target, table_prefix=table_prefix)
+        # #### return
+        return self
+    # /////////////////////////////////////////////////////////////////////////
+    def write_images(self, ecgdrawing:ECGDrawing,
+                     target_path:str='.', shard_size:int=1000,
+                     grayscale:bool=False, crop:bool=False,
+                     dpi:float|None=None, n_jobs:int=1,
+                     table_prefix:str='', write_failed:bool=True,
+                     kwargs_reader:Dict[Any,Any] | None=None,
+                     kwargs_drawing:Dict[Any,Any] | None=None,
+                     ) -> Self:
+        '''
+        Extracts dicom files, renders these using a supplied `ECGDrawing`
+        instance and writes the images to memory-mapped numpy shards of
+        `shard_size` images each.
+        
+        Parameters
+        ----------
+        ecgdrawing : ECGDrawing
+            An instance of the ECGDrawing data class.
+        target_path : `str`, default '.'
+            The full path where the shards should be written to.
+        shard_size : `int`, default 1000
+            The maximum number of images per shard.
+        grayscale : `bool`, default `False`
+            Whether to map the RGB image to a single luminance channel.
+        crop : `bool`, default `False`
+            Passed to `ECGDrawing.to_numpy`, whether the image should be
+            cropped to the axes spines.
+        dpi : `float`, default `NoneType`
+            The figure resolution in dots per inch. Set to `NoneType` to use
+            the matplotlib default.
+        n_jobs : `int`, default 1
+            The number of worker processes used to render the images. Set to
+            1 to render within the current process.
+        table_prefix : `str`, default ''
+            Prefix for the shard and index file names.
+        write_failed : `bool`, default `True`
+            Whether to write a text file to disk containing the failed file
+            names.
+        kwargs_*: dict [`any`, `any`], default `NoneType`
+            dictionaries with keyword arguments for the ECGDrawing or
+            ECGDICOMReader instances.
+        
+        Attributes
+        ----------
+        target_path : `str`
+            The directory the shards are written to.
+        IndexList : `list` [`str`]
+            A list of unique identifiers in the order these were written.
+        ImageShardList : `list` [`str`]
+            The file names of the written shards.
+        NoDataList : `list` [`str`]
+            A list of dicom files without a waveform_array.
+        
+        Returns
+        -------
+        self : `ECGDICOMTable` instance
+            Returns the class instance with updated attributes.
+        
+        Notes
+        -----
+        Each shard is a `.npy` file with shape (`n`, height, width) for
+        grayscale images or (`n`, height, width, 3) for RGB images, which
+        can be opened using `np.load(file, mmap_mode='r')`. The shards are
+        preallocated, hence all images should have the same dimensions. The
+        accompanying `ImageShard_*.index.tsv` file maps the unique
+        identifiers to the shard rows; rows not listed in the index (for
+        example due to failed files in the last shard) are zero.
+        
+        Raises
+        ------
+        NotADirectoryError or PermissionError
+            If the target directory does not exist or is not writable.
+        ValueError
+            If the rendered images do not share the same dimensions.
+        '''
+        # #### check input and set constants
+        is_type(kwargs_reader, (type(None), dict))
+        is_type(kwargs_drawing, (type(None), dict))
+        from ecgprocess.plot_ecgs import ECGDrawing
+        is_type(ecgdrawing, ECGDrawing)
+        is_type(target_path, (pathlib.PosixPath, str))
+        is_type(shard_size, int)
+        is_type(grayscale, bool)
+        is_type(crop, bool)
+        is_type(dpi, (type(None), int, float))
+        is_type(n_jobs, int)
+        is_type(table_prefix, str)
+        is_type(write_failed, bool)
+        if shard_size < 1 or n_jobs < 1:
+            raise ValueError('`shard_size` and `n_jobs` should be larger '
+                             'than 0.')
+        # check readability
+        _check_presence(target_path)
+        _check_readable(target_path)
+        # map None to dict
+        kwargs_reader, kwargs_drawing= assign_empty_default(
+                [kwargs_reader, kwargs_drawing], dict)
+        # map info type to type of plot
+        signal_type = self._get_signal_type()
+        # #### create target path
+        if target_path == '.':
+            target_path = os.getcwd()
+        target = target_path
+        setattr(self, PDNames.WRITE_ECG_PATH, target)
+        # #### check if __call__ has been run
+        if not hasattr(self, PDNames.CPATH_L):
+            raise NotCalledError()
+        self._start_uid_index()
+        # #### render and write images
+        paths = getattr(self, PDNames.CPATH_L)
+        render = functools.partial(
+            _render_ecg_image, ecgdicomreader=self.ecgdicomreader,
+            ecgdrawing=ecgdrawing, wave_type=signal_type, crop=crop,
+            grayscale=grayscale, dpi=dpi,
+            skip_data=self.skip_missing == PDNames.SKIP_DATA,
+            kwargs_reader=kwargs_reader, kwargs_drawing=kwargs_drawing,
+        )
+        key_list, no_data_list, shard_list = [[] for _ in range(3)]
+        shard, shard_keys, shape = None, [], None
+        if n_jobs == 1:
+            executor = None
+            results = map(render, paths)
+        else:
+            executor = ProcessPoolExecutor(max_workers=n_jobs)
+            results = executor.map(
+                render, paths,
+                chunksize=max(1, min(shard_size, len(paths)//(n_jobs*4))))
+        try:
+            for n, (p, key, image) in enumerate(results):
+                if self.verbose == True:
+                    self._print(STDOUT_MSG.PROCESSING_PATH.format(p))
+                if key is None:
+                    no_data_list.append(p)
+                    continue
+                if self._check_duplicate(key, p) == False:
+                    continue
+                key_list.append(key)
+                if shape is None:
+                    shape = image.shape
+                elif image.shape != shape:
+                    raise ValueError('The image of `{0}` has shape {1}, '
+                                     'expected {2}.'.format(
+                                         key, image.shape, shape))
+                # open a new shard, sized to the remaining paths
+                if shard is None or len(shard_keys) == shard_size:
+                    if shard is not None:
+                        self._close_image_shard(
+                            shard, shard_keys, target=target,
+                            table_prefix=table_prefix,
+                            shard_number=len(shard_list)-1,
+                        )
+                    shard_name = table_prefix + PDNames.IMAGE_SHARD_FILE.\
+                        format(str(len(shard_list)).zfill(5))
+                    shard = np.lib.format.open_memmap(
+                        os.path.join(target, shard_name), mode='w+',
+                        dtype=np.uint8,
+                        shape=(min(shard_size, len(paths) - n),) + shape,
+                    )
+                    shard_list.append(shard_name)
+                    shard_keys = []
+                shard[len(shard_keys)] = image
+                shard_keys.append(key)
+            if shard is not None:
+                self._close_image_shard(
+                    shard, shard_keys, target=target,
+                    table_prefix=table_prefix,
+                    shard_number=len(shard_list)-1,
                 )
-            if isinstance(ecg_inst, str):
-                continue
-            # #### updated leads
-            # if update_keys is not None:
-            #     w = {update_keys.get(k, k): v for k, v in w.items()}
-            # ##### draw and write figure
-            artist = ecgdrawing(ecgreader=ecg_inst, wave_type=signal_type,
-                                **kwargs_drawing)
-            filename_pdf = re.sub(r"[ ,\-\(\)\{\}]", '_', key_list[-1]) + '.pdf'
-            plt.savefig(fname=os.path.join(target, filename_pdf), **kwargs_savefig)
-            plt.close(artist.fig)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        setattr(self, PDNames.FAILED_DATA_L, no_data_list)
+        setattr(self, PDNames.KEY_L, key_list)
+        setattr(self, PDNames.IMAGE_SHARD_L, shard_list)
+        self._finish_uid_index()
         # #### write failed files, note not compressing these
-        DELIM = '\t'
         if write_failed == True:
-            # adding the reason for failing
-            total_failures = [
-                (p, PDNames.SKIP_PERMISSIONS) for p in\
-                getattr(self, PDNames.FPATH_L) ] + [
-                (p, PDNames.SKIP_DATA) for p in\
-                    getattr(self, PDNames.FAILED_DATA_L)]
-            # writing to text file
-            with open(os.path.join(target, PDNames.FAILED_FILE), 'w') as file:
-                for p, cause in total_failures:
-                    file.write(p + DELIM + cause + "\n")
+            self._write_failed(target, table_prefix=table_prefix)
         # #### return
         return self
     # /////////////////////////////////////////////////////////////////////////
+    def _close_image_shard(self, shard:np.memmap, shard_keys:list[str],
+                           target:str, table_prefix:str, shard_number:int,
+                           ) -> None:
+        '''
+        Flushes a memory-mapped image shard to disk and writes its unique
+        identifier index.
+        
+        Parameters
+        ----------
+        shard : np.memmap
+            The memory-mapped shard.
+        shard_keys : list [`str`]
+            The unique identifiers in shard row order.
+        target : str
+            The directory the shard is written to.
+        table_prefix : str
+            Prefix for the index file name.
+        shard_number : int
+            The shard number used in the index file name.
+        '''
+        shard.flush()
+        pd.DataFrame({
+            PDNames.SOP_UID: shard_keys,
+            PDNames.COL_SHARD_ROW: range(len(shard_keys)),
+        }).to_csv(os.path.join(
+            target, table_prefix + PDNames.IMAGE_INDEX_FILE.format(
+                str(shard_number).zfill(5))),
+            sep='\t', header=True, index=False)
+    # /////////////////////////////////////////////////////////////////////////
+    def _get_signal_type(self) -> str:
+        '''
+        Maps the `info_type` attribute to the signal type used by
+        `ECGDrawing`.
+        '''
+        if getattr(self, PDNames.INFO_TYPE) == PDNames.INFO_TYPE_MET:
+            raise AttributeError('`info` should be {0} or {1}.'.format(
+                PDNames.INFO_TYPE_MED, PDNames.INFO_TYPE_RTM))
+        elif getattr(self, PDNames.INFO_TYPE) == PDNames.INFO_TYPE_ALL:
+            return PDNames.WAVETYPE_RHYTHM
+        else:
+            return getattr(self, PDNames.INFO_TYPE)
+    # /////////////////////////////////////////////////////////////////////////
     def _write_internal(self, path:str, no_data_list:list[str],
                         key_list:list[str],
                         **kwargs,
@@ -1419,21 +3243,23 @@ class ECGDICOMTable(object):
         -------
         `tuple`
             A tuple with `no_data_list`, `key_list`, and an ECGDICOMReader
-            instance.
+            instance, or the string `continue` if the file should be
+            skipped.
         
         Raises
         ------
         AttributeError
             raised if waveform_array or SOPinstanceUID attributes are absent.
         IndexError
-            raised if a dicom with the same SOPinstanceUID is processed
+            raised if a dicom with the same SOPinstanceUID is processed and
+            `duplicates` is set to `raise`.
         '''
         
         if self.verbose == True:
-            print(STDOUT_MSG.PROCESSING_PATH.format(path), file=sys.stdout)
+            self._print(STDOUT_MSG.PROCESSING_PATH.format(path))
         # get instance
         try:
-            ecg_inst = self.ecgdicomreader(path, **kwargs)
+            ecg_inst = self._read_ecg(path, **kwargs)
         except AttributeError as AE:
             if self.skip_missing == PDNames.SKIP_DATA:
                 no_data_list.append(path)
@@ -1441,21 +3267,475 @@ class ECGDICOMTable(object):
                 return no_data_list, key_list, 'continue'
             else:
                 raise AE
+        if ecg_inst is None:
+            return no_data_list, key_list, 'continue'
         # extract unique identifier and check if it has been used before
         if hasattr(ecg_inst, PDNames.SOP_UID) == False:
             raise AttributeError(Error_MSG.MISSING_ATTR.format(
                 PDNames.SOP_UID, 'ecg_inst'))
         key = str(getattr(ecg_inst, PDNames.SOP_UID))
-        if key in key_list:
-            raise IndexError('{0}:{1} was already extracted before. Please '
-                             'ensure the supplied files are unique.'.\
-                             format(PDNames.SOP_UID, key))
-        else:
-            key_list.append(key)
+        if self._check_duplicate(key, path) == False:
+            return no_data_list, key_list, 'continue'
+        key_list.append(key)
         # extract the remaining
         setattr(self, PDNames.FAILED_DATA_L, no_data_list)
         # return
         return no_data_list, key_list, ecg_inst
+    # /////////////////////////////////////////////////////////////////////////
+    def _iter_ecgs(self, paths:List[str], no_data_list:List[str],
+                   key_list:List[str],
+                   controller:BatchController|None=None,
+                   ) -> Iterator[tuple[str, str, ECGDICOMReader]]:
+        '''
+        Yields the path, SOPinstanceUID and called `ECGDICOMReader` of each
+        file to be written, see `_write_internal`.
+        
+        Parameters
+        ----------
+        paths : `list` [`str`]
+            The dicom files.
+        no_data_list, key_list : `list` [`str`]
+            Updated by `_write_internal`.
+        controller : BatchController, default `NoneType`
+            If supplied the files are read ahead in a background thread,
+            holding at most `controller.size` ECGs, each a copy of the
+            called reader.
+        
+        Attributes
+        ----------
+        BackpressureSeconds : `float`
+            The seconds the reading thread waited for the writer.
+        '''
+        def produce():
+            for p in paths:
+                _, _, ecg_inst = self._write_internal(
+                    path=p, no_data_list=no_data_list, key_list=key_list,
+                    **self.kwargs,
+                    )
+                if isinstance(ecg_inst, str):
+                    continue
+                # NOTE the reader is called again on the next file while the
+                # ECG is queued, hence each queued ECG is a snapshot. The
+                # isolated reader returns a new instance per file.
+                if controller is not None and\
+                        getattr(self, 'isolated_reader', None) is None:
+                    ecg_inst = copy.deepcopy(ecg_inst)
+                # NOTE queued ECGs hold arrays only, the tables are made by
+                # the writer one at a time
+                yield (p, key_list[-1], ecg_inst), ecg_nbytes(ecg_inst)[0], 0
+        if controller is None:
+            for item, _, _ in produce():
+                yield item
+            return
+        reader = ReadAhead(produce, controller)
+        try:
+            for item in reader:
+                if self.telemetry is not None:
+                    self.telemetry.gauge(PDNames.TELEMETRY_DEPTH, reader.depth)
+                    self.telemetry.gauge(PDNames.TELEMETRY_CAPACITY,
+                                         controller.size)
+                yield item
+        finally:
+            setattr(self, PDNames.BACKPRESSURE, reader.blocked)
+    # /////////////////////////////////////////////////////////////////////////
+    def _read_ecg(self, path:str, **kwargs:Any) -> ECGDICOMReader|None:
+        '''
+        Calls `ecgdicomreader` on a path, in the isolated worker if `__call__`
+        was supplied a `timeout` or `memory_limit`.
+        
+        Returns
+        -------
+        ECGDICOMReader or `NoneType`
+            The called reader, or `NoneType` if the file was quarantined.
+        '''
+        telemetry = getattr(self, 'telemetry', None)
+        profiler = getattr(self, '_profiler', None)
+        if profiler is not None:
+            profiler.next_file()
+            profiler.start(PDNames.PROFILE_READ)
+        start = time.perf_counter()
+        try:
+            if getattr(self, 'isolated_reader', None) is None:
+                ecg_inst = self.ecgdicomreader(path, **kwargs)
+            else:
+                ecg_inst = self.isolated_reader(path, **kwargs)
+        except QuarantineError as QE:
+            getattr(self, PDNames.QUARANTINE_L).append(
+                (str(path), QE.reason, QE.seconds))
+            if self.verbose == True:
+                warnings.warn(str(QE))
+            if telemetry is not None:
+                # NOTE the reason of a crash includes the exit code
+                telemetry.failure(QE.reason.split(' ')[0])
+                telemetry.file_read(path, QE.seconds)
+            return None
+        except AttributeError as AE:
+            if telemetry is not None:
+                telemetry.failure(PDNames.FAIL_NO_DATA)
+                telemetry.file_read(path, time.perf_counter() - start)
+            raise AE
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        if telemetry is not None:
+            telemetry.file_read(path, time.perf_counter() - start)
+        return ecg_inst
+    # /////////////////////////////////////////////////////////////////////////
+    def _start_profiler(self, profile:int|float|None) -> None:
+        '''
+        Starts a `StageProfiler` if `profile` is supplied.
+        
+        Attributes
+        ----------
+        Profiler : `StageProfiler` or `NoneType`
+            The profiler.
+        '''
+        is_type(profile, (type(None), int, float), 'profile')
+        self._profiler = None if profile is None else StageProfiler(profile)
+        setattr(self, PDNames.PROFILER, self._profiler)
+    # /////////////////////////////////////////////////////////////////////////
+    def _start_stage(self, stage:str, force:bool=False) -> None:
+        '''
+        Starts profiling a stage, see `StageProfiler.start`.
+        '''
+        if getattr(self, '_profiler', None) is not None:
+            self._profiler.start(stage, force=force)
+    # /////////////////////////////////////////////////////////////////////////
+    def _stop_stage(self) -> None:
+        '''
+        Stops profiling the active stage.
+        '''
+        if getattr(self, '_profiler', None) is not None:
+            self._profiler.stop()
+    # /////////////////////////////////////////////////////////////////////////
+    def _stop_profiler(self) -> None:
+        '''
+        Stops profiling and prints the time per component if `verbose`. The
+        profiles remain available as `Profiler`.
+        '''
+        profiler = getattr(self, '_profiler', None)
+        if profiler is None:
+            return
+        profiler.stop()
+        self._profiler = None
+        if self.verbose == True and len(profiler.profiles) > 0:
+            print(profiler.components().to_string(index=False),
+                  file=sys.stdout)
+    # /////////////////////////////////////////////////////////////////////////
+    def _print(self, message:str) -> None:
+        '''
+        Prints a progress message, rate-limited if `__call__` was supplied a
+        `telemetry` instance.
+        '''
+        if getattr(self, 'telemetry', None) is None:
+            print(message, file=sys.stdout)
+        else:
+            self.telemetry.printer(message)
+    # /////////////////////////////////////////////////////////////////////////
+    def _close_reader(self) -> None:
+        '''
+        Stops the isolated worker, if any, after all files have been read.
+        '''
+        if getattr(self, 'isolated_reader', None) is not None:
+            self.isolated_reader.close()
+    # /////////////////////////////////////////////////////////////////////////
+    def _write_failed(self, target:str, table_prefix:str='') -> None:
+        '''
+        Writes the failed files, and if present the skipped duplicate files,
+        to tab-delimited text files together with the reason for failing.
+        
+        Parameters
+        ----------
+        target : str
+            The directory the files are written to.
+        table_prefix : str, default ''
+            Prefix for the file names.
+        '''
+        DELIM = '\t'
+        # adding the reason for failing
+        total_failures = [
+            (p, PDNames.SKIP_PERMISSIONS) for p in\
+            getattr(self, PDNames.FPATH_L) ] + [
+            (p, PDNames.SKIP_DATA) for p in\
+                getattr(self, PDNames.FAILED_DATA_L, [])]
+        # writing to text file
+        with open(os.path.join(target, table_prefix + PDNames.FAILED_FILE), 'w') as file:
+            for p, cause in total_failures:
+                file.write(p + DELIM + cause + "\n")
+        # the duplicates including the SOPinstanceUID
+        duplicates = getattr(self, PDNames.DUPLICATE_L, [])
+        if len(duplicates) > 0:
+            with open(os.path.join(target, table_prefix + PDNames.DUPLICATE_FILE), 'w') as file:
+                for p, key, cause in duplicates:
+                    file.write(p + DELIM + key + DELIM + cause + "\n")
+        # the quarantined files including the time taken
+        quarantined = getattr(self, PDNames.QUARANTINE_L, [])
+        if len(quarantined) > 0:
+            with open(os.path.join(target, table_prefix + PDNames.QUARANTINE_FILE), 'w') as file:
+                for p, cause, seconds in quarantined:
+                    file.write(p + DELIM + cause + DELIM +
+                               '{:.3f}'.format(seconds) + "\n")
+    # /////////////////////////////////////////////////////////////////////////
+    def _start_uid_index(self) -> None:
+        '''
+        Initialises the set of extracted SOPinstanceUIDs, optionally loading
+        the UIDs of previous runs from `uid_index`. If `duplicates` is set to
+        `keep_latest` the dicom headers are read to find the most recent file
+        per SOPinstanceUID.
+        
+        Attributes
+        ----------
+        DuplicateList : `list` [`tuple` [`str`, `str`, `str`]]
+            The path, SOPinstanceUID and reason of skipped duplicate files.
+        QuarantineList : `list` [`tuple` [`str`, `str`, `float`]]
+            Emptied, filled by `_read_ecg`.
+        '''
+        seen = {}
+        uid_index = getattr(self, 'uid_index', None)
+        if uid_index is not None and os.path.isfile(uid_index):
+            previous = pd.read_csv(uid_index, sep='\t', dtype=str,
+                                   keep_default_na=False)
+            seen = dict(zip(previous[PDNames.SOP_UID],
+                            previous[PDNames.ACQUISITION_DATE]))
+        # a dict for O(1) look-ups, mapping the UID to the acquisition time
+        self._seen_uids = seen
+        self._new_uids = []
+        self._latest_path, self._acquisition = None, {}
+        setattr(self, PDNames.DUPLICATE_L, [])
+        setattr(self, PDNames.QUARANTINE_L, [])
+        if getattr(self, 'duplicates', PDNames.DUP_RAISE) == PDNames.DUP_LATEST:
+            self._latest_path, self._acquisition = _peek_latest(
+                getattr(self, PDNames.CPATH_L))
+    # /////////////////////////////////////////////////////////////////////////
+    def _check_duplicate(self, key:str, path:str) -> bool:
+        '''
+        Checks whether a SOPinstanceUID has been extracted before and applies
+        the `duplicates` policy.
+        
+        Parameters
+        ----------
+        key : str
+            The SOPinstanceUID.
+        path : str
+            The path of the dicom file.
+        
+        Returns
+        -------
+        bool
+            `True` if the file should be extracted, `False` if it should be
+            skipped.
+        
+        Raises
+        ------
+        IndexError
+            raised if the SOPinstanceUID was extracted before and
+            `duplicates` is set to `raise`.
+        '''
+        duplicates = getattr(self, 'duplicates', PDNames.DUP_RAISE)
+        acquisition = self._acquisition.get(path, '')
+        if duplicates == PDNames.DUP_LATEST:
+            # NOTE files without a readable header are kept
+            if self._latest_path.get(key, path) != path or (
+                    key in self._seen_uids and _dt_key(acquisition) <=\
+                    _dt_key(self._seen_uids[key])):
+                getattr(self, PDNames.DUPLICATE_L).append(
+                    (str(path), key, PDNames.DUP_SUPERSEDED))
+                self._count_duplicate()
+                return False
+            if key in self._seen_uids:
+                # a more recent file than extracted in a previous run
+                getattr(self, PDNames.DUPLICATE_L).append(
+                    (str(path), key, PDNames.DUP_REPLACES))
+        elif key in self._seen_uids:
+            if duplicates == PDNames.DUP_RAISE:
+                raise IndexError('{0}:{1} was already extracted before. Please '
+                                 'ensure the supplied files are unique.'.\
+                                 format(PDNames.SOP_UID, key))
+            getattr(self, PDNames.DUPLICATE_L).append(
+                (str(path), key, PDNames.DUP_DUPLICATE))
+            self._count_duplicate()
+            return False
+        self._seen_uids[key] = acquisition
+        self._new_uids.append((key, acquisition, str(path)))
+        return True
+    # /////////////////////////////////////////////////////////////////////////
+    def _count_duplicate(self) -> None:
+        '''
+        Records a skipped duplicate in the telemetry, if any.
+        '''
+        if getattr(self, 'telemetry', None) is not None:
+            self.telemetry.failure(PDNames.FAIL_DUPLICATE)
+    # /////////////////////////////////////////////////////////////////////////
+    def _finish_uid_index(self) -> None:
+        '''
+        Appends the newly extracted SOPinstanceUIDs to `uid_index` and
+        optionally warns about skipped duplicates.
+        '''
+        uid_index = getattr(self, 'uid_index', None)
+        if uid_index is not None and len(self._new_uids) > 0:
+            pd.DataFrame(self._new_uids, columns=[
+                PDNames.SOP_UID, PDNames.ACQUISITION_DATE,
+                PDNames.COL_SOURCE_PATH,
+            ]).to_csv(uid_index, sep='\t', index=False, mode='a',
+                      header=not os.path.isfile(uid_index))
+        self._new_uids = []
+        if self.verbose == True and len(getattr(self, PDNames.DUPLICATE_L)) > 0:
+            warnings.warn('The following duplicate files were skipped: {}.'.\
+                          format(getattr(self, PDNames.DUPLICATE_L)))
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def format_dicom_datetime(values:pd.Series, vr:Literal['DA', 'TM', 'DT'],
+                          target:str,
+                          ) -> tuple[pd.Series, pd.Series|None]:
+    '''
+    Parses and formats a column of DICOM date (DA), time (TM) or date time
+    (DT) strings using a single `pd.to_datetime` call.
+    
+    Parameters
+    ----------
+    values : pd.Series
+        The DICOM strings.
+    vr : {`DA`, `TM`, `DT`}
+        The DICOM value representation.
+    target : str
+        The `strftime` format of the returned strings.
+    
+    Returns
+    -------
+    `tuple` [pd.Series, pd.Series or `NoneType`]
+        The formatted strings, with NaN for missing or malformed values, and
+        for `DT` the UTC offsets (e.g. `+0100`) or NaN.
+    
+    Notes
+    -----
+    Supports the partial values allowed by the standard (e.g. `HHMM` or
+    `YYYYMM`, padded with the earliest value), fractional seconds, the
+    `&ZZXX` UTC offset of `DT` and the ACR-NEMA `YYYY.MM.DD` and `HH:MM:SS`
+    separators. The local date time is returned; the offset is not applied.
+    '''
+    is_type(values, pd.Series, 'values')
+    PAD = {PDNames.VR_DA: '19000101', PDNames.VR_TM: '000000',
+           PDNames.VR_DT: '19000101000000'}
+    if not vr in PAD:
+        raise ValueError(Error_MSG.CHOICE_PARM.format('vr', ', '.join(PAD)))
+    # remove the ACR-NEMA separators
+    strings = values.astype('string').str.strip().str.replace(
+        ':', '', regex=False)
+    if vr == PDNames.VR_DA:
+        strings = strings.str.replace(
+            r'^(\d{4})\.(\d{2})\.(\d{2})$', r'\1\2\3', regex=True)
+    parts = strings.str.extract(
+        r'^(?P<main>\d+)(?:\.(?P<frac>\d{1,6}))?(?P<offset>[+-]\d{4})?$')
+    # pad partial values, DA and DT start padding after the year
+    start = 0 if vr == PDNames.VR_TM else 4
+    lengths = parts['main'].str.len()
+    pad = lengths.map({n: PAD[vr][n:] for n in
+                       range(start, len(PAD[vr]) + 1, 2)})
+    full = parts['main'] + pad + '.' + parts['frac'].fillna('0').str.ljust(
+        6, '0')
+    FORMAT = {PDNames.VR_DA: '%Y%m%d.%f', PDNames.VR_TM: '%H%M%S.%f',
+              PDNames.VR_DT: '%Y%m%d%H%M%S.%f'}[vr]
+    parsed = pd.to_datetime(full, format=FORMAT, errors='coerce')
+    formatted = parsed.dt.strftime(target).astype(object).where(
+        parsed.notna(), np.nan)
+    offset = parts['offset'].astype(object).where(
+        parts['offset'].notna(), np.nan) if vr == PDNames.VR_DT else None
+    # return
+    return formatted, offset
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _dt_key(value:str) -> str:
+    '''
+    Maps a DICOM DT string to a sortable string by removing the optional UTC
+    offset, e.g. `20230101120000.5+0100` becomes `20230101120000.5`.
+    '''
+    return re.split(r'[+-]', str(value), maxsplit=1)[0].strip()
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _peek_latest(paths:list[str]) -> tuple[dict[str, str], dict[str, str]]:
+    '''
+    Reads the SOPInstanceUID and AcquisitionDateTime from the dicom headers
+    (without loading the waveform data) and finds the path with the most
+    recent acquisition per SOPInstanceUID.
+    
+    Returns
+    -------
+    `tuple`
+        A dictionary mapping the SOPInstanceUID to the most recent path, and
+        a dictionary mapping each path to its raw AcquisitionDateTime.
+    '''
+    latest, acquisition = {}, {}
+    for p in paths:
+        try:
+            header = dcmread(p, specific_tags=[
+                PDNames.SOP_UID_DICOM, PDNames.ACQUISITION_DATE],
+                stop_before_pixels=True, defer_size='1 KB')
+            key = str(getattr(header, PDNames.SOP_UID_DICOM))
+        except Exception:
+            # unreadable files are dealt with during extraction
+            continue
+        acquisition[p] = str(getattr(header, PDNames.ACQUISITION_DATE, ''))
+        # ties are resolved in favour of the later path
+        if key not in latest or _dt_key(acquisition[p]) >=\
+                _dt_key(acquisition[latest[key]]):
+            latest[key] = p
+    return latest, acquisition
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _render_ecg_image(path:str, ecgdicomreader:ECGDICOMReader,
+                      ecgdrawing:ECGDrawing, wave_type:str, crop:bool,
+                      grayscale:bool, dpi:float|None, skip_data:bool,
+                      kwargs_reader:dict[Any, Any],
+                      kwargs_drawing:dict[Any, Any],
+                      ) -> tuple[str, str|None, np.ndarray|None]:
+    '''
+    Reads a single dicom file and renders it to a uint8 image array. Defined
+    at module level so it can be pickled to worker processes.
+    
+    Returns
+    -------
+    `tuple`
+        The path, the unique identifier and the image array. The latter two
+        are `NoneType` if the file lacks a waveform_array and `skip_data` is
+        `True`.
+    '''
+    try:
+        ecg_inst = ecgdicomreader(path, **kwargs_reader)
+    except AttributeError as AE:
+        if skip_data == True:
+            return path, None, None
+        else:
+            raise AE
+    if hasattr(ecg_inst, PDNames.SOP_UID) == False:
+        raise AttributeError(Error_MSG.MISSING_ATTR.format(
+            PDNames.SOP_UID, 'ecg_inst'))
+    artist = ecgdrawing(ecgreader=ecg_inst, wave_type=wave_type, dpi=dpi,
+                        **kwargs_drawing)
+    # RGBA, the alpha channel is constant and dropped
+    image = artist.to_numpy(crop=crop, close=True)[..., :3]
+    if grayscale == True:
+        # ITU-R BT.601 luma
+        image = np.rint(image @ np.array([0.299, 0.587, 0.114])).\
+            astype(np.uint8)
+    return path, str(getattr(ecg_inst, PDNames.SOP_UID)), image
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _is_nan(value:Any) -> bool:
+    '''
+    Whether a value is a missing scalar, a pandas-free `pd.isna` for the
+    reader.
+    '''
+    return value is None or (isinstance(value, (float, np.floating)) and
+                             bool(np.isnan(value)))
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _select_leads(leads:Dict[str, np.ndarray]|float, names:str|List[str],
+                  ) -> Dict[str, np.ndarray]|float:
+    '''
+    The `names` leads of an ECG, e.g. those needed for the rhythm features,
+    returning absent (NaN) waveforms unchanged.
+    '''
+    if not isinstance(leads, dict):
+        return leads
+    names = [names] if isinstance(names, str) else names
+    return {n: leads[n] for n in names if n in leads}
@@ -0,0 +1,286 @@
+'''
+Profiles the stages of an extraction run (reading the dicom files, making
+the tables, writing) with `cProfile` over a sample of the files, and breaks
+the time down by component, e.g. pydicom dataset access versus
+`scipy.signal.resample` versus pandas.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import os
+import pstats
+import cProfile
+from typing import (
+    Dict, List,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+pd = LazyModule('pandas')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# substrings of the file or (built-in) function name mapped to a component,
+# the first match is used
+COMPONENTS = [
+    ('pydicom', 'pydicom'),
+    ('scipy', 'scipy'),
+    ('pandas', 'pandas'),
+    ('numpy', 'numpy'),
+    ('zlib', 'compression'),
+    ('gzip', 'compression'),
+    ('lzma', 'compression'),
+    ('zstandard', 'compression'),
+    ('ecgprocess', 'ecgprocess'),
+]
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def component(filename:str, function:str) -> str:
+    '''
+    The component of a profiled function, `other` if unknown.
+    
+    Parameters
+    ----------
+    filename : `str`
+        The source file, `~` for built-in functions.
+    function : `str`
+        The function name, e.g. `<built-in method zlib.crc32>`.
+    '''
+    name = (filename + ' ' + function).replace('\\', '/')
+    for pattern, comp in COMPONENTS:
+        if pattern in name:
+            return comp
+    # NOTE the package is imported as `ecgprocess` from the `scripts` directory
+    if os.path.basename(os.path.dirname(filename)) == 'scripts':
+        return 'ecgprocess'
+    return 'other'
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class StageProfiler(object):
+    '''
+    Runs a `cProfile.Profile` per stage over a sample of the files.
+    
+    Attributes
+    ----------
+    sample : `int` or `float`
+        The number of files profiled, or the fraction of files spread
+        evenly over the run.
+    top : `int`
+        The number of functions per stage listed by `summary`.
+    n_files : `int`
+        The number of files seen by `next_file`.
+    n_profiled : `int`
+        The number of profiled files.
+    profiles : `dict` [`str`, `cProfile.Profile`]
+        The profile of each stage.
+    
+    Methods
+    -------
+    next_file()
+        Decides whether the next file is profiled.
+    start(stage, force)
+        Starts profiling a stage.
+    stop()
+        Stops profiling.
+    summary()
+        The slowest functions per stage.
+    components()
+        The time per stage and component.
+    write(directory, prefix)
+        Writes the pstats files and the summaries.
+    
+    Notes
+    -----
+    Only one stage is profiled at a time and only in the calling thread,
+    hence files read in a background thread or an isolated worker process
+    are not profiled beyond the waiting time.
+    
+    Example
+    -------
+    >>> profiler = StageProfiler(sample=50)
+    >>> for p in paths:
+    ...     profiler.next_file()
+    ...     profiler.start('read')
+    ...     ecg_inst = reader(p)
+    ...     profiler.stop()
+    >>> profiler.components()
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, sample:int|float=1.0, top:int=20) -> None:
+        """
+        Initialises a new instance of `StageProfiler`.
+        
+        Parameters
+        ----------
+        sample : `int` or `float`, default 1.0
+            An integer profiles the first `sample` files, a float between 0
+            and 1 the fraction of files, e.g. 0.1 profiles every tenth file.
+        top : `int`, default 20
+            The number of functions per stage listed by `summary`.
+        """
+        is_type(sample, (int, float), 'sample')
+        is_type(top, int, 'top')
+        if isinstance(sample, bool) or sample <= 0 or\
+                (isinstance(sample, float) and sample > 1):
+            raise ValueError('`sample` should be a positive integer or a '
+                             'fraction between 0 and 1.')
+        self.sample = sample
+        self.top = top
+        self.n_files = 0
+        self.n_profiled = 0
+        self.profiles = {}
+        self._active = False
+        self._current = None
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(sample={self.sample}, "
+                f"n_profiled={self.n_profiled})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def next_file(self) -> bool:
+        '''
+        Decides whether the stages of the next file are profiled.
+        
+        Returns
+        -------
+        bool
+            Whether the file is profiled.
+        '''
+        i = self.n_files
+        self.n_files += 1
+        if isinstance(self.sample, float):
+            # NOTE selects the files where the cumulative fraction steps up
+            self._active = int((i + 1) * self.sample) > int(i * self.sample)
+        else:
+            self._active = i < self.sample
+        self.n_profiled += int(self._active)
+        return self._active
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def start(self, stage:str, force:bool=False) -> None:
+        '''
+        Starts profiling `stage` if the current file is profiled, stopping
+        any active stage.
+        
+        Parameters
+        ----------
+        stage : `str`
+            The stage name, e.g. `read`.
+        force : `bool`, default `False`
+            Profile the stage regardless of the current file, e.g. for
+            stages processing all files at once.
+        '''
+        self.stop()
+        if self._active == False and force == False:
+            return
+        profile = self.profiles.setdefault(stage, cProfile.Profile())
+        profile.enable()
+        self._current = profile
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def stop(self) -> None:
+        '''
+        Stops profiling the active stage, if any.
+        '''
+        if self._current is not None:
+            self._current.disable()
+            self._current = None
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def stats(self, stage:str) -> pstats.Stats:
+        '''
+        The `pstats.Stats` of a stage.
+        '''
+        return pstats.Stats(self.profiles[stage])
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _rows(self) -> List[List]:
+        '''
+        One row per stage and function with the calls, total and cumulative
+        seconds.
+        '''
+        rows = []
+        for stage in self.profiles:
+            for (filename, line, function), (_, calls, tottime, cumtime, _)\
+                    in self.stats(stage).stats.items():
+                rows.append([stage, component(filename, function),
+                             f'{filename}:{line}({function})', calls,
+                             tottime, cumtime])
+        return rows
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def summary(self) -> pd.DataFrame:
+        '''
+        The `top` functions of each stage by their own (total) time.
+        
+        Returns
+        -------
+        pd.DataFrame
+            The stage, component, function, calls, and total and cumulative
+            seconds.
+        '''
+        table = pd.DataFrame(self._rows(), columns=[
+            PDNames.COL_PROFILE_STAGE, PDNames.COL_PROFILE_COMPONENT,
+            PDNames.COL_PROFILE_FUNCTION, PDNames.COL_PROFILE_CALLS,
+            PDNames.COL_PROFILE_TOTAL, PDNames.COL_PROFILE_CUMULATIVE])
+        # return
+        return table.sort_values(
+            [PDNames.COL_PROFILE_STAGE, PDNames.COL_PROFILE_TOTAL],
+            ascending=[True, False]).groupby(
+                PDNames.COL_PROFILE_STAGE, sort=False).head(self.top).\
+            reset_index(drop=True)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def components(self) -> pd.DataFrame:
+        '''
+        The total seconds per stage and component, and their fraction of the
+        stage.
+        '''
+        table = pd.DataFrame(self._rows(), columns=[
+            PDNames.COL_PROFILE_STAGE, PDNames.COL_PROFILE_COMPONENT,
+            PDNames.COL_PROFILE_FUNCTION, PDNames.COL_PROFILE_CALLS,
+            PDNames.COL_PROFILE_TOTAL, PDNames.COL_PROFILE_CUMULATIVE])
+        table = table.groupby([PDNames.COL_PROFILE_STAGE,
+                               PDNames.COL_PROFILE_COMPONENT],
+                              as_index=False)[PDNames.COL_PROFILE_TOTAL].sum()
+        table[PDNames.COL_PROFILE_FRACTION] = table[PDNames.COL_PROFILE_TOTAL]/\
+            table.groupby(PDNames.COL_PROFILE_STAGE)[
+                PDNames.COL_PROFILE_TOTAL].transform('sum')
+        # return
+        return table.sort_values(
+            [PDNames.COL_PROFILE_STAGE, PDNames.COL_PROFILE_TOTAL],
+            ascending=[True, False], ignore_index=True)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def write(self, directory:str, prefix:str='') -> Dict[str, str]:
+        '''
+        Writes `Profile_<stage>.pstats` per stage, readable by `pstats` or
+        e.g. snakeviz, and the `summary` and `components` tables.
+        
+        Parameters
+        ----------
+        directory : `str`
+            The output directory.
+        prefix : `str`, default ''
+            Prefix for the file names.
+        
+        Returns
+        -------
+        dict [`str`, `str`]
+            The stage, `summary` and `components` mapped to the written
+            files.
+        '''
+        self.stop()
+        written = {}
+        for stage, profile in self.profiles.items():
+            written[stage] = os.path.join(
+                directory, prefix + PDNames.PROFILE_FILE.format(stage))
+            profile.dump_stats(written[stage])
+        for name, table, file in [
+                ('summary', self.summary(), PDNames.PROFILE_SUMMARY_FILE),
+                ('components', self.components(),
+                 PDNames.PROFILE_COMPONENT_FILE)]:
+            written[name] = os.path.join(directory, prefix + file)
+            table.to_csv(written[name], sep='\t', index=False)
+        # return
+        return written
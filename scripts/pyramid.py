@@ -0,0 +1,138 @@
+'''
+Min/max decimation of ECG waveforms to lower resolution envelopes, used to
+store preview levels next to the full resolution waveforms and to draw
+ECGs at the resolution of the output image.
+
+Each level keeps the minimum and maximum of every block of `factor`
+samples in their temporal order, hence a line drawn through the envelope
+covers the same vertical range as the full resolution signal at a
+fraction of the points.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import numpy as np
+from typing import (
+    Dict, Optional, Sequence,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# the default decimation factors, e.g. 500 -> 125 -> 31.25 Hertz
+LEVELS = (4, 16)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def minmax_decimate(matrix:np.ndarray, factor:int) -> np.ndarray:
+    '''
+    Decimates the last axis of an array to a min/max envelope.
+    
+    Parameters
+    ----------
+    matrix : np.ndarray
+        A (..., samples) array, e.g. a (leads, samples) lead matrix.
+    factor : `int`
+        The number of samples per block. A trailing partial block is padded
+        with its last sample.
+    
+    Returns
+    -------
+    np.ndarray
+        A (..., 2 * blocks) array with the minimum and maximum of each
+        block, ordered by their position within the block.
+    '''
+    is_type(matrix, np.ndarray, 'matrix')
+    is_type(factor, int, 'factor')
+    if factor < 1:
+        raise ValueError('`factor` should be larger than 0.')
+    n_samples = matrix.shape[-1]
+    if n_samples == 0:
+        return matrix
+    pad = -n_samples % factor
+    if pad > 0:
+        matrix = np.concatenate(
+            [matrix, np.repeat(matrix[..., -1:], pad, axis=-1)], axis=-1)
+    blocks = matrix.reshape(matrix.shape[:-1] + (-1, factor))
+    # NOTE argmin/argmax select the values and their order in one pass
+    arg_min = blocks.argmin(axis=-1)[..., None]
+    arg_max = blocks.argmax(axis=-1)[..., None]
+    low = np.take_along_axis(blocks, arg_min, axis=-1)
+    high = np.take_along_axis(blocks, arg_max, axis=-1)
+    first = arg_min <= arg_max
+    envelope = np.concatenate([np.where(first, low, high),
+                               np.where(first, high, low)], axis=-1)
+    # return
+    return envelope.reshape(matrix.shape[:-1] + (-1,))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def build_pyramid(leads:Dict[str, np.ndarray],
+                  levels:Sequence[int]=LEVELS,
+                  ) -> Dict[int, Dict[str, np.ndarray]]:
+    '''
+    Decimates the leads of an ECG to several preview levels.
+    
+    Parameters
+    ----------
+    leads : dict [`str`, `np.ndarray`]
+        The lead specific voltages, of equal length.
+    levels : sequence [`int`], default (4, 16)
+        The decimation factors relative to the full resolution.
+    
+    Returns
+    -------
+    dict [`int`, `dict` [`str`, `np.ndarray`]]
+        The decimation factors mapped to the lead specific envelopes.
+    
+    Notes
+    -----
+    All leads of a level are decimated as a single matrix.
+    '''
+    is_type(leads, dict, 'leads')
+    names = list(leads)
+    if len(names) == 0:
+        return {f: {} for f in levels}
+    matrix = np.stack([leads[n] for n in names])
+    # return
+    return {f: dict(zip(names, minmax_decimate(matrix, int(f))))
+            for f in levels}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def select_level(n_samples:int, pixels:float,
+                 levels:Optional[Sequence[int]]=None) -> int:
+    '''
+    The coarsest decimation factor which still provides a min/max pair for
+    every pixel column.
+    
+    Parameters
+    ----------
+    n_samples : `int`
+        The number of full resolution samples drawn.
+    pixels : `float`
+        The width in pixels these samples are drawn on.
+    levels : sequence [`int`], default `NoneType`
+        The available decimation factors, e.g. those written by `write_ecg`.
+        If `NoneType` any factor may be returned.
+    
+    Returns
+    -------
+    int
+        The decimation factor, 1 for the full resolution.
+    '''
+    factor = max(1, int(n_samples // max(pixels, 1)))
+    if levels is None:
+        return factor
+    available = [int(f) for f in levels if int(f) <= factor]
+    # return
+    return max(available, default=1)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def envelope_positions(start:int, n_samples:int, factor:int) -> np.ndarray:
+    '''
+    The x-axis positions of the envelope of `n_samples` samples starting at
+    `start`, placing each min/max pair at the centre of its block.
+    '''
+    centres = start + (np.arange(-(-n_samples // factor)) + 0.5) *\
+        factor - 0.5
+    return np.repeat(np.minimum(centres, start + n_samples - 1), 2)
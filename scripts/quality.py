@@ -0,0 +1,127 @@
+'''
+Signal quality control metrics per lead, computed in a single vectorised
+pass over the lead matrix of an ECG or a batch of ECGs.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import numpy as np
+from typing import (
+    Dict, Optional,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.filters import (
+    design_sos,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+# NOTE imported on first use
+signal = LazyModule('scipy.signal')
+ndimage = LazyModule('scipy.ndimage')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+METRICS = [PDNames.COL_QC_NAN, PDNames.COL_QC_FLAT, PDNames.COL_QC_CLIP,
+           PDNames.COL_QC_NOISE, PDNames.COL_QC_DRIFT]
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def qc_metrics(matrix:np.ndarray, frequency:float,
+               limits:Optional[np.ndarray]=None,
+               flat_window:float=0.1, flat_tolerance:float=0.001,
+               noise_cutoff:float=40.0, drift_cutoff:float=0.5,
+               ) -> Dict[str, np.ndarray]:
+    '''
+    Computes the quality control metrics of each lead.
+    
+    Parameters
+    ----------
+    matrix : np.ndarray
+        The (leads, samples) voltages of an ECG, or a (ECGs, leads, samples)
+        batch of ECGs sharing the sampling frequency and length.
+    frequency : `float`
+        The sampling frequency in Hertz.
+    limits : np.ndarray, default `NoneType`
+        The (..., leads, 3) lower and upper ADC limits in physical units and
+        the size of an ADC step (e.g. `WaveformLimits`), NaN if unknown.
+    flat_window : `float`, default 0.1
+        The duration in seconds of the window used to detect flat segments.
+    flat_tolerance : `float`, default 0.001
+        A window is flat if its range does not exceed this fraction of the
+        median range of the leads of the ECG.
+    noise_cutoff : `float`, default 40.0
+        The frequency in Hertz above which power is considered noise.
+    drift_cutoff : `float`, default 0.5
+        The cut-off frequency in Hertz of the lowpass baseline estimate.
+    
+    Returns
+    -------
+    dict [`str`, `np.ndarray`]
+        The metrics with the shape of `matrix` without the sample axis:
+        - `NaNCount`, the number of missing samples.
+        - `FlatlineFraction`, the fraction of samples in flat windows.
+        - `ClippingFraction`, the fraction of samples within two ADC steps of
+          the ADC limits. Without `limits` this is the fraction of samples,
+          beyond the first, at the observed minimum or maximum.
+        - `HFNoiseRatio`, the fraction of the signal power above
+          `noise_cutoff`.
+        - `BaselineDrift`, the range of the lowpass filtered signal.
+    
+    Notes
+    -----
+    Missing samples are replaced by the lead mean for all metrics except
+    `NaNCount`; leads without any recorded samples have NaN metrics.
+    '''
+    is_type(matrix, np.ndarray, 'matrix')
+    is_type(limits, (type(None), np.ndarray), 'limits')
+    if not matrix.ndim in [2, 3]:
+        raise ValueError('`matrix` should have two or three dimensions.')
+    matrix = matrix.astype(np.float64, copy=False)
+    n_samples = matrix.shape[-1]
+    # #### missing values
+    missing = np.isnan(matrix)
+    n_nan = missing.sum(axis=-1)
+    empty = n_nan == n_samples
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(np.where(empty[..., None], 0, matrix), axis=-1,
+                          keepdims=True)
+    filled = np.where(missing, mean, matrix)
+    # #### flat line, relative to the median lead range of each ECG
+    low, high = filled.min(axis=-1), filled.max(axis=-1)
+    scale = np.nanmedian(np.where(empty, np.nan, high - low), axis=-1,
+                         keepdims=True)
+    size = max(2, int(round(flat_window * frequency)))
+    span = ndimage.maximum_filter1d(filled, size, axis=-1) -\
+        ndimage.minimum_filter1d(filled, size, axis=-1)
+    flat = (span <= flat_tolerance * scale[..., None]).mean(axis=-1)
+    # #### clipping
+    if limits is None:
+        clip = np.clip((filled == low[..., None]).sum(axis=-1) +
+                       (filled == high[..., None]).sum(axis=-1) - 2, 0,
+                       None) / n_samples
+    else:
+        margin = 2 * limits[..., 2:3]
+        clip = ((filled <= limits[..., 0:1] + margin) |
+                (filled >= limits[..., 1:2] - margin)).mean(axis=-1)
+        clip = np.where(np.isnan(limits[..., 0]), np.nan, clip)
+    # #### high frequency noise
+    power = np.abs(np.fft.rfft(filled - mean, axis=-1)) ** 2
+    freq = np.fft.rfftfreq(n_samples, d=1 / frequency)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        noise = power[..., freq >= noise_cutoff].sum(axis=-1) /\
+            power.sum(axis=-1)
+    # #### baseline drift
+    baseline = signal.sosfiltfilt(
+        design_sos(float(frequency), (None, drift_cutoff)),
+        filled, axis=-1)
+    drift = baseline.max(axis=-1) - baseline.min(axis=-1)
+    # return
+    metrics = {PDNames.COL_QC_NAN: n_nan}
+    for name, value in zip(METRICS[1:], [flat, clip, noise, drift]):
+        metrics[name] = np.where(empty, np.nan, value)
+    return metrics
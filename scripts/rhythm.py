@@ -0,0 +1,301 @@
+'''
+Vectorised R-peak detection and rhythm features (heart rate, RR intervals
+and heart rate variability) for batches of equal-length ECGs.
+
+The detector follows Pan and Tompkins (1985): a 5-15 Hertz bandpass,
+derivative, squaring and moving window integration, followed by an
+adaptive threshold with a refractory period. Each step operates on the
+sample axis of the whole batch.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import numpy as np
+from typing import (
+    List, Dict,
+)
+from ecgprocess.errors import (
+    is_type,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.filters import (
+    design_sos,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+# NOTE imported on first use
+pd = LazyModule('pandas')
+signal = LazyModule('scipy.signal')
+ndimage = LazyModule('scipy.ndimage')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+QRS_BAND = (5.0, 15.0)
+FEATURES = [PDNames.COL_N_BEATS, PDNames.COL_HR, PDNames.COL_RR_MEAN,
+            PDNames.COL_SDNN, PDNames.COL_RMSSD, PDNames.COL_PNN50]
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def detect_rpeaks(signals:np.ndarray, frequency:float,
+                  window:float=0.15, refractory:float=0.2,
+                  threshold:float=0.3,
+                  ) -> List[np.ndarray]:
+    '''
+    Detects the R-peaks of a batch of ECGs.
+    
+    Parameters
+    ----------
+    signals : np.ndarray
+        A single lead (samples), a batch of single leads (ECGs, samples), or
+        a batch of lead combinations (ECGs, leads, samples). For the latter
+        the squared derivatives are averaged over the leads.
+    frequency : `float`
+        The sampling frequency in Hertz.
+    window : `float`, default 0.15
+        The moving window integration width in seconds.
+    refractory : `float`, default 0.2
+        The minimum time between two R-peaks in seconds.
+    threshold : `float`, default 0.3
+        The detection threshold as a fraction of the 99th percentile of the
+        integrated signal of each ECG.
+    
+    Returns
+    -------
+    list [`np.ndarray`]
+        The sample positions of the R-peaks per ECG.
+    
+    Notes
+    -----
+    Missing values are set to zero, hence an ECG without any recorded
+    signal has no R-peaks. The peaks of the integrated signal are refined to
+    the maximum absolute bandpassed amplitude within 75 ms.
+    '''
+    is_type(signals, np.ndarray, 'signals')
+    is_type(frequency, (int, float, np.integer, np.floating), 'frequency')
+    if not signals.ndim in [1, 2, 3]:
+        raise ValueError('`signals` should have one, two or three '
+                         'dimensions.')
+    batch = np.nan_to_num(np.atleast_2d(signals).astype(np.float64))
+    n_samples = batch.shape[-1]
+    # #### bandpass, derivative, squaring and integration
+    filtered = signal.sosfiltfilt(
+        design_sos(float(frequency), QRS_BAND, order=2), batch, axis=-1)
+    energy = np.gradient(filtered, axis=-1) ** 2
+    amplitude = np.abs(filtered)
+    if batch.ndim == 3:
+        energy = energy.mean(axis=1)
+        amplitude = amplitude.sum(axis=1)
+    integrated = ndimage.uniform_filter1d(
+        energy, size=max(1, int(round(window * frequency))), axis=-1)
+    # #### local maxima above the adaptive threshold
+    distance = max(1, int(round(refractory * frequency)))
+    peaks = (integrated == ndimage.maximum_filter1d(
+        integrated, size=2 * distance + 1, axis=-1, mode='constant')) &\
+        (integrated > threshold * np.percentile(
+            integrated, 99, axis=-1, keepdims=True))
+    rows, cols = np.nonzero(peaks)
+    # #### refine to the R-peak amplitude
+    half = int(round(0.075 * frequency))
+    offsets = np.arange(-half, half + 1)
+    window_idx = np.clip(cols[:, None] + offsets, 0, n_samples - 1)
+    cols = window_idx[np.arange(len(cols)),
+                      np.argmax(amplitude[rows[:, None], window_idx], axis=1)]
+    # #### split per ECG
+    split = np.split(cols, np.cumsum(np.bincount(
+        rows, minlength=integrated.shape[0]))[:-1])
+    # return
+    return [np.unique(s) for s in split]
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def rr_features(peaks:List[np.ndarray], frequency:float) -> pd.DataFrame:
+    '''
+    Heart rate, RR interval and heart rate variability features.
+    
+    Parameters
+    ----------
+    peaks : list [`np.ndarray`]
+        The R-peak sample positions per ECG, see `detect_rpeaks`.
+    frequency : `float`
+        The sampling frequency in Hertz.
+    
+    Returns
+    -------
+    pd.DataFrame
+        One row per ECG with the number of beats, the mean heart rate
+        (beats per minute), the mean RR interval, SDNN and RMSSD
+        (milliseconds), and pNN50 (percentage). Features which require more
+        beats than detected are NaN.
+    '''
+    is_type(peaks, list, 'peaks')
+    rows = []
+    for p in peaks:
+        rr = np.diff(p) * 1000 / frequency
+        drr = np.diff(rr)
+        rows.append((
+            len(p),
+            60000 / rr.mean() if len(rr) > 0 else np.nan,
+            rr.mean() if len(rr) > 0 else np.nan,
+            rr.std(ddof=1) if len(rr) > 1 else np.nan,
+            np.sqrt(np.mean(drr ** 2)) if len(drr) > 0 else np.nan,
+            100 * np.mean(np.abs(drr) > 50) if len(drr) > 0 else np.nan,
+        ))
+    # return
+    return pd.DataFrame(rows, columns=FEATURES)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def rhythm_features(waves:List[Dict[str, np.ndarray]|float],
+                    frequencies:List[float],
+                    leads:str|List[str]=PDNames.LEAD_II,
+                    **kwargs,
+                    ) -> pd.DataFrame:
+    '''
+    Detects the R-peaks of a list of ECGs, grouping these by sampling
+    frequency and length so each group is processed as a single batch.
+    
+    Parameters
+    ----------
+    waves : list [`dict` [`str`, `np.ndarray`]]
+        The lead specific voltages per ECG, e.g. `Waveforms`.
+    frequencies : list [`float`]
+        The sampling frequency per ECG.
+    leads : `str` or list [`str`], default `II`
+        The lead, or lead combination, used for the detection.
+    **kwargs
+        Keyword arguments passed to `detect_rpeaks`.
+    
+    Returns
+    -------
+    pd.DataFrame
+        The `rr_features` in the order of `waves`. ECGs without all `leads`
+        have NaN features.
+    '''
+    is_type(waves, list, 'waves')
+    is_type(frequencies, list, 'frequencies')
+    is_type(leads, (str, list), 'leads')
+    if len(waves) != len(frequencies):
+        raise ValueError('`waves` and `frequencies` should have equal '
+                         'length.')
+    if isinstance(leads, str):
+        leads = [leads]
+    features = pd.DataFrame(np.nan, index=range(len(waves)),
+                            columns=FEATURES)
+    # #### group the ECGs with the same sampling frequency and length
+    groups = {}
+    for i, (w, fs) in enumerate(zip(waves, frequencies)):
+        if not isinstance(w, dict) or any(not l in w for l in leads) or\
+                pd.isna(fs):
+            continue
+        groups.setdefault((float(fs), len(w[leads[0]])), []).append(i)
+    for (fs, _), index in groups.items():
+        batch = np.stack([np.stack([waves[i][l] for l in leads])
+                          for i in index])
+        peaks = detect_rpeaks(batch if len(leads) > 1 else batch[:, 0],
+                              frequency=fs, **kwargs)
+        features.loc[index, FEATURES] = rr_features(peaks, fs).values
+    # return
+    return features
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def compare_annotations(table:pd.DataFrame) -> pd.DataFrame:
+    '''
+    Adds the differences between the detected heart rate and mean RR
+    interval and the `VRate` and `RR Interval` reported in the DICOM.
+    
+    Parameters
+    ----------
+    table : pd.DataFrame
+        A metadata table with the `rhythm_features` and, if extracted, the
+        ECG traits.
+    
+    Returns
+    -------
+    pd.DataFrame
+        The table with `HeartRateDifference` (beats per minute) and
+        `RRIntervalDifference` (milliseconds) columns, for the traits which
+        are available.
+    '''
+    is_type(table, pd.DataFrame, 'table')
+    table = table.copy()
+    for trait, feature, column in [
+            (PDNames.VRATE, PDNames.COL_HR, PDNames.COL_HR_DIFF),
+            (PDNames.RR_INTERVAL, PDNames.COL_RR_MEAN, PDNames.COL_RR_DIFF)]:
+        if trait in table.columns and feature in table.columns:
+            table[column] = table[feature] -\
+                pd.to_numeric(table[trait], errors='coerce')
+    # return
+    return table
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def derive_median_beat(matrix:np.ndarray, frequency:float,
+                       n_samples:int=600, duration:float=1.2,
+                       pre:float=0.5, max_lag:float=0.04, min_beats:int=3,
+                       **kwargs,
+                       ) -> np.ndarray|None:
+    '''
+    Derives a median beat from the rhythm waveforms of a single ECG.
+    
+    Parameters
+    ----------
+    matrix : np.ndarray
+        The (leads, samples) rhythm waveforms.
+    frequency : `float`
+        The sampling frequency in Hertz.
+    n_samples : `int`, default 600
+        The number of samples of the returned median beat.
+    duration : `float`, default 1.2
+        The duration of the median beat in seconds; the default 600 samples
+        over 1.2 seconds match the 500 Hertz median beats of the DICOMs.
+    pre : `float`, default 0.5
+        The time in seconds before the R-peak.
+    max_lag : `float`, default 0.04
+        The maximum shift in seconds of a beat during the alignment.
+    min_beats : `int`, default 3
+        The minimum number of complete beats.
+    **kwargs
+        Keyword arguments passed to `detect_rpeaks`.
+    
+    Returns
+    -------
+    np.ndarray or `NoneType`
+        The (leads, `n_samples`) median beat, or `NoneType` if fewer than
+        `min_beats` complete beats were detected.
+    
+    Notes
+    -----
+    The R-peaks are detected on all leads combined. Each beat is shifted by
+    up to `max_lag` to maximise its cross-correlation, summed over the leads,
+    with the initial sample-wise median beat; the returned median is taken
+    over the aligned beats. The correlations at all lags, and the medians,
+    are computed for all beats and leads at once.
+    '''
+    is_type(matrix, np.ndarray, 'matrix')
+    if matrix.ndim != 2:
+        raise ValueError('`matrix` should have two dimensions.')
+    matrix = matrix.astype(np.float64, copy=False)
+    peaks = detect_rpeaks(matrix[None], frequency=frequency, **kwargs)[0]
+    n_pre = int(round(pre * frequency))
+    n_beat = int(round(duration * frequency))
+    lag = int(round(max_lag * frequency))
+    # #### the complete beats, including the margins of the alignment
+    start = peaks - n_pre - lag
+    start = start[(start >= 0) & (start + n_beat + 2 * lag <= matrix.shape[-1])]
+    if len(start) < min_beats:
+        return None
+    # (beats, leads, samples)
+    epochs = np.moveaxis(matrix[:, start[:, None] +
+                                np.arange(n_beat + 2 * lag)], 1, 0)
+    # #### align by the cross-correlation with the initial median beat
+    # (beats, leads, lags, samples)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        epochs, n_beat, axis=-1)
+    clean = np.nan_to_num(windows)
+    template = np.median(clean[:, :, lag], axis=0)
+    best = np.argmax(np.einsum('blkt,lt->bk', clean, template), axis=1)
+    aligned = windows[np.arange(len(best)), :, best]
+    median = np.median(aligned, axis=0)
+    if median.shape[-1] != n_samples:
+        median = signal.resample(median, n_samples, axis=-1)
+    # return
+    return median
@@ -0,0 +1,453 @@
+'''
+A command-line batch runner converting a directory tree of ECG DICOMs into
+tables using `ECGDICOMTable.write_ecg`, replacing the hardcoded settings of
+`Main_read_ECG_DICOM.py`.
+
+Example
+-------
+>>> python -m ecgprocess.run_batches E:/ECG_input E:/ECG_output \\
+...     --workers 8 --batch-size 1000 --info-type meta --archive move
+
+To split the archive over several servers each server runs its own
+partition, e.g. `--partition 0/4` to `--partition 3/4`, after which the
+partition manifests are checked by `python -m ecgprocess.partitions`.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import os
+import sys
+import time
+import shutil
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import (
+    List, Dict, Optional, Any,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.functions import (
+    get_batch_prefix,
+)
+from ecgprocess.partitions import (
+    parse_partition,
+    partition_prefix,
+)
+from ecgprocess.telemetry import (
+    Telemetry,
+)
+from ecgprocess.lazy_imports import (
+    LazyModule,
+)
+pd = LazyModule('pandas')
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+FORMATS = ['tsv.gz', 'tar.gz']
+ARCHIVE = ['keep', 'move', 'copy']
+INFO_TYPES = [PDNames.INFO_TYPE_ALL, PDNames.INFO_TYPE_RTM,
+              PDNames.INFO_TYPE_MED, PDNames.INFO_TYPE_MET]
+RUN_SUMMARY_FILE = '{}_DICOM_ECG_RunSummary.tsv'
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def list_dicoms(input_root:str, exclude:Optional[str]=None) -> List[str]:
+    '''
+    Lists the files under `input_root`, sorted for a reproducible batch
+    assignment, skipping the `exclude` (archive) directory.
+    '''
+    exclude = None if exclude is None else os.path.abspath(exclude)
+    paths = []
+    for path, subdirs, files in os.walk(input_root):
+        subdirs[:] = [d for d in subdirs if
+                      os.path.abspath(os.path.join(path, d)) != exclude]
+        paths.extend(os.path.join(path, f) for f in files)
+    return sorted(paths)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def batch_name(start:int, end:int, offset:int=0) -> str:
+    '''
+    The zero-padded batch range used in the file names, e.g. `0001000_0002000`.
+    '''
+    start, end = start + offset, end + offset
+    return get_batch_prefix(start) + str(start) + '_' +\
+        get_batch_prefix(end) + str(end)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def run_batch(paths:List[str], name:str, output_root:str,
+              output_format:str='tsv.gz', info_type:str='all',
+              kwargs_reader:Optional[Dict[str, Any]]=None,
+              kwargs_write:Optional[Dict[str, Any]]=None,
+              partition:Optional[str]=None, partition_by:str='path',
+              partition_root:Optional[str]=None,
+              timeout:Optional[float]=None,
+              memory_limit:Optional[int]=None,
+              metrics_format:Optional[str]=None,
+              metrics_interval:float=10.0,
+              ) -> Dict[str, Any]:
+    '''
+    Extracts a single batch of dicom files using `ECGDICOMTable.write_ecg`.
+    
+    Parameters
+    ----------
+    paths : list [`str`]
+        The dicom files of the batch.
+    name : `str`
+        The file name prefix of the batch.
+    output_root : `str`
+        The directory the tables are written to.
+    output_format : {`tsv.gz`, `tar.gz`}, default `tsv.gz`
+        Whether to write gzipped tables or a tar.gz archive per batch.
+    info_type : {`all`, `rhythm`, `median`, `meta`}, default `all`
+        Which information should be extracted.
+    kwargs_reader : dict, default `NoneType`
+        Keyword arguments for `ECGDICOMReader`.
+    kwargs_write : dict, default `NoneType`
+        Additional keyword arguments for `write_ecg`.
+    partition : `str`, default `NoneType`
+        Only extract partition `i/N` of the batch, the output file names are
+        prefixed by the partition.
+    partition_by : {`path`, `uid`}, default `path`
+        Whether to partition on the file path or SOPinstanceUID.
+    partition_root : `str`, default `NoneType`
+        The file paths are hashed relative to this directory.
+    timeout : `float`, default `NoneType`
+        The maximum number of seconds to read a single file.
+    memory_limit : `int`, default `NoneType`
+        The maximum memory in bytes to read a single file.
+    metrics_format : {`prometheus`, `jsonl`}, default `NoneType`
+        If supplied the batch telemetry is written to
+        `<batch>_Metrics.prom` or `<batch>_Metrics.jsonl` every
+        `metrics_interval` seconds.
+    metrics_interval : `float`, default 10.0
+        The seconds between metrics updates.
+    
+    Returns
+    -------
+    dict [`str`, `any`]
+        The batch name, the number of files, written ECGs, unreadable files,
+        files without waveforms, duplicates and quarantined files, the
+        read-ahead sizes and seconds the reader waited for the writer if
+        `kwargs_write` includes a `memory_budget`, and the seconds taken.
+    '''
+    from ecgprocess.process_dicoms import ECGDICOMReader, ECGDICOMTable
+    start = time.perf_counter()
+    telemetry = None
+    if metrics_format is not None:
+        prefix = name if partition is None else\
+            partition_prefix(partition) + name
+        telemetry = Telemetry(
+            os.path.join(output_root, prefix + '_' + PDNames.TELEMETRY_FILE +
+                         PDNames.TELEMETRY_EXTENSIONS[metrics_format]),
+            metrics_format=metrics_format, interval=metrics_interval,
+            labels={'batch': name})
+    table = ECGDICOMTable(ECGDICOMReader(**(kwargs_reader or {})),
+                          path_list=paths, info_type=info_type)
+    table(skip_missing=PDNames.SKIP_DATA, duplicates=PDNames.DUP_SKIP,
+          partition=partition, partition_by=partition_by,
+          partition_root=partition_root, timeout=timeout,
+          memory_limit=memory_limit, telemetry=telemetry)
+    if output_format == 'tar.gz':
+        tar_name = name if partition is None else\
+            partition_prefix(partition) + name
+        table.write_ecg(target_tar=tar_name + '.tar.gz',
+                        target_path=output_root, **(kwargs_write or {}))
+    else:
+        table.write_ecg(target_path=output_root, table_prefix=name + '_',
+                        **(kwargs_write or {}))
+    n_unreadable = len(getattr(table, PDNames.FPATH_L))
+    n_no_data = len(getattr(table, PDNames.FAILED_DATA_L, []))
+    n_duplicates = len(getattr(table, PDNames.DUPLICATE_L, []))
+    n_quarantined = len(getattr(table, PDNames.QUARANTINE_L, []))
+    # NOTE the number of files of the (partitioned) batch
+    n_files = n_unreadable + len(getattr(table, PDNames.CPATH_L))
+    return {
+        'batch': name, 'files': n_files,
+        'written': n_files - n_unreadable - n_no_data - n_duplicates -
+        n_quarantined,
+        'unreadable': n_unreadable, 'no_data': n_no_data,
+        'duplicates': n_duplicates, 'quarantined': n_quarantined,
+        'batch_sizes': ','.join(
+            str(s) for s in getattr(table, PDNames.BATCH_SIZES, [])),
+        'backpressure_seconds': getattr(table, PDNames.BACKPRESSURE, 0.0),
+        'seconds': time.perf_counter() - start,
+        'worker': os.getpid(),
+    }
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _archive(paths:List[str], input_root:str, archive_root:str,
+             archive:str) -> None:
+    '''
+    Moves or copies processed files to `archive_root`, retaining the
+    directory structure relative to `input_root`.
+    '''
+    for p in paths:
+        target = os.path.join(archive_root, os.path.relpath(p, input_root))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if archive == 'move':
+            shutil.move(p, target)
+        else:
+            shutil.copy2(p, target)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def run(input_root:str, output_root:str, workers:int=1, batch_size:int=1000,
+        output_format:str='tsv.gz', info_type:str='all',
+        archive:str='keep', archive_root:Optional[str]=None, offset:int=0,
+        kwargs_reader:Optional[Dict[str, Any]]=None,
+        kwargs_write:Optional[Dict[str, Any]]=None,
+        partition:Optional[str]=None, partition_by:str='path',
+        timeout:Optional[float]=None, memory_limit:Optional[int]=None,
+        memory_budget:Optional[int]=None,
+        metrics_format:Optional[str]=None, metrics_interval:float=10.0,
+        profile:Optional[int|float]=None,
+        verbose:bool=True,
+        ) -> pd.DataFrame:
+    '''
+    Splits the dicom files under `input_root` into batches, extracts these in
+    parallel and writes a run summary.
+    
+    Parameters
+    ----------
+    input_root : `str`
+        The directory with dicom files, searched recursively.
+    output_root : `str`
+        The directory the batch tables and run summary are written to.
+    workers : `int`, default 1
+        The number of batches extracted in parallel.
+    batch_size : `int`, default 1000
+        The number of files per batch.
+    output_format : {`tsv.gz`, `tar.gz`}, default `tsv.gz`
+        Whether to write gzipped tables or a tar.gz archive per batch.
+    info_type : {`all`, `rhythm`, `median`, `meta`}, default `all`
+        Which information should be extracted.
+    archive : {`keep`, `move`, `copy`}, default `keep`
+        What to do with the dicom files of a completed batch. Should be
+        `keep` when extracting a `partition`.
+    archive_root : `str`, default `NoneType`
+        The archive directory, defaults to `<input_root>/processed`.
+    offset : `int`, default 0
+        The number of files already processed today, added to the batch
+        names.
+    kwargs_reader : dict, default `NoneType`
+        Keyword arguments for `ECGDICOMReader`.
+    kwargs_write : dict, default `NoneType`
+        Additional keyword arguments for `write_ecg`.
+    partition : `str`, default `NoneType`
+        Only extract partition `i/N` (zero-based) of the dicom files, see
+        `partitions.select_partition`.
+    partition_by : {`path`, `uid`}, default `path`
+        Whether to partition on the file path (relative to `input_root`) or
+        the SOPinstanceUID.
+    timeout : `float`, default `NoneType`
+        The maximum number of seconds to read a single file. Files exceeding
+        the `timeout` or `memory_limit`, or crashing the reader, are listed in
+        `<batch>_QuarantineFiles.txt` and the batch continues.
+    memory_limit : `int`, default `NoneType`
+        The maximum memory in bytes to read a single file.
+    memory_budget : `int`, default `NoneType`
+        The bytes available for ECGs read ahead of the writers, shared
+        equally by the `workers` (see `ECGDICOMTable.write_ecg`). The
+        read-ahead sizes chosen are added to the run summary.
+    metrics_format : {`prometheus`, `jsonl`}, default `NoneType`
+        If supplied each batch writes its telemetry to
+        `<batch>_Metrics.<ext>` (see `telemetry.Telemetry`), and the run
+        writes the files and ECGs per second, failures by cause, pending
+        batches and the utilization of each worker process to
+        `Metrics.<ext>` after every batch.
+    metrics_interval : `float`, default 10.0
+        The seconds between metrics updates of a batch.
+    profile : `int` or `float`, default `NoneType`
+        Profiles the first `profile` files, or a fraction of the files if a
+        float, of every batch. Each batch writes
+        `<batch>_Profile_<stage>.pstats`, `<batch>_ProfileSummary.tsv` with
+        the slowest functions and `<batch>_ProfileComponents.tsv` with the
+        time per component (see `profiling.StageProfiler`).
+    verbose : bool, default `True`
+        Whether to print the progress per batch.
+    
+    Returns
+    -------
+    pd.DataFrame
+        The run summary with one row per batch, also written to
+        `<date>_DICOM_ECG_RunSummary.tsv`.
+    
+    Notes
+    -----
+    Batch files are named `<date>_DICOM_ECG_<start>_<end>_`, following the
+    legacy `get_batch_prefix` naming. Duplicate SOPinstanceUIDs are skipped
+    within a batch.
+    
+    With a `partition` each batch covers `batch_size * N` listed files, of
+    which roughly `batch_size` belong to the partition; the partition is
+    selected by the batch workers and added as prefix to all output files.
+    Hence the same batch of every server covers the same listed files.
+    '''
+    if not output_format in FORMATS:
+        raise ValueError(f'`output_format` is restricted to `{FORMATS}`.')
+    if not archive in ARCHIVE:
+        raise ValueError(f'`archive` is restricted to `{ARCHIVE}`.')
+    if not info_type in INFO_TYPES:
+        raise ValueError(f'`info_type` is restricted to `{INFO_TYPES}`.')
+    if metrics_format is not None and\
+            not metrics_format in PDNames.TELEMETRY_FORMATS:
+        raise ValueError('`metrics_format` is restricted to '
+                         f'`{PDNames.TELEMETRY_FORMATS}`.')
+    if partition is not None and archive != 'keep':
+        # NOTE the other servers may still be reading the batch
+        raise ValueError('`archive` should be `keep` when extracting a '
+                         '`partition`.')
+    if archive_root is None:
+        archive_root = os.path.join(input_root, 'processed')
+    summary_prefix = ''
+    if partition is not None:
+        # scale the batches to about `batch_size` files per partition
+        batch_size = batch_size * parse_partition(partition)[1]
+        summary_prefix = partition_prefix(partition)
+    if memory_budget is not None:
+        kwargs_write = dict(kwargs_write or {})
+        kwargs_write['memory_budget'] = max(1, memory_budget // workers)
+    if profile is not None:
+        kwargs_write = dict(kwargs_write or {})
+        kwargs_write['profile'] = profile
+    os.makedirs(output_root, exist_ok=True)
+    today = datetime.today().strftime('%Y%m%d')
+    paths = list_dicoms(input_root, exclude=archive_root)
+    batches = {}
+    for start in range(0, len(paths), batch_size):
+        end = min(start + batch_size, len(paths))
+        name = today + '_DICOM_ECG_' + batch_name(start, end, offset=offset)
+        batches[name] = paths[start:end]
+    if verbose == True:
+        print(f'Number of DICOMs: {len(paths)} in {len(batches)} batches.',
+              file=sys.stdout)
+    # #### extract the batches
+    results = []
+    telemetry = None
+    if metrics_format is not None:
+        telemetry = Telemetry(
+            os.path.join(output_root, summary_prefix + PDNames.TELEMETRY_FILE +
+                         PDNames.TELEMETRY_EXTENSIONS[metrics_format]),
+            metrics_format=metrics_format, labels={'run': today})
+    run_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(
+            run_batch, batch, name, output_root, output_format, info_type,
+            kwargs_reader, kwargs_write, partition, partition_by,
+            input_root, timeout, memory_limit, metrics_format,
+            metrics_interval): name for name, batch in batches.items()}
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if telemetry is not None:
+                telemetry.increment(PDNames.TELEMETRY_FILES, result['files'])
+                telemetry.increment(PDNames.TELEMETRY_ECGS, result['written'])
+                for cause, column in [
+                        (PDNames.FAIL_UNREADABLE, 'unreadable'),
+                        (PDNames.FAIL_NO_DATA, 'no_data'),
+                        (PDNames.FAIL_DUPLICATE, 'duplicates'),
+                        (PDNames.FAIL_QUARANTINE, 'quarantined')]:
+                    telemetry.failure(cause, result[column])
+                telemetry.work('pid' + str(result['worker']),
+                               result['seconds'])
+                telemetry.gauge('batches_pending',
+                                len(batches) - len(results))
+                telemetry.emit()
+            if archive != 'keep':
+                _archive(batches[result['batch']], input_root, archive_root,
+                         archive)
+            if verbose == True:
+                print('{batch}: {written}/{files} ECGs in {seconds:.1f}s.'.\
+                      format(**result), file=sys.stdout)
+    seconds = time.perf_counter() - run_start
+    # #### run summary
+    summary = pd.DataFrame(results, columns=[
+        'batch', 'files', 'written', 'unreadable', 'no_data', 'duplicates',
+        'quarantined', 'batch_sizes', 'backpressure_seconds', 'seconds']).sort_values('batch', ignore_index=True)
+    summary['files_per_second'] = summary['files'] / summary['seconds']
+    summary.to_csv(os.path.join(
+        output_root, summary_prefix + RUN_SUMMARY_FILE.format(today)),
+        sep='\t', index=False)
+    if verbose == True:
+        print('Conversion finished: {} of {} ECGs in {:.1f}s ({:.1f} files/s '
+              'using {} workers).'.format(
+                  summary['written'].sum(), summary['files'].sum(), seconds,
+                  summary['files'].sum() / seconds if seconds > 0 else
+                  float('nan'), workers), file=sys.stdout)
+    # return
+    return summary
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main(argv:Optional[List[str]]=None) -> None:
+    '''
+    The command-line entry point, see `--help`.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Convert a directory of ECG DICOMs into tables.')
+    parser.add_argument('input_root', help='The directory with DICOM files.')
+    parser.add_argument('output_root', help='The output directory.')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='The number of batches run in parallel.')
+    parser.add_argument('-b', '--batch-size', type=int, default=1000,
+                        help='The number of files per batch.')
+    parser.add_argument('-f', '--format', default='tsv.gz', choices=FORMATS,
+                        dest='output_format', help='The output format.')
+    parser.add_argument('-i', '--info-type', default='all',
+                        choices=INFO_TYPES,
+                        help='Which information to extract.')
+    parser.add_argument('-a', '--archive', default='keep', choices=ARCHIVE,
+                        help='What to do with processed DICOM files.')
+    parser.add_argument('--archive-root', default=None,
+                        help='The archive directory, defaults to '
+                        '<input_root>/processed.')
+    parser.add_argument('--offset', type=int, default=0,
+                        help='The number of files processed earlier today.')
+    parser.add_argument('--partition', default=None, metavar='i/N',
+                        help='Only extract partition i of N (zero-based).')
+    parser.add_argument('--partition-by', default=PDNames.PARTITION_PATH,
+                        choices=[PDNames.PARTITION_PATH, PDNames.PARTITION_UID],
+                        help='Partition on the relative file path or the '
+                        'SOPinstanceUID.')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='The maximum number of seconds per file.')
+    parser.add_argument('--memory-limit', type=float, default=None,
+                        help='The maximum memory in MB per file.')
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help='The memory in MB for files read ahead of the '
+                        'writers, shared by the workers.')
+    parser.add_argument('--metrics-format', default=None,
+                        choices=PDNames.TELEMETRY_FORMATS,
+                        help='Write telemetry in this format to '
+                        '<output_root>/Metrics and <batch>_Metrics files.')
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help='The seconds between metrics updates.')
+    parser.add_argument('--profile', type=float, default=None,
+                        help='Profile this number of files per batch, or '
+                        'this fraction of the files if below 1.')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Do not print progress.')
+    args = parser.parse_args(argv)
+    if args.partition is not None:
+        try:
+            parse_partition(args.partition)
+        except ValueError as VE:
+            parser.error(str(VE))
+    run(args.input_root, args.output_root, workers=args.workers,
+        batch_size=args.batch_size, output_format=args.output_format,
+        info_type=args.info_type, archive=args.archive,
+        archive_root=args.archive_root, offset=args.offset,
+        partition=args.partition, partition_by=args.partition_by,
+        timeout=args.timeout,
+        memory_limit=None if args.memory_limit is None else
+        int(args.memory_limit * 1024 ** 2),
+        memory_budget=None if args.memory_budget is None else
+        int(args.memory_budget * 1024 ** 2),
+        metrics_format=args.metrics_format,
+        metrics_interval=args.metrics_interval,
+        profile=None if args.profile is None else args.profile if
+        args.profile < 1 else int(args.profile),
+        verbose=not args.quiet)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+'''
+Transfers lead arrays from worker processes through a shared memory ring
+instead of pickling the waveform dictionaries back to the parent process.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import collections
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    List, Self, Dict, Optional, Any, Iterator,
+)
+from ecgprocess.errors import (
+    is_type,
+    Error_MSG,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.process_dicoms import (
+    ECGDICOMReader,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# the ring attached by each worker process
+_RING = None
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class SharedLeadRing(object):
+    '''
+    A fixed number of equally shaped slots in a
+    `multiprocessing.shared_memory` block, each holding the rhythm and
+    median beat leads of a single ECG.
+    
+    Attributes
+    ----------
+    n_slots : `int`
+        The number of slots.
+    leads : `list` [`str`]
+        The lead names, in the row order of each slot.
+    n_samples : `int`
+        The number of rhythm samples per lead.
+    n_median : `int`
+        The number of median beat samples per lead.
+    dtype : `str`
+        The array dtype.
+    array : `np.ndarray`
+        A (n_slots, leads, n_samples + n_median) view of the shared block.
+    
+    Methods
+    -------
+    write(slot, rhythm, median)
+        Copies the lead dictionaries to a slot.
+    rhythm(slot), median(slot)
+        Return views of a slot.
+    spec()
+        The arguments needed to attach to the ring from another process.
+    close(), unlink()
+        Release the shared block.
+    
+    Notes
+    -----
+    Leads absent from an ECG, and samples beyond its length, are NaN. Longer
+    leads are truncated.
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, n_slots:int, leads:List[str], n_samples:int=5000,
+                 n_median:int=600, dtype:str='float32',
+                 name:Optional[str]=None,
+                 ) -> None:
+        """
+        Initialises a new instance of `SharedLeadRing`, allocating the shared
+        block or, if `name` is supplied, attaching to an existing block.
+        
+        Parameters
+        ----------
+        n_slots : `int`
+            The number of slots.
+        leads : `list` [`str`]
+            The lead names.
+        n_samples : `int`, default 5000
+            The number of rhythm samples per lead.
+        n_median : `int`, default 600
+            The number of median beat samples per lead.
+        dtype : `str`, default `float32`
+            The array dtype.
+        name : `str`, default `NoneType`
+            The name of an existing shared memory block.
+        """
+        is_type(n_slots, int)
+        is_type(leads, list)
+        is_type(n_samples, int)
+        is_type(n_median, int)
+        is_type(dtype, str)
+        is_type(name, (type(None), str))
+        self.n_slots = n_slots
+        self.leads = leads
+        self.n_samples = n_samples
+        self.n_median = n_median
+        self.dtype = dtype
+        self._owner = name is None
+        shape = (n_slots, len(leads), n_samples + n_median)
+        if self._owner == True:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=int(np.prod(shape)) *
+                np.dtype(dtype).itemsize)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # NOTE attaching registers the block with the resource tracker,
+            # which would unlink it when a worker exits (python < 3.13)
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self._rows = {l: i for i, l in enumerate(leads)}
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __str__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME} instance with {self.n_slots} slots of "
+                f"shape {self.array.shape[1:]}."
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(n_slots={self.n_slots}, leads={self.leads}, "
+                f"n_samples={self.n_samples}, n_median={self.n_median}, "
+                f"dtype={self.dtype}, name={self.shm.name})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __enter__(self) -> Self:
+        return self
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __exit__(self, *args) -> None:
+        self.close()
+        if self._owner == True:
+            self.unlink()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def spec(self) -> Dict[str, Any]:
+        '''
+        The keyword arguments to attach to this ring from another process.
+        '''
+        return {'n_slots': self.n_slots, 'leads': self.leads,
+                'n_samples': self.n_samples, 'n_median': self.n_median,
+                'dtype': self.dtype, 'name': self.shm.name}
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def write(self, slot:int, rhythm:Dict[str, np.ndarray]|float,
+              median:Dict[str, np.ndarray]|float,
+              ) -> tuple[int, int]:
+        '''
+        Copies the rhythm and median beat leads to a slot.
+        
+        Parameters
+        ----------
+        slot : `int`
+            The slot index.
+        rhythm, median : dict [`str`, `np.ndarray`]
+            The lead specific voltages, `np.nan` if absent.
+        
+        Returns
+        -------
+        `tuple` [`int`, `int`]
+            The number of written rhythm and median beat samples.
+        '''
+        self.array[slot] = np.nan
+        sizes = []
+        for leads, start, size in [(rhythm, 0, self.n_samples),
+                                   (median, self.n_samples, self.n_median)]:
+            n = 0
+            if isinstance(leads, dict):
+                for lead, values in leads.items():
+                    if lead in self._rows:
+                        n = min(len(values), size)
+                        self.array[slot, self._rows[lead],
+                                   start:start + n] = values[:n]
+            sizes.append(n)
+        return sizes[0], sizes[1]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def rhythm(self, slot:int) -> np.ndarray:
+        '''
+        A (leads, n_samples) view of the rhythm leads in a slot.
+        '''
+        return self.array[slot, :, :self.n_samples]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def median(self, slot:int) -> np.ndarray:
+        '''
+        A (leads, n_median) view of the median beat leads in a slot.
+        '''
+        return self.array[slot, :, self.n_samples:]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def close(self) -> None:
+        '''
+        Closes this process' access to the shared block.
+        '''
+        del self.array
+        self.shm.close()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def unlink(self) -> None:
+        '''
+        Frees the shared block, call once from the owning process.
+        '''
+        self.shm.unlink()
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _attach_ring(spec:Dict[str, Any]) -> None:
+    '''
+    Worker initializer attaching to the parent's ring.
+    '''
+    global _RING
+    _RING = SharedLeadRing(**spec)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _read_to_slot(path:str, slot:int, ecgdicomreader:ECGDICOMReader,
+                  skip_data:bool, kwargs_reader:dict[Any, Any],
+                  ) -> tuple[str, int, dict[str, Any]|None, int, int]:
+    '''
+    Reads a single dicom file in a worker, writing the leads to `slot` and
+    returning only the metadata.
+    
+    Returns
+    -------
+    `tuple`
+        The path, the slot, the metadata and the number of written rhythm and
+        median samples. The metadata is `NoneType` if the file lacks a
+        waveform_array and `skip_data` is `True`.
+    '''
+    try:
+        ecg_inst = ecgdicomreader(path, **kwargs_reader)
+    except AttributeError as AE:
+        if skip_data == True:
+            return path, slot, None, 0, 0
+        else:
+            raise AE
+    if hasattr(ecg_inst, PDNames.SOP_UID) == False:
+        raise AttributeError(Error_MSG.MISSING_ATTR.format(
+            PDNames.SOP_UID, 'ecg_inst'))
+    n_rhythm, n_median = _RING.write(
+        slot, ecg_inst.get_voltages(), ecg_inst.get_voltages(median=True))
+    return path, slot, getattr(ecg_inst, PDNames.RESULTS_DICT),\
+        n_rhythm, n_median
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def iter_shared(path_list:List[str], ecgdicomreader:ECGDICOMReader,
+                leads:Optional[List[str]]=None, n_jobs:int=2,
+                n_slots:Optional[int]=None, dtype:str='float32',
+                skip_data:bool=True,
+                kwargs_reader:Dict[Any, Any]|None=None,
+                ) -> Iterator[tuple[str, dict[str, Any], np.ndarray,
+                                    np.ndarray]]:
+    '''
+    Reads dicom files in worker processes, transferring the leads through a
+    `SharedLeadRing` and yielding the results in `path_list` order.
+    
+    Parameters
+    ----------
+    path_list : list [`str`]
+        The dicom files.
+    ecgdicomreader : ECGDICOMReader
+        The reader used by the workers.
+    leads : list [`str`], default `NoneType`
+        The lead row order, defaults to the twelve standard leads.
+    n_jobs : `int`, default 2
+        The number of worker processes.
+    n_slots : `int`, default `NoneType`
+        The number of ring slots, defaults to `2 * n_jobs`. This bounds the
+        number of files in flight.
+    dtype : `str`, default `float32`
+        The ring dtype.
+    skip_data : bool, default `True`
+        Whether files without a waveform_array are skipped.
+    kwargs_reader : dict, default `NoneType`
+        Keyword arguments for the `ECGDICOMReader` call.
+    
+    Yields
+    ------
+    `tuple`
+        The path, the metadata dictionary and (leads, samples) views of the
+        rhythm and median beat leads. Missing leads and samples are NaN.
+    
+    Notes
+    -----
+    The views point into the ring and are reused once the next item is
+    requested; copy these (or build the table or tensor) before advancing.
+    Only the metadata dictionaries are pickled.
+    '''
+    is_type(path_list, list, 'path_list')
+    is_type(ecgdicomreader, ECGDICOMReader, 'ecgdicomreader')
+    is_type(n_jobs, int, 'n_jobs')
+    if leads is None:
+        leads = [PDNames.LEAD_I, PDNames.LEAD_II, PDNames.LEAD_III,
+                 PDNames.LEAD_aVR, PDNames.LEAD_aVL, PDNames.LEAD_aVF,
+                 'V1', 'V2', 'V3', 'V4', 'V5', 'V6']
+    if n_slots is None:
+        n_slots = 2 * n_jobs
+    if kwargs_reader is None:
+        kwargs_reader = {}
+    with SharedLeadRing(n_slots, leads, dtype=dtype) as ring:
+        free = collections.deque(range(n_slots))
+        pending = collections.deque()
+        paths = iter(path_list)
+        with ProcessPoolExecutor(max_workers=n_jobs,
+                                 initializer=_attach_ring,
+                                 initargs=(ring.spec(),)) as executor:
+            while True:
+                # keep every free slot busy
+                while free:
+                    path = next(paths, None)
+                    if path is None:
+                        break
+                    pending.append(executor.submit(
+                        _read_to_slot, path, free.popleft(), ecgdicomreader,
+                        skip_data, kwargs_reader))
+                if not pending:
+                    break
+                path, slot, info, _, _ = pending.popleft().result()
+                if info is not None:
+                    yield path, info, ring.rhythm(slot), ring.median(slot)
+                # the slot is released once the consumer advances
+                free.append(slot)
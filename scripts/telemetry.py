@@ -0,0 +1,365 @@
+'''
+Progress and throughput telemetry for long extraction runs, periodically
+written to a local metrics file in the Prometheus text exposition format
+(e.g. for the node_exporter textfile collector) or as JSON lines, together
+with a rate-limited printer replacing per-file progress prints.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import threading
+from typing import (
+    Any, Dict, Optional, TextIO,
+)
+from ecgprocess.errors import (
+    is_type,
+    Error_MSG,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+PREFIX = 'ecgprocess_'
+# the counters and their help text
+COUNTERS = {
+    PDNames.TELEMETRY_FILES: 'The number of dicom files read.',
+    PDNames.TELEMETRY_BYTES: 'The number of dicom bytes read.',
+    PDNames.TELEMETRY_ECGS: 'The number of ECGs extracted.',
+}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _labels(labels:Dict[str, Any]) -> str:
+    '''
+    Formats Prometheus labels, e.g. `{batch="b1",cause="timeout"}`.
+    '''
+    if len(labels) == 0:
+        return ''
+    escaped = {k: str(v).replace('\\', '\\\\').replace('"', '\\"').\
+               replace('\n', '\\n') for k, v in labels.items()}
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped.items()) + '}'
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class RateLimitedPrinter(object):
+    '''
+    Prints at most one message per `interval` seconds, counting the
+    messages dropped in between.
+    
+    Attributes
+    ----------
+    interval : `float`
+        The minimum number of seconds between printed messages, 0 prints
+        every message.
+    suppressed : `int`
+        The number of messages dropped since the last printed message.
+    
+    Example
+    -------
+    >>> printer = RateLimitedPrinter(interval=5)
+    >>> for p in paths:
+    ...     printer(f'Processing path: {p}.')
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, interval:float=1.0, file:Optional[TextIO]=None,
+                 ) -> None:
+        """
+        Initialises a new instance of `RateLimitedPrinter`.
+        
+        Parameters
+        ----------
+        interval : `float`, default 1.0
+            The minimum number of seconds between printed messages.
+        file : file-like, default `NoneType`
+            The stream printed to, defaults to `sys.stdout`.
+        """
+        is_type(interval, (int, float), 'interval')
+        self.interval = interval
+        self.file = file
+        self.suppressed = 0
+        self._last = None
+        self._lock = threading.Lock()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __call__(self, message:str, force:bool=False) -> bool:
+        '''
+        Prints `message` unless a message was printed less than `interval`
+        seconds ago, or `force` is `True`.
+        
+        Returns
+        -------
+        bool
+            Whether the message was printed.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            if force == False and self._last is not None and\
+                    now - self._last < self.interval:
+                self.suppressed += 1
+                return False
+            if self.suppressed > 0:
+                message += f' ({self.suppressed} messages suppressed)'
+            self._last, self.suppressed = now, 0
+        print(message, file=self.file or sys.stdout)
+        return True
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class Telemetry(object):
+    '''
+    Collects the throughput, failures, queue depths and worker utilization
+    of an extraction run, and periodically writes these to a metrics file.
+    
+    Attributes
+    ----------
+    path : `str` or `NoneType`
+        The metrics file, `NoneType` to only collect the metrics.
+    metrics_format : {`prometheus`, `jsonl`}
+        The Prometheus text format, rewritten on every emit, or JSON lines
+        with one snapshot appended per emit.
+    interval : `float`
+        The minimum number of seconds between emits by `tick`.
+    labels : `dict` [`str`, `str`]
+        Constant labels added to every metric, e.g. the batch name.
+    counters : `dict` [`str`, `float`]
+        The number of files, bytes and ECGs.
+    failures : `dict` [`str`, `int`]
+        The number of failed files by cause.
+    gauges : `dict` [`str`, `float`]
+        The last reported value of e.g. queue depths.
+    busy : `dict` [`str`, `float`]
+        The seconds each worker spent working.
+    printer : RateLimitedPrinter
+        Prints progress messages.
+    
+    Methods
+    -------
+    file_read(path, seconds, worker)
+        Records a read file.
+    ecg_extracted(seconds, worker)
+        Records an extracted ECG.
+    failure(cause)
+        Records a failed file.
+    snapshot()
+        The current metrics.
+    tick()
+        Writes the metrics if `interval` seconds have passed.
+    emit()
+        Writes the metrics.
+    
+    Notes
+    -----
+    The rates are averaged since the instance was initialised, and the
+    utilization of a worker is its busy seconds divided by the elapsed
+    seconds. The methods may be called from several threads.
+    
+    Example
+    -------
+    >>> telemetry = Telemetry('metrics.prom', interval=10)
+    >>> table = ECGDICOMTable(ECGDICOMReader(), path_list=paths)
+    >>> table(telemetry=telemetry).write_ecg(target_path='out')
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, path:Optional[str]=None,
+                 metrics_format:str=PDNames.TELEMETRY_PROM,
+                 interval:float=10.0, print_interval:float=1.0,
+                 labels:Optional[Dict[str, str]]=None,
+                 ) -> None:
+        """
+        Initialises a new instance of `Telemetry`.
+        
+        Parameters
+        ----------
+        path : `str`, default `NoneType`
+            The metrics file.
+        metrics_format : {`prometheus`, `jsonl`}, default `prometheus`
+            The format of the metrics file.
+        interval : `float`, default 10.0
+            The minimum number of seconds between emits by `tick`.
+        print_interval : `float`, default 1.0
+            The minimum number of seconds between printed messages.
+        labels : `dict` [`str`, `str`], default `NoneType`
+            Constant labels added to every metric.
+        """
+        is_type(path, (type(None), str), 'path')
+        is_type(interval, (int, float), 'interval')
+        is_type(labels, (type(None), dict), 'labels')
+        if not metrics_format in PDNames.TELEMETRY_FORMATS:
+            raise ValueError(Error_MSG.CHOICE_PARM.format(
+                'metrics_format', ', '.join(PDNames.TELEMETRY_FORMATS)))
+        self.path = path
+        self.metrics_format = metrics_format
+        self.interval = interval
+        self.labels = dict(labels or {})
+        self.counters = {k: 0 for k in COUNTERS}
+        self.failures = {}
+        self.gauges = {}
+        self.busy = {}
+        self.printer = RateLimitedPrinter(print_interval)
+        self._start = time.perf_counter()
+        self._last_emit = self._start
+        self._lock = threading.RLock()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(path={self.path!r}, "
+                f"metrics_format={self.metrics_format!r}, "
+                f"interval={self.interval})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def increment(self, name:str, value:float=1) -> None:
+        '''
+        Adds `value` to a counter.
+        '''
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def work(self, worker:str, seconds:float) -> None:
+        '''
+        Adds `seconds` to the busy time of a worker.
+        '''
+        with self._lock:
+            self.busy[worker] = self.busy.get(worker, 0.0) + seconds
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def file_read(self, path:Optional[str], seconds:float,
+                  worker:str=PDNames.TELEMETRY_READER) -> None:
+        '''
+        Records a read file, including its size on disk.
+        
+        Parameters
+        ----------
+        path : `str`
+            The file, `NoneType` to only count the file.
+        seconds : `float`
+            The seconds taken to read the file.
+        worker : `str`, default `reader`
+            The worker which read the file.
+        '''
+        try:
+            nbytes = 0 if path is None else os.path.getsize(path)
+        except OSError:
+            nbytes = 0
+        with self._lock:
+            self.increment(PDNames.TELEMETRY_FILES)
+            self.increment(PDNames.TELEMETRY_BYTES, nbytes)
+            self.work(worker, seconds)
+        self.tick()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def ecg_extracted(self, seconds:Optional[float]=None,
+                      worker:str=PDNames.TELEMETRY_WRITER) -> None:
+        '''
+        Records an extracted (or written) ECG, and the seconds the worker
+        spent on it.
+        '''
+        with self._lock:
+            self.increment(PDNames.TELEMETRY_ECGS)
+            if seconds is not None:
+                self.work(worker, seconds)
+        self.tick()
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def failure(self, cause:str, value:int=1) -> None:
+        '''
+        Records a failed file, e.g. `no_data`, `duplicate` or `timeout`.
+        '''
+        with self._lock:
+            self.failures[cause] = self.failures.get(cause, 0) + value
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def gauge(self, name:str, value:float) -> None:
+        '''
+        Sets a gauge, e.g. the depth of a queue.
+        '''
+        with self._lock:
+            self.gauges[name] = value
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def snapshot(self) -> Dict[str, Any]:
+        '''
+        The current metrics.
+        
+        Returns
+        -------
+        dict [`str`, `any`]
+            The time, labels, elapsed seconds, counters, rates per second,
+            failures by cause, gauges and worker utilization.
+        '''
+        with self._lock:
+            elapsed = time.perf_counter() - self._start
+            rate = (lambda n: n / elapsed if elapsed > 0 else 0.0)
+            return {
+                'time': time.time(),
+                'labels': dict(self.labels),
+                'elapsed_seconds': elapsed,
+                **dict(self.counters),
+                **{f'{k}_per_second': rate(v) for k, v in
+                   self.counters.items()},
+                'failures': dict(self.failures),
+                'gauges': dict(self.gauges),
+                'utilization': {k: rate(v) for k, v in self.busy.items()},
+            }
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def to_prometheus(self, snapshot:Optional[Dict[str, Any]]=None) -> str:
+        '''
+        Formats a snapshot in the Prometheus text exposition format.
+        '''
+        snap = snapshot or self.snapshot()
+        labels = snap['labels']
+        lines = []
+        def add(name, kind, text, samples):
+            lines.extend([f'# HELP {PREFIX}{name} {text}',
+                          f'# TYPE {PREFIX}{name} {kind}'])
+            for extra, value in samples:
+                lines.append(f'{PREFIX}{name}{_labels({**labels, **extra})} '
+                             f'{float(value):.6g}')
+        for name, text in COUNTERS.items():
+            add(name + '_total', 'counter', text, [({}, snap[name])])
+            add(name + '_per_second', 'gauge',
+                text.replace('The number of', 'The average number of').\
+                rstrip('.') + ' per second.',
+                [({}, snap[name + '_per_second'])])
+        add('elapsed_seconds', 'gauge', 'The seconds since the start.',
+            [({}, snap['elapsed_seconds'])])
+        add('failures_total', 'counter', 'The number of failed files by cause.',
+            [({'cause': k}, v) for k, v in snap['failures'].items()])
+        for name, value in snap['gauges'].items():
+            add(name, 'gauge', f'The last reported {name}.', [({}, value)])
+        add('utilization', 'gauge',
+            'The fraction of the elapsed time a worker was busy.',
+            [({'worker': k}, v) for k, v in snap['utilization'].items()])
+        # return
+        return '\n'.join(lines) + '\n'
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def emit(self) -> Dict[str, Any]:
+        '''
+        Writes the current metrics to `path`, if supplied.
+        
+        Returns
+        -------
+        dict [`str`, `any`]
+            The written snapshot.
+        '''
+        with self._lock:
+            snap = self.snapshot()
+            self._last_emit = time.perf_counter()
+            if self.path is None:
+                return snap
+            if self.metrics_format == PDNames.TELEMETRY_PROM:
+                # NOTE replaced atomically, so a scraper never reads a partial
+                # file
+                temp = self.path + '.tmp'
+                with open(temp, 'w') as file:
+                    file.write(self.to_prometheus(snap))
+                os.replace(temp, self.path)
+            else:
+                with open(self.path, 'a') as file:
+                    file.write(json.dumps(snap) + '\n')
+        # return
+        return snap
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def tick(self) -> None:
+        '''
+        Writes the metrics if `interval` seconds have passed since the last
+        emit.
+        '''
+        if time.perf_counter() - self._last_emit >= self.interval:
+            self.emit()
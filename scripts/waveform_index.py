@@ -0,0 +1,264 @@
+'''
+Random access to the waveform tables written by `ECGDICOMTable.write_ecg`
+with `random_access=True`, reading a single ECG by its UID without
+decompressing the entire table.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import os
+import io
+import gzip
+import pathlib
+import numpy as np
+import pandas as pd
+from typing import (
+    Any, List, Dict, Optional,
+)
+from ecgprocess.errors import (
+    is_type,
+    _check_readable,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+from ecgprocess.codec import (
+    MAGIC,
+    decode_ecg,
+    to_voltages,
+    read_ecg_block,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class WaveformIndex(object):
+    '''
+    Reads the `WaveformIndex.tsv` block offsets and loads the rhythm and/or
+    median beat waveforms of individual ECGs.
+    
+    Attributes
+    ----------
+    target_path : `str`
+        The directory containing the written tables.
+    table_prefix : `str`
+        The prefix of the table file names.
+    sep : `str`
+        The table separator.
+    uids : `list` [`str`]
+        The indexed ECG UIDs.
+    
+    Methods
+    -------
+    load_ecg(uid, wave_type)
+        Returns the long-format waveform table of a single ECG.
+    load_previews(uid)
+        Returns the decoded preview levels of a single ECG.
+    
+    Notes
+    -----
+    Each block is an independent gzip member (or plain text for
+    uncompressed tables), only the first block of a file contains the
+    column names. Blocks of the `ecgz` waveform files are decoded and
+    scaled, but not resampled, to the same long-format table.
+    
+    Example
+    -------
+    >>> index = WaveformIndex('ECGDICOMTable')
+    >>> index.load_ecg(index.uids[0], wave_type='rhythm')
+    '''
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __init__(self, target_path:str, table_prefix:str='', sep:str='\t',
+                 ) -> None:
+        """
+        Initialises a new instance of `WaveformIndex`.
+        
+        Parameters
+        ----------
+        target_path : `str`
+            The directory containing the written tables and
+            `WaveformIndex.tsv`.
+        table_prefix : `str`, default ''
+            The prefix supplied to `write_ecg`.
+        sep : `str`, default '\t'
+            The separator supplied to `write_ecg`.
+        """
+        is_type(target_path, (pathlib.PosixPath, str))
+        is_type(table_prefix, str)
+        is_type(sep, str)
+        self.target_path = str(target_path)
+        self.table_prefix = table_prefix
+        self.sep = sep
+        index_path = os.path.join(self.target_path,
+                                  table_prefix + PDNames.WAVE_INDEX_FILE)
+        _check_readable(index_path)
+        index = pd.read_csv(index_path, sep='\t',
+                            dtype={PDNames.SOP_UID: str})
+        # map each UID to its blocks
+        self._blocks: Dict[str, List[tuple[str, str, int, int]]] = {}
+        for uid, wave_type, file, offset, length in index[[
+            PDNames.SOP_UID, PDNames.COL_WAVETYPE, PDNames.COL_BLOCK_FILE,
+            PDNames.COL_BLOCK_OFFSET, PDNames.COL_BLOCK_LENGTH,
+        ]].itertuples(index=False):
+            self._blocks.setdefault(uid, []).append(
+                (wave_type, file, int(offset), int(length)))
+        self._columns: Dict[str, List[str]] = {}
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __str__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME} instance with target_path={self.target_path} "
+                f"and {len(self._blocks)} ECGs."
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def __repr__(self):
+        CLASS_NAME = type(self).__name__
+        return (f"{CLASS_NAME}(target_path={self.target_path}, "
+                f"table_prefix={self.table_prefix})"
+                )
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    @property
+    def uids(self) -> List[str]:
+        return list(self._blocks)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def _get_columns(self, path:str) -> List[str]:
+        '''
+        Reads the column names from the first line of a table.
+        '''
+        if path not in self._columns:
+            with open(path, 'rb') as f:
+                compressed = f.read(2) == b'\x1f\x8b'
+            opener = gzip.open if compressed else open
+            with opener(path, 'rt') as f:
+                self._columns[path] = f.readline().rstrip('\r\n').split(
+                    self.sep)
+        return self._columns[path]
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def load_ecg(self, uid:str, wave_type:Optional[str]=None,
+                 ) -> pd.DataFrame:
+        '''
+        Reads the waveforms of a single ECG.
+        
+        Parameters
+        ----------
+        uid : `str`
+            The ECG UID, as in the `SOP_UID` column.
+        wave_type : `str`, default `NoneType`
+            Either `rhythm` or `median`. Set to `NoneType` to return both.
+        
+        Returns
+        -------
+        pd.DataFrame
+            The long-format waveform table of the ECG.
+        '''
+        is_type(uid, str)
+        is_type(wave_type, (type(None), str))
+        if uid not in self._blocks:
+            raise KeyError(f'`{uid}` is not in the waveform index.')
+        tables = []
+        # NOTE the preview levels are read by `load_previews`
+        preview = PDNames.WAVETYPE_PREVIEW.format('')
+        for w_type, file, offset, length in self._blocks[uid]:
+            if wave_type is not None and w_type != wave_type:
+                continue
+            if wave_type is None and w_type.startswith(preview):
+                continue
+            path = os.path.join(self.target_path, file)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                block = f.read(length)
+            if block[:len(MAGIC)] == MAGIC:
+                tables.append(_codec_table(decode_ecg(block)))
+                continue
+            if block[:2] == b'\x1f\x8b':
+                block = gzip.decompress(block)
+            # only the first block has a header
+            if offset == 0:
+                tables.append(pd.read_csv(io.BytesIO(block), sep=self.sep))
+            else:
+                tables.append(pd.read_csv(io.BytesIO(block), sep=self.sep,
+                                          header=None,
+                                          names=self._get_columns(path)))
+        if len(tables) == 0:
+            raise KeyError(f'`{uid}` has no `{wave_type}` waveforms.')
+        # return
+        return pd.concat(tables, ignore_index=True)
+    # \\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    def load_previews(self, uid:str) -> List[Dict[str, Any]]:
+        '''
+        Reads the preview levels of a single ECG, written by `write_ecg` with
+        `preview_levels`.
+        
+        Parameters
+        ----------
+        uid : `str`
+            The ECG UID, as in the `SOP_UID` column.
+        
+        Returns
+        -------
+        list [`dict` [`str`, `any`]]
+            The decoded `ecgz` blocks, one per level, which can be supplied
+            to `ECGDrawing` as `previews`.
+        '''
+        is_type(uid, str)
+        if uid not in self._blocks:
+            raise KeyError(f'`{uid}` is not in the waveform index.')
+        prefix = PDNames.WAVETYPE_PREVIEW.format('')
+        records = []
+        for w_type, file, offset, length in self._blocks[uid]:
+            if w_type.startswith(prefix):
+                records.append(read_ecg_block(
+                    os.path.join(self.target_path, file), offset, length))
+        # return
+        return records
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _codec_table(record:Dict[str, Any]) -> pd.DataFrame:
+    '''
+    Maps a decoded `ecgz` block to the long-format waveform table.
+    '''
+    voltages = to_voltages(record)
+    n_samples = record[PDNames.CODEC_SHAPE][1]
+    table = pd.DataFrame({
+        PDNames.SOP_UID: record[PDNames.SOP_UID],
+        PDNames.SAMPLING_SEQ: np.tile(np.arange(n_samples), len(voltages)),
+        PDNames.COL_LEAD: np.repeat(list(voltages), n_samples),
+        PDNames.COL_VOLTAGE: np.concatenate(list(voltages.values()))
+        if len(voltages) > 0 else np.empty(0),
+    })
+    table[PDNames.COL_WAVETYPE] = record[PDNames.COL_WAVETYPE]
+    # return
+    return table
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def load_ecg(uid:str, target_path:str, table_prefix:str='', sep:str='\t',
+             wave_type:Optional[str]=None,
+             ) -> pd.DataFrame:
+    '''
+    Reads the waveforms of a single ECG from the tables written by
+    `ECGDICOMTable.write_ecg` with `random_access=True`.
+    
+    Parameters
+    ----------
+    uid : `str`
+        The ECG UID, as in the `SOP_UID` column.
+    target_path : `str`
+        The directory containing the written tables.
+    table_prefix : `str`, default ''
+        The prefix supplied to `write_ecg`.
+    sep : `str`, default '\t'
+        The separator supplied to `write_ecg`.
+    wave_type : `str`, default `NoneType`
+        Either `rhythm` or `median`. Set to `NoneType` to return both.
+    
+    Returns
+    -------
+    pd.DataFrame
+        The long-format waveform table of the ECG.
+    
+    Notes
+    -----
+    This reads the index on each call, use a `WaveformIndex` instance when
+    loading many ECGs.
+    '''
+    return WaveformIndex(target_path, table_prefix=table_prefix,
+                         sep=sep).load_ecg(uid, wave_type=wave_type)
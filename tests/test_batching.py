@@ -0,0 +1,56 @@
+'''
+Tests that `ECGDICOMTable.get_table` returns the same tables with and
+without a `memory_budget`.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import os
+import pandas as pd
+import pytest
+from ecgprocess.process_dicoms import (
+    ECGDICOMReader,
+    ECGDICOMTable,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+PATHS = [os.path.join(DATA, 'example-DICOM1.dcm'),
+         os.path.join(DATA, 'example-DICOM2.dcm')]
+# NOTE the first lead of the second file is named `I (Einthoven)`
+UPDATE_KEYS = {'I (Einthoven)': 'I'}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _get_table(raw_waveforms:bool, **kwargs) -> ECGDICOMTable:
+    return ECGDICOMTable(ECGDICOMReader(raw_waveforms=raw_waveforms),
+                         PATHS)().get_table(**kwargs)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _sort(table:pd.DataFrame) -> pd.DataFrame:
+    return table.sort_values(
+        [PDNames.SOP_UID, PDNames.COL_LEAD, PDNames.SAMPLING_SEQ],
+        ignore_index=True)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('raw_waveforms', [False, True])
+def test_budget_keeps_tables(raw_waveforms):
+    # a budget of a single byte converts one ECG per batch
+    budget = _get_table(raw_waveforms, memory_budget=1,
+                        update_keys=UPDATE_KEYS)
+    expected = _get_table(raw_waveforms, update_keys=UPDATE_KEYS)
+    assert getattr(budget, PDNames.BATCH_SIZES) == [1, 1]
+    pd.testing.assert_frame_equal(getattr(budget, PDNames.INFO_T),
+                                  getattr(expected, PDNames.INFO_T))
+    # NOTE the rows of the budgeted tables are ordered by batch
+    for name in [PDNames.WAVE_T, PDNames.MEDIAN_T]:
+        pd.testing.assert_frame_equal(_sort(getattr(budget, name)),
+                                      _sort(getattr(expected, name)))
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('memory_budget', [None, 1])
+def test_distinct_leads_raise(memory_budget):
+    with pytest.raises(KeyError, match='distinct keys'):
+        _get_table(False, memory_budget=memory_budget)
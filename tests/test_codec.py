@@ -0,0 +1,92 @@
+'''
+Tests the `ecgz` round trip of integer and floating point waveforms.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import numpy as np
+import pytest
+from ecgprocess.codec import (
+    encode_ecg,
+    decode_ecg,
+    to_voltages,
+    write_ecg_block,
+    read_ecg_block,
+    iter_ecgs,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+RNG = np.random.default_rng(0)
+# a random walk, including the int16 limits to check the wrapping differences
+INT_LEADS = {
+    'I': np.cumsum(RNG.integers(-20, 20, 5000)).astype(np.int16),
+    'II': np.r_[np.int16(-32768), np.int16(32767),
+                RNG.integers(-32768, 32767, 4998)].astype(np.int16),
+}
+SCALING = {'I': (4.88, 0.0, 1.0), 'II': (5.0, -1.5, 0.98)}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('order', [0, 1, 2])
+@pytest.mark.parametrize('compressor', ['zlib', 'lzma'])
+def test_int16_round_trip(order, compressor):
+    record = decode_ecg(encode_ecg(INT_LEADS, frequency=500, scaling=SCALING,
+                                   uid='1.2.3', order=order,
+                                   compressor=compressor))
+    assert record[PDNames.SOP_UID] == '1.2.3'
+    assert record[PDNames.SF] == 500
+    assert record[PDNames.CODEC_LEADS] == list(INT_LEADS)
+    for lead, samples in INT_LEADS.items():
+        assert record[PDNames.LEAD_VOLTAGES][lead].dtype == np.int16
+        np.testing.assert_array_equal(record[PDNames.LEAD_VOLTAGES][lead],
+                                      samples)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_int16_voltages():
+    voltages = to_voltages(decode_ecg(encode_ecg(
+        INT_LEADS, frequency=500, scaling=SCALING)))
+    for lead, samples in INT_LEADS.items():
+        sensitivity, baseline, correction = SCALING[lead]
+        np.testing.assert_array_equal(
+            voltages[lead], np.multiply(samples, sensitivity * correction,
+                                        dtype='float64') + baseline)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_float_round_trip(dtype):
+    leads = {k: (v * 4.88).astype(dtype) for k, v in INT_LEADS.items()}
+    leads['I'][10] = np.nan
+    record = decode_ecg(encode_ecg(leads, frequency=250.0))
+    # floating point samples are returned without scaling
+    assert record[PDNames.LEAD_SCALING] is None
+    for lead, samples in to_voltages(record).items():
+        assert samples.dtype == dtype
+        np.testing.assert_array_equal(samples, leads[lead])
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_empty_round_trip():
+    record = decode_ecg(encode_ecg({}, frequency=500))
+    assert record[PDNames.LEAD_VOLTAGES] == {}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_blocks(tmp_path):
+    path = str(tmp_path / 'WaveForms.ecgz')
+    offsets = [write_ecg_block(path, encode_ecg(
+        {'I': INT_LEADS['I'][:n]}, frequency=500, uid=str(n)),
+        header=n == 10) for n in [10, 20, 30]]
+    # read by offset, in reverse order
+    for (offset, length), n in reversed(list(zip(offsets, [10, 20, 30]))):
+        record = read_ecg_block(path, offset, length)
+        assert record[PDNames.SOP_UID] == str(n)
+        np.testing.assert_array_equal(record[PDNames.LEAD_VOLTAGES]['I'],
+                                      INT_LEADS['I'][:n])
+    assert [r[PDNames.SOP_UID] for r in iter_ecgs(path)] == ['10', '20', '30']
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_invalid_block():
+    with pytest.raises(ValueError):
+        decode_ecg(b'GZIP' + bytes(20))
+    with pytest.raises(ValueError):
+        encode_ecg(INT_LEADS, frequency=500, compressor='bz2')
@@ -0,0 +1,67 @@
+'''
+Tests the min/max decimation of the preview levels.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import numpy as np
+import pytest
+from ecgprocess.pyramid import (
+    minmax_decimate,
+    build_pyramid,
+    select_level,
+    envelope_positions,
+)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_order_within_block():
+    # the minimum precedes the maximum in the first block and vice versa
+    signal = np.array([3, 1, 2, 9, 8, 7, 0, 5])
+    np.testing.assert_array_equal(minmax_decimate(signal, 4),
+                                  [1, 9, 8, 0])
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_padding():
+    # the trailing partial block is padded with its last sample
+    signal = np.array([1, 5, 2, 4, 3, 6, -2])
+    np.testing.assert_array_equal(minmax_decimate(signal, 3),
+                                  [1, 5, 3, 6, -2, -2])
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_matrix_and_dtype():
+    matrix = np.arange(20, dtype=np.int16).reshape(2, 10)[:, ::-1]
+    envelope = minmax_decimate(matrix, 4)
+    assert envelope.shape == (2, 6)
+    assert envelope.dtype == np.int16
+    np.testing.assert_array_equal(envelope[1], [19, 16, 15, 12, 11, 10])
+    # a factor of 1 keeps every sample twice
+    np.testing.assert_array_equal(minmax_decimate(matrix[0], 1),
+                                  np.repeat(matrix[0], 2))
+    with pytest.raises(ValueError):
+        minmax_decimate(matrix, 0)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_build_pyramid():
+    leads = {'I': np.sin(np.arange(5000) / 20), 'II': np.arange(5000.0)}
+    pyramid = build_pyramid(leads, levels=[4, 16])
+    assert list(pyramid) == [4, 16]
+    for factor, envelope in pyramid.items():
+        assert list(envelope) == ['I', 'II']
+        np.testing.assert_array_equal(envelope['I'],
+                                      minmax_decimate(leads['I'], factor))
+        assert envelope['I'].max() == leads['I'].max()
+        assert envelope['I'].min() == leads['I'].min()
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_select_level():
+    assert select_level(5000, pixels=5000) == 1
+    assert select_level(5000, pixels=300) == 16
+    assert select_level(5000, pixels=300, levels=[4, 16]) == 16
+    assert select_level(5000, pixels=1000, levels=[4, 16]) == 4
+    assert select_level(5000, pixels=2000, levels=[4, 16]) == 1
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_envelope_positions():
+    # the block centres, the last clipped to the last sample
+    np.testing.assert_array_equal(envelope_positions(100, 10, 4),
+                                  [101.5, 101.5, 105.5, 105.5, 109, 109])
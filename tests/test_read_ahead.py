@@ -0,0 +1,64 @@
+'''
+Tests that the ECGs read ahead by `ECGDICOMTable.write_ecg` with a
+`memory_budget` keep their own waveforms while the next file is read.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import os
+import time
+import pandas as pd
+import pytest
+from ecgprocess.process_dicoms import (
+    ECGDICOMReader,
+    ECGDICOMTable,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+PATHS = [os.path.join(DATA, 'example-DICOM1.dcm'),
+         os.path.join(DATA, 'example-DICOM2.dcm')]
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class SlowWriterReader(ECGDICOMReader):
+    '''
+    Delays the writer, which gets the voltages of each queued ECG, so the
+    next files are read before the queued ECG is written.
+    '''
+    def get_voltages(self, *args, **kwargs):
+        time.sleep(0.5)
+        return super().get_voltages(*args, **kwargs)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _write(target:str, reader:type=ECGDICOMReader,
+           memory_budget:int|None=None, **kwargs,
+           ) -> dict[str, pd.DataFrame]:
+    '''
+    Writes the example files and reads the waveform tables back, sorted by
+    UID.
+    '''
+    os.makedirs(target)
+    ECGDICOMTable(reader(**kwargs), PATHS)().write_ecg(
+        target_path=target, memory_budget=memory_budget,
+        update_keys={'I (Einthoven)': 'I'})
+    tables = {}
+    for file in [PDNames.WAVE_FILE, PDNames.MEDIAN_FILE]:
+        table = pd.read_csv(os.path.join(target, file), sep='\t')
+        tables[file] = table.sort_values(
+            [PDNames.SOP_UID, PDNames.COL_LEAD, PDNames.SAMPLING_SEQ],
+            ignore_index=True)
+    return tables
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('raw_waveforms', [False, True])
+def test_read_ahead_keeps_each_ecg(tmp_path, raw_waveforms):
+    # the budget holds all files, which are read while the first is written
+    budget = _write(str(tmp_path / 'budget'), reader=SlowWriterReader,
+                    raw_waveforms=raw_waveforms, memory_budget=1024 ** 3)
+    expected = _write(str(tmp_path / 'serial'), raw_waveforms=raw_waveforms)
+    for file, table in budget.items():
+        assert table[PDNames.SOP_UID].nunique() == len(PATHS)
+        pd.testing.assert_frame_equal(table, expected[file])
@@ -0,0 +1,73 @@
+'''
+Tests the shard rotation of `ECGDICOMTable.write_ecg`.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import os
+import pandas as pd
+import pytest
+from ecgprocess.process_dicoms import (
+    ECGDICOMReader,
+    ECGDICOMTable,
+)
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+PATHS = [os.path.join(DATA, 'example-DICOM1.dcm'),
+         os.path.join(DATA, 'example-DICOM2.dcm')]
+# NOTE the first lead of the second file is named `I (Einthoven)`
+UPDATE_KEYS = {'I (Einthoven)': 'I'}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _write(target:str, **kwargs) -> tuple[ECGDICOMTable, pd.DataFrame]:
+    table = ECGDICOMTable(ECGDICOMReader(), PATHS)()
+    table.write_ecg(target_path=target, update_keys=UPDATE_KEYS, **kwargs)
+    manifest = pd.read_csv(os.path.join(target, PDNames.SHARD_MANIFEST_FILE),
+                           sep='\t', dtype={PDNames.COL_SHARD_FIRST: str,
+                                            PDNames.COL_SHARD_LAST: str})
+    return table, manifest
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _uids(target:str, file:str) -> list[str]:
+    table = pd.read_csv(os.path.join(target, file), sep='\t',
+                        dtype={PDNames.SOP_UID: str})
+    return list(table[PDNames.SOP_UID].unique())
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('kwargs, n_shards', [
+    (dict(ecgs_per_shard=1), 2),
+    (dict(ecgs_per_shard=2), 1),
+    (dict(ecgs_per_shard=3), 1),
+    # a shard exceeding the size limit is closed after its first ECG
+    (dict(max_shard_size=1), 2),
+    (dict(max_shard_size=1024 ** 3), 1),
+])
+def test_rotation(tmp_path, kwargs, n_shards):
+    _, manifest = _write(str(tmp_path), **kwargs)
+    shards = manifest.drop_duplicates(PDNames.COL_SHARD)
+    assert list(shards[PDNames.COL_SHARD]) == list(range(n_shards))
+    assert shards[PDNames.COL_SHARD_ECGS].sum() == len(PATHS)
+    uids = []
+    for shard, first, last in shards[[
+        PDNames.COL_SHARD, PDNames.COL_SHARD_FIRST, PDNames.COL_SHARD_LAST,
+    ]].itertuples(index=False):
+        prefix = PDNames.SHARD_PREFIX.format(str(shard).zfill(5))
+        info = _uids(str(tmp_path), prefix + PDNames.INFO_FILE)
+        # each shard holds the metadata of its own ECGs
+        assert info == _uids(str(tmp_path), prefix + PDNames.WAVE_FILE)
+        assert info == _uids(str(tmp_path), prefix + PDNames.MEDIAN_FILE)
+        assert [info[0], info[-1]] == [first, last]
+        uids.extend(info)
+    assert len(set(uids)) == len(PATHS)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_manifest_sizes(tmp_path):
+    _, manifest = _write(str(tmp_path), ecgs_per_shard=1)
+    for file, size in manifest[[
+        PDNames.COL_BLOCK_FILE, PDNames.COL_SHARD_BYTES,
+    ]].itertuples(index=False):
+        assert os.path.getsize(os.path.join(str(tmp_path), file)) == size
@@ -0,0 +1,106 @@
+'''
+Tests that `WaveformIndex` loads the same waveforms from the tsv, tsv.gz and
+`ecgz` tables written with `random_access=True`.
+'''
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+# imports
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from ecgprocess.process_dicoms import (
+    ECGDICOMReader,
+    ECGDICOMTable,
+)
+from ecgprocess.waveform_index import (
+    WaveformIndex,
+    load_ecg,
+)
+from ecgprocess.codec import to_voltages
+from ecgprocess.pyramid import build_pyramid
+from ecgprocess.constants import (
+    ProcessDicomNames as PDNames,
+)
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+PATHS = [os.path.join(DATA, 'example-DICOM1.dcm'),
+         os.path.join(DATA, 'example-DICOM2.dcm')]
+# NOTE the first lead of the second file is named `I (Einthoven)`
+UPDATE_KEYS = {'I (Einthoven)': 'I'}
+LEVELS = [4, 16]
+FORMATS = {
+    'tsv': dict(compression=None),
+    'tsv.gz': dict(compression='gzip'),
+    'ecgz': dict(waveform_format=PDNames.WAVE_FORMAT_CODEC,
+                 preview_levels=LEVELS),
+}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _write(target:str, **kwargs) -> WaveformIndex:
+    os.makedirs(target)
+    ECGDICOMTable(ECGDICOMReader(raw_waveforms=True), PATHS)().write_ecg(
+        target_path=target, random_access=True, update_keys=UPDATE_KEYS,
+        **kwargs)
+    return WaveformIndex(target)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _voltages(path:str, median:bool=False) -> dict[str, np.ndarray]:
+    leads = ECGDICOMReader(raw_waveforms=True)(path).get_voltages(
+        median=median)
+    return {UPDATE_KEYS.get(k, k): v for k, v in leads.items()}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.fixture(scope='module')
+def indices(tmp_path_factory):
+    target = tmp_path_factory.mktemp('random_access')
+    return {name: _write(str(target / name), **kwargs)
+            for name, kwargs in FORMATS.items()}
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('name', list(FORMATS))
+@pytest.mark.parametrize('wave_type, median', [('rhythm', False),
+                                               ('median', True)])
+def test_load_ecg(indices, name, wave_type, median):
+    index = indices[name]
+    assert len(index.uids) == len(PATHS)
+    for uid, path in zip(index.uids, PATHS):
+        table = index.load_ecg(uid, wave_type=wave_type)
+        assert (table[PDNames.SOP_UID] == uid).all()
+        assert (table[PDNames.COL_WAVETYPE] == wave_type).all()
+        for lead, samples in _voltages(path, median=median).items():
+            rows = table[table[PDNames.COL_LEAD] == lead]
+            np.testing.assert_array_equal(rows[PDNames.SAMPLING_SEQ],
+                                          np.arange(len(samples)))
+            np.testing.assert_allclose(rows[PDNames.COL_VOLTAGE], samples)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+@pytest.mark.parametrize('name', list(FORMATS))
+def test_load_ecg_both(indices, name):
+    index = indices[name]
+    uid = index.uids[0]
+    table = index.load_ecg(uid)
+    # the preview levels are not returned with the waveforms
+    assert set(table[PDNames.COL_WAVETYPE]) == {'rhythm', 'median'}
+    pd.testing.assert_frame_equal(
+        table, load_ecg(uid, index.target_path))
+    with pytest.raises(KeyError):
+        index.load_ecg('unknown')
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def test_load_previews(indices):
+    index = indices['ecgz']
+    for uid, path in zip(index.uids, PATHS):
+        records = index.load_previews(uid)
+        assert [r[PDNames.COL_WAVETYPE] for r in records] ==\
+            [PDNames.WAVETYPE_PREVIEW.format(f) for f in LEVELS]
+        expected = build_pyramid(_voltages(path), levels=LEVELS)
+        for record, factor in zip(records, LEVELS):
+            assert record[PDNames.SOP_UID] == uid
+            previews = to_voltages(record)
+            assert list(previews) == list(expected[factor])
+            for lead, envelope in expected[factor].items():
+                np.testing.assert_allclose(previews[lead], envelope)
+    # tables without previews return an empty list
+    assert indices['tsv'].load_previews(indices['tsv'].uids[0]) == []